@@ -5,8 +5,9 @@ from app.repositories.mysql_repository import SQLRepository
 from app.core.security import verify_password, create_access_token
 from app.schemas.token import Token
 from app.api.endpoints.tecnicos import get_tecnico_repository
+from app.core.medicao import RotaMedida
 
-router = APIRouter()
+router = APIRouter(route_class=RotaMedida)
 
 @router.post("/login", response_model=Token)
 def login_for_access_token(
@@ -17,23 +18,12 @@ def login_for_access_token(
     Autentica um usuário (técnico) e retorna um token JWT.
     Espera dados de formulário: 'username' (será o email) e 'password'.
     """
-    tecnicos = repo.get_tecnicos(is_active=None)
-    user = None
-    for tecnico in tecnicos:
-        if tecnico.email.lower() == form_data.username.lower():
-            if not tecnico.is_active:
-                 raise HTTPException(status_code=400, detail="Usuário inativo")
-            if verify_password(form_data.password, tecnico.password_hash):
-                 user = tecnico
-                 break
-            else:
-                 raise HTTPException(
-                     status_code=status.HTTP_401_UNAUTHORIZED,
-                     detail="Email ou senha incorretos",
-                     headers={"WWW-Authenticate": "Bearer"},
-                 )
+    # Leitura sem cache: uma troca de senha ou desativação feita em outro worker vale na hora
+    user = repo.get_tecnico_by_email(form_data.username)
+    if user is not None and not user.is_active:
+        raise HTTPException(status_code=400, detail="Usuário inativo")
 
-    if user is None:
+    if user is None or not verify_password(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou senha incorretos",
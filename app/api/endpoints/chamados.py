@@ -1,36 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Response, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, File, UploadFile, Form, Header
 from typing import List, Optional
 from datetime import date
+from types import SimpleNamespace
 from sqlalchemy.orm import Session
+from app.core.metricas import registrar_transicao_status
+from app.core.etag import gerar_etag, gerar_etag_colecao, etag_corresponde, versao_do_if_match
 from app.core.security import get_current_active_user, require_admin_role, require_technician_role
 from app.db.database import get_db
 from app.repositories.mysql_repository import SQLRepository
-from app.schemas.chamado import Chamado, ChamadoCreate, ChamadoUpdate, StatusChamado
+from app.repositories.fabrica import criar_repositorio
+from app.schemas.chamado import (Chamado, ChamadoCreate, ChamadoUpdate, ChamadoLoteCreate, ChamadoLoteResponse,
+                                 StatusChamado)
 from app.schemas.visita import Visita, VisitaCreate, VisitaUpdate
 from app.schemas.custo import CustoTotalResponse
-from app.services.custo_service import CustoService
+from app.services.chamado_service import (ChamadoService, dados_mudanca_status, dados_novo_chamado,
+                                          obter_chamado_serializado, calcular_custos_chamado)
+from app.services.evento_service import publicar_evento_chamado
 from app.services.file_service import save_upload_file
+from app.core.medicao import RotaMedida
 
-router = APIRouter()
+router = APIRouter(route_class=RotaMedida)
 MULTI_FILE_FIELDS = ["comprovante_pedagio_urls", "comprovante_frete_urls"]
 SINGLE_FILE_FIELDS = ["odometro_inicio_url", "odometro_fim_url", "assinatura_cliente_url"]
 
 
 def get_chamado_repository(db: Session = Depends(get_db)):
-    return SQLRepository(db=db)
+    return criar_repositorio(db)
 
 
 def get_cliente_repository(db: Session = Depends(get_db)):
-    return SQLRepository(db=db)
+    return criar_repositorio(db)
 
 
 def get_tecnico_repository(db: Session = Depends(get_db)):
-    return SQLRepository(db=db)
+    return criar_repositorio(db)
+
+
+def _definir_etag(response: Response, etag: str) -> None:
+    """Envia o ETag e pede ao cliente que revalide a representação (privada ao usuário) antes de reutilizá-la."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+
+
+def _nao_modificado(etag: str) -> Response:
+    response = Response(status_code=304)
+    _definir_etag(response, etag)
+    return response
 
 
 @router.post("/", response_model=Chamado, status_code=201)
 def create_chamado(
         chamado_in: ChamadoCreate,
+        response: Response,
         repo: SQLRepository = Depends(get_chamado_repository),
         cliente_repo: SQLRepository = Depends(get_cliente_repository),
         _admin_user: dict = Depends(require_admin_role)
@@ -40,61 +61,104 @@ def create_chamado(
         raise HTTPException(status_code=404,
                             detail=f"Cliente com id {chamado_in.id_cliente} não encontrado ou inativo.")
 
-    chamado_data = chamado_in.model_dump()
-    chamado_data['data_abertura'] = date.today()
-    chamado_data['is_cancelled'] = False
+    chamado_criado_db = repo.create_chamado(dados_novo_chamado(chamado_in))
+    registrar_transicao_status(None, chamado_criado_db.status)
+    publicar_evento_chamado("chamado_criado", chamado_criado_db)
+    response.headers["ETag"] = gerar_etag(chamado_criado_db.versao)
+    return chamado_criado_db
 
-    if chamado_data.get('id_tecnico_atribuido') is not None:
-        chamado_data['status'] = StatusChamado.AGENDADO
-    else:
-        chamado_data['status'] = StatusChamado.ABERTO
 
-    chamado_criado_db = repo.create_chamado(chamado_data)
-    return chamado_criado_db
+@router.post("/lote", response_model=ChamadoLoteResponse, status_code=201)
+def create_chamados_lote(
+        lote_in: ChamadoLoteCreate,
+        repo: SQLRepository = Depends(get_chamado_repository),
+        _admin_user: dict = Depends(require_admin_role)
+):
+    """
+    Cria vários chamados de uma vez (ex: a lista semanal de preventivas de um cliente), em uma única transação.
+    Clientes e técnicos referenciados são verificados com uma consulta para cada; se algum não existir ou estiver
+    inativo, nenhum chamado é criado e a resposta (422) lista a posição de cada chamado com problema.
+    """
+    chamados = lote_in.chamados
+    clientes_ativos = repo.get_ids_clientes_ativos({c.id_cliente for c in chamados})
+    tecnicos_ativos = repo.get_ids_tecnicos_ativos(
+        {c.id_tecnico_atribuido for c in chamados if c.id_tecnico_atribuido is not None}
+    )
+
+    erros = []
+    for indice, chamado_in in enumerate(chamados):
+        if chamado_in.id_cliente not in clientes_ativos:
+            erros.append({"indice": indice,
+                          "erro": f"Cliente com id {chamado_in.id_cliente} não encontrado ou inativo."})
+        if chamado_in.id_tecnico_atribuido is not None and chamado_in.id_tecnico_atribuido not in tecnicos_ativos:
+            erros.append({"indice": indice,
+                          "erro": f"Técnico com id {chamado_in.id_tecnico_atribuido} não encontrado ou inativo."})
+    if erros:
+        raise HTTPException(status_code=422, detail=erros)
+
+    lista_chamados = [dados_novo_chamado(chamado_in) for chamado_in in chamados]
+    ids = repo.create_chamados(lista_chamados)
+    for id_os, chamado_data in zip(ids, lista_chamados):
+        registrar_transicao_status(None, chamado_data["status"])
+        publicar_evento_chamado("chamado_criado", SimpleNamespace(id_os=id_os, versao=1, **chamado_data))
+    return ChamadoLoteResponse(ids=ids)
 
 
 @router.get("/", response_model=List[Chamado])
 def get_todos_chamados(
+        response: Response,
         repo: SQLRepository = Depends(get_chamado_repository),
         is_cancelled: Optional[bool] = Query(None, description="Filtra chamados pelo status de cancelamento"),
-        current_user: dict = Depends(get_current_active_user)
+        status: Optional[StatusChamado] = Query(None, description="Filtra chamados pelo status"),
+        apos: Optional[int] = Query(None, description="Paginação: id do último chamado da página anterior"),
+        limite: Optional[int] = Query(None, ge=1, le=500, description="Paginação: quantidade máxima de chamados"),
+        current_user: dict = Depends(get_current_active_user),
+        if_none_match: Optional[str] = Header(None, description="ETag da última listagem recebida."),
 ):
-    chamados_list_db = repo.get_chamados()
-    response_list = []
-    user_id = current_user.get("user_id")
-    user_role = current_user.get("role")
-
-    for chamado_db in chamados_list_db:
-        is_chamado_cancelado = chamado_db.is_cancelled
-        id_tecnico_atribuido = chamado_db.id_tecnico_atribuido
-
-        if is_cancelled is not None and is_chamado_cancelado != is_cancelled:
-            continue
-
-        if user_role == "tecnico":
-            if id_tecnico_atribuido != user_id:
-                continue
+    """
+    Lista os chamados visíveis ao usuário logado (técnicos veem apenas os chamados atribuídos a eles).
+    Se o ETag enviado em If-None-Match ainda corresponder à listagem, responde 304 sem carregar os chamados.
+    Com 'limite', a listagem é paginada por id: a próxima página usa 'apos' com o id do último chamado recebido.
+    """
+    id_tecnico = current_user.get("user_id") if current_user.get("role") == "tecnico" else None
 
-        response_list.append(chamado_db)
+    etag = gerar_etag_colecao(*repo.get_versao_colecao_chamados(is_cancelled=is_cancelled, id_tecnico=id_tecnico,
+                                                                 status=status))
+    if etag_corresponde(if_none_match, etag):
+        return _nao_modificado(etag)
 
-    return response_list
+    _definir_etag(response, etag)
+    return repo.get_chamados(is_cancelled=is_cancelled, id_tecnico=id_tecnico, apos=apos, limite=limite,
+                             status=status)
 
 
 @router.get("/{chamado_id}", response_model=Chamado)
 def get_chamado_por_id(
         chamado_id: int,
+        response: Response,
         repo: SQLRepository = Depends(get_chamado_repository),
-        current_user: dict = Depends(get_current_active_user)
+        current_user: dict = Depends(get_current_active_user),
+        if_none_match: Optional[str] = Header(None, description="ETag do chamado já recebido."),
 ):
-    chamado_encontrado = repo.get_chamado_by_id(chamado_id)
-    if not chamado_encontrado:
+    """
+    Retorna o chamado com suas visitas.
+    Se o ETag enviado em If-None-Match ainda for o atual, responde 304 consultando apenas a versão do chamado.
+    """
+    versao_atual = repo.get_chamado_versao(chamado_id)
+    if not versao_atual:
         raise HTTPException(status_code=404, detail="Chamado não encontrado ou cancelado.")
 
-    user_id = current_user.get("user_id")
-    user_role = current_user.get("role")
-    if user_role == "tecnico" and chamado_encontrado.id_tecnico_atribuido != user_id:
+    if current_user.get("role") == "tecnico" and versao_atual.id_tecnico_atribuido != current_user.get("user_id"):
         raise HTTPException(status_code=403, detail="Acesso negado a este chamado.")
 
+    if etag_corresponde(if_none_match, gerar_etag(versao_atual.versao)):
+        return _nao_modificado(gerar_etag(versao_atual.versao))
+
+    chamado_encontrado = obter_chamado_serializado(repo, chamado_id, versao_atual.versao)
+    if not chamado_encontrado:
+        raise HTTPException(status_code=404, detail="Chamado não encontrado ou cancelado.")
+
+    _definir_etag(response, gerar_etag(chamado_encontrado.versao))
     return chamado_encontrado
 
 
@@ -102,15 +166,19 @@ def get_chamado_por_id(
 def update_chamado(
         chamado_id: int,
         chamado_in: ChamadoUpdate,
+        response: Response,
         repo: SQLRepository = Depends(get_chamado_repository),
         tecnico_repo: SQLRepository = Depends(get_tecnico_repository),
-        current_user: dict = Depends(get_current_active_user)
+        current_user: dict = Depends(get_current_active_user),
+        if_match: Optional[str] = Header(None, description="ETag do chamado lido; a atualização falha com 409 se ele mudou."),
 ):
     """
     O administrador atualiza qualquer dado de um chamado.
     Esse endpoint é utilizado também para atribuir um técnico e uma data de agendamento caso não tenham sido atribuídos na criação do chamado.
     Também permite o administrador reabrir o chamado se necessário.
+    Com o cabeçalho If-Match, a atualização só é aplicada se o chamado não tiver sido alterado desde a leitura.
     """
+    versao_esperada = versao_do_if_match(if_match)
     update_data = chamado_in.model_dump(exclude_unset=True)
     if not update_data:
         raise HTTPException(status_code=400, detail="Nenhum dado para atualizar foi fornecido.")
@@ -141,13 +209,7 @@ def update_chamado(
 
     novo_status = update_data.get("status")
     if novo_status:
-        if novo_status == StatusChamado.FINALIZADO:
-            if user_role != "admin":
-                raise HTTPException(status_code=403,
-                                    detail="Técnicos devem finalizar o chamado através da atualização da visita.")
-            update_data['data_conclusao'] = date.today()
-        elif novo_status != StatusChamado.FINALIZADO:
-            update_data['data_conclusao'] = None
+        update_data.update(dados_mudanca_status(novo_status, user_role))
 
     novo_status = update_data.get("status")
     if novo_status == "Finalizado":
@@ -155,10 +217,21 @@ def update_chamado(
     elif novo_status != "Finalizado":
         update_data['data_conclusao'] = None
 
-    updated_chamado = repo.update_chamado(chamado_id, update_data)
+    id_tecnico_anterior = None
+    chamado_antes = None
+    if 'id_tecnico_atribuido' in update_data or 'status' in update_data:
+        chamado_antes = repo.get_chamado_resumo(chamado_id)
+        if chamado_antes and 'id_tecnico_atribuido' in update_data:
+            id_tecnico_anterior = chamado_antes.id_tecnico_atribuido
+
+    updated_chamado = repo.update_chamado(chamado_id, update_data, versao_esperada=versao_esperada)
     if updated_chamado is None:
         raise HTTPException(status_code=404, detail="Chamado não encontrado.")
 
+    if chamado_antes:
+        registrar_transicao_status(chamado_antes.status, updated_chamado.status)
+    publicar_evento_chamado("chamado_atualizado", updated_chamado, id_tecnico_anterior=id_tecnico_anterior)
+    response.headers["ETag"] = gerar_etag(updated_chamado.versao)
     return updated_chamado
 
 
@@ -172,6 +245,7 @@ def delete_chamado(
     if not success:
         raise HTTPException(status_code=404, detail="Chamado não encontrado")
 
+    publicar_evento_chamado("chamado_cancelado", repo.get_chamado_resumo(chamado_id))
     return Response(status_code=204)
 
 
@@ -179,6 +253,7 @@ def delete_chamado(
 def add_visita_ao_chamado(
         chamado_id: int,
         visita_in: VisitaCreate,
+        response: Response,
         repo: SQLRepository = Depends(get_chamado_repository),
         current_user: dict = Depends(get_current_active_user),
 ):
@@ -186,33 +261,9 @@ def add_visita_ao_chamado(
     Adiciona uma nova visita ao chamado.
     Requer que o usuário esteja autenticado com um token JWT válido
     """
-    logged_user_id = current_user["user_id"]
-
-    chamado = repo.get_chamado_by_id(chamado_id)
-    if not chamado or chamado.is_cancelled:
-        raise HTTPException(status_code=404, detail="Chamado não encontrado")
-
-    if chamado.id_tecnico_atribuido != logged_user_id:
-        if current_user.get("role") != "admin":
-            raise HTTPException(status_code=403,
-                                detail="Você não tem permissão para adicionar uma visita neste chamado.")
-
-    if visita_in.servico_finalizado:
-        raise HTTPException(status_code=400,
-                            detail="Não é possível criar uma visita já finalizada. Crie a visita, faça os uploads e depois finalize-a.")
-
-    visita_data = visita_in.model_dump()
-    visita_db = repo.create_visita(chamado_id, visita_data)
-
-    dados_update_chamado = {}
-    if visita_in.pendencia:
-        dados_update_chamado['status'] = StatusChamado.PENDENTE
-    elif chamado.status == StatusChamado.AGENDADO:
-        dados_update_chamado['status'] = StatusChamado.EM_ATENDIMENTO
-
-    if dados_update_chamado:
-        repo.update_chamado(chamado_id, dados_update_chamado)
+    visita_db = ChamadoService(repo).adicionar_visita(chamado_id, visita_in, current_user)
 
+    response.headers["ETag"] = gerar_etag(visita_db.versao)
     return visita_db
 
 
@@ -230,37 +281,61 @@ def _find_visit(chamado: dict, visita_id: int) -> tuple[int, dict]:
     return visita_index, visita_para_atualizar
 
 
+@router.get("/{chamado_id}/visitas/{visita_id}", response_model=Visita)
+def get_visita_do_chamado(
+        chamado_id: int,
+        visita_id: int,
+        response: Response,
+        repo: SQLRepository = Depends(get_chamado_repository),
+        current_user: dict = Depends(get_current_active_user),
+        if_none_match: Optional[str] = Header(None, description="ETag da visita já recebida."),
+):
+    """
+    Retorna uma visita do chamado.
+    Se o ETag enviado em If-None-Match ainda for o atual, responde 304 sem carregar os serviços e materiais da visita.
+    """
+    versao_atual = repo.get_visita_versao(visita_id)
+    if not versao_atual or versao_atual.id_os != chamado_id or versao_atual.is_cancelled:
+        raise HTTPException(status_code=404, detail=f"Visita com ID {visita_id} não encontrada.")
+
+    if current_user.get("role") == "tecnico" and versao_atual.id_tecnico_atribuido != current_user.get("user_id"):
+        raise HTTPException(status_code=403, detail="Acesso negado a esta visita.")
+
+    if etag_corresponde(if_none_match, gerar_etag(versao_atual.versao)):
+        return _nao_modificado(gerar_etag(versao_atual.versao))
+
+    visita_db = repo.get_visita_by_id(visita_id)
+    _definir_etag(response, gerar_etag(visita_db.versao))
+    return visita_db
+
+
 @router.patch("/{chamado_id}/visitas/{visita_id}", response_model=Visita)
 def update_visita_em_chamado(
         chamado_id: int,
         visita_id: int,
         visita_in: VisitaUpdate,
+        response: Response,
         repo: SQLRepository = Depends(get_chamado_repository),
-        current_user: dict = Depends(get_current_active_user)
+        current_user: dict = Depends(get_current_active_user),
+        if_match: Optional[str] = Header(None, description="ETag da visita lida; a atualização falha com 409 se ela mudou."),
 ):
     """
     Valida as regras de negócio para finalização e atualiza o status do chamado pai.
     Permite ao técnico corrigir campos preenchidos de forma incorreta como KM, materiais, descrição, etc.
+    Com o cabeçalho If-Match, a atualização só é aplicada se a visita não tiver sido alterada desde a leitura.
     """
-    chamado = repo.get_chamado_by_id(chamado_id)
-    if not chamado or chamado.is_cancelled:
-        raise HTTPException(status_code=404, detail="Chamado não encontrado ou cancelado")
-
-    logged_user_id = current_user.get("user_id")
-    user_role = current_user.get("role")
-    if user_role == "tecnico" and chamado.id_tecnico_atribuido != logged_user_id:
-        raise HTTPException(status_code=403, detail="Você não tem permissão para editar visitas deste chamado.")
-
-    updated_visita = repo.update_visita_e_chamado(visita_id, chamado_id, visita_in)
-    if updated_visita is None:
-        raise HTTPException(status_code=404, detail="Erro ao atualizar visita.")
+    versao_esperada = versao_do_if_match(if_match)
+    updated_visita = ChamadoService(repo).atualizar_visita(chamado_id, visita_id, visita_in, current_user,
+                                                           versao_esperada=versao_esperada)
 
+    response.headers["ETag"] = gerar_etag(updated_visita.versao)
     return updated_visita
 
 
 @router.post("/{chamado_id}/iniciar-atendimento", response_model=Chamado)
 def tecnico_inicia_atendimento(
         chamado_id: int,
+        response: Response,
         repo: SQLRepository = Depends(get_chamado_repository),
         current_user: dict = Depends(require_technician_role)
 ):
@@ -281,29 +356,42 @@ def tecnico_inicia_atendimento(
                             detail=f"Não é possível iniciar um chamado com status '{chamado.status}'")
 
     update_data = {"status": StatusChamado.EM_ATENDIMENTO}
-    updated_chamado = repo.update_chamado(chamado_id, update_data)
+    status_anterior = chamado.status
+    updated_chamado = repo.update_chamado(chamado_id, update_data, versao_esperada=chamado.versao)
+    registrar_transicao_status(status_anterior, updated_chamado.status)
+    publicar_evento_chamado("status_alterado", updated_chamado)
 
+    response.headers["ETag"] = gerar_etag(updated_chamado.versao)
     return updated_chamado
 
 
 @router.get("/{chamado_id}/custos", response_model=CustoTotalResponse)
 def get_custos_do_chamado(
         chamado_id: int,
+        response: Response,
         repo: SQLRepository = Depends(get_chamado_repository),
-        current_user: dict = Depends(get_current_active_user)
+        current_user: dict = Depends(get_current_active_user),
+        if_none_match: Optional[str] = Header(None, description="ETag dos custos já recebidos."),
 ):
-    chamado = repo.get_chamado_by_id(chamado_id)
-    if not chamado or chamado.is_cancelled:
+    """
+    Calcula os custos do chamado. Os custos dependem apenas da árvore do chamado, então usam o mesmo ETag (versão) dele.
+    """
+    versao_atual = repo.get_chamado_versao(chamado_id)
+    if not versao_atual or versao_atual.is_cancelled:
         raise HTTPException(status_code=404, detail="Chamado não encontrado ou cancelado.")
 
-    user_id = current_user.get("user_id")
-    user_role = current_user.get("role")
-    if user_role == "tecnico" and chamado.id_tecnico_atribuido != user_id:
+    if current_user.get("role") == "tecnico" and versao_atual.id_tecnico_atribuido != current_user.get("user_id"):
         raise HTTPException(status_code=403, detail="Acesso negado aos custos deste chamado.")
 
-    service = CustoService()
-    chamado_dict = Chamado.model_validate(chamado).model_dump()
-    custos = service.calcular_custo_chamado(chamado_dict)
+    etag = gerar_etag(versao_atual.versao)
+    if etag_corresponde(if_none_match, etag):
+        return _nao_modificado(etag)
+
+    custos = calcular_custos_chamado(repo, chamado_id, versao_atual.versao)
+    if custos is None:
+        raise HTTPException(status_code=404, detail="Chamado não encontrado ou cancelado.")
+
+    _definir_etag(response, etag)
     return custos
 
 
@@ -311,6 +399,7 @@ def get_custos_do_chamado(
 def upload_file_visita(
         chamado_id: int,
         visita_id: int,
+        response: Response,
         repo: SQLRepository = Depends(get_chamado_repository),
         current_user: dict = Depends(get_current_active_user),
         file: UploadFile = File(...),
@@ -345,14 +434,13 @@ def upload_file_visita(
     prefixo_nome_arquivo = f"chamado_{chamado_id}_visita_{visita_id}_{file_type}"
     file_url = save_upload_file(file, prefixo_nome_arquivo)
 
-    visita_para_atualizar = {}
-    if file_type in SINGLE_FILE_FIELDS:
-        visita_para_atualizar[file_type] = file_url
-    elif file_type in MULTI_FILE_FIELDS:
-        current_list = getattr(visita_db, file_type) or []
-        if not isinstance(current_list, list): current_list = []
-        current_list.append(file_url)
-        visita_para_atualizar[file_type] = current_list
+    if file_type in MULTI_FILE_FIELDS:
+        # O append é feito pelo próprio banco para não perder URLs de uploads simultâneos na mesma visita
+        repo.append_visita_file_url(visita_id, file_type, file_url)
+        visita_atualizada = repo.get_visita_by_id(visita_id)
+    else:
+        visita_atualizada = repo.update_visita(visita_id, {file_type: file_url})
 
-    visita_atualizada = repo.update_visita(visita_id, visita_para_atualizar)
+    publicar_evento_chamado("visita_atualizada", repo.get_chamado_resumo(chamado_id))
+    response.headers["ETag"] = gerar_etag(visita_atualizada.versao)
     return visita_atualizada
@@ -1,17 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File
 from typing import List, Optional
 from sqlalchemy.orm import Session
 from app.schemas.cliente import Cliente, ClienteCreate, ClienteUpdate
+from app.schemas.importacao import RelatorioImportacao
+from app.services.importacao_service import detectar_formato, ler_registros, importar_clientes as importar_clientes_arquivo
 from app.repositories.mysql_repository import SQLRepository
+from app.repositories.fabrica import criar_repositorio
 from app.core.security import require_admin_role, get_current_active_user
 from app.db.database import get_db
+from app.core.medicao import RotaMedida
 
-router = APIRouter()
+router = APIRouter(route_class=RotaMedida)
 
 
 def get_cliente_repository(db: Session = Depends(get_db)):
     """Dependência para criar e retornar uma instância do SQLRepository com uma sessão do banco de dados."""
-    return SQLRepository(db=db)
+    return criar_repositorio(db)
 
 
 @router.post("/", response_model=Cliente, status_code=201)
@@ -25,13 +29,30 @@ def create_cliente(
     return cliente_criado_db
 
 
+@router.post("/importar", response_model=RelatorioImportacao)
+def importar_clientes(
+        arquivo: UploadFile = File(..., description="Arquivo .csv, .json (lista) ou .ndjson com os clientes"),
+        repo: SQLRepository = Depends(get_cliente_repository),
+        admin_user: dict = Depends(require_admin_role)
+):
+    """
+    Cadastro em massa de clientes. Clientes com um 'codigo' já cadastrado são atualizados.
+    Cada registro é validado como no cadastro individual; os inválidos aparecem no relatório com a linha e o motivo,
+    sem impedir a importação dos demais.
+    """
+    formato = detectar_formato(arquivo.filename, arquivo.content_type)
+    return importar_clientes_arquivo(repo, ler_registros(arquivo.file, formato))
+
+
 @router.get("/", response_model=List[Cliente])
 def get_todos_clientes(
         repo: SQLRepository = Depends(get_cliente_repository),
         is_active: Optional[bool] = Query(None, description="Filtra clientes pelo status de atividade"),
+        apos: Optional[int] = Query(None, description="Paginação: id do último cliente da página anterior"),
+        limite: Optional[int] = Query(None, ge=1, le=500, description="Paginação: quantidade máxima de clientes"),
         admin_user: dict = Depends(require_admin_role)
 ):
-    clientes_list = repo.get_clientes(is_active=is_active)
+    clientes_list = repo.get_clientes(is_active=is_active, apos=apos, limite=limite)
     return clientes_list
 
 
@@ -0,0 +1,22 @@
+import os
+from fastapi import APIRouter, Depends
+from app.core.cache import obter_cache_entidades
+from app.core.medicao import RotaMedida
+from app.core.security import require_admin_role
+from app.core.singleflight import SingleFlight
+from app.schemas.estatisticas import EstatisticasWorker
+
+router = APIRouter(route_class=RotaMedida)
+
+
+@router.get("/", response_model=EstatisticasWorker)
+def get_estatisticas(_admin_user: dict = Depends(require_admin_role)):
+    """
+    Contadores em memória do worker que atendeu: chamadas coalescidas pelo SingleFlight (no total e por chave) e o
+    cache de clientes e técnicos. Com vários workers, cada um responde pelos seus; a soma de todos está no /metrics.
+    """
+    return EstatisticasWorker(
+        pid=os.getpid(),
+        singleflight=[singleflight.estatisticas() for singleflight in SingleFlight.instancias],
+        cache_entidades=obter_cache_entidades().estatisticas(),
+    )
@@ -0,0 +1,69 @@
+import asyncio
+import json
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from app.core.ciclo_vida import ao_encerrar
+from app.core.config import EVENTOS_FILA_MAX
+from app.core.eventos import obter_backend_eventos
+from app.core.security import get_current_active_user
+from app.services.evento_service import CANAL_CHAMADOS, evento_visivel_para
+from app.core.medicao import RotaMedida
+
+router = APIRouter(route_class=RotaMedida)
+
+INTERVALO_KEEP_ALIVE_SEGUNDOS = 15
+
+
+def _enfileirar(fila: asyncio.Queue, evento: dict) -> None:
+    """Coloca o evento na fila do cliente; se ele estiver lento demais, descarta o evento mais antigo."""
+    if fila.full():
+        fila.get_nowait()
+    fila.put_nowait(evento)
+
+
+@router.get("/chamados")
+async def stream_eventos_chamados(
+        request: Request,
+        current_user: dict = Depends(get_current_active_user)
+):
+    """
+    Stream (Server-Sent Events) com as alterações dos chamados, para os painéis não precisarem consultar a listagem
+    periodicamente. Administradores recebem todos os eventos; técnicos, apenas os dos seus chamados.
+    Cada evento traz o id do chamado, o status e a versão atual (que é o ETag de GET /chamados/{id}).
+    """
+    loop = asyncio.get_running_loop()
+    fila: asyncio.Queue = asyncio.Queue(maxsize=EVENTOS_FILA_MAX)
+
+    def ao_receber(evento: dict) -> None:
+        # Chamado na thread que publicou o evento; a fila só pode ser usada pelo event loop
+        if evento_visivel_para(evento, current_user):
+            try:
+                loop.call_soon_threadsafe(_enfileirar, fila, evento)
+            except RuntimeError:
+                pass  # Event loop já encerrado; a assinatura é cancelada no finally abaixo
+
+    cancelar_assinatura = obter_backend_eventos().assinar(CANAL_CHAMADOS, ao_receber)
+    # Na parada do servidor o stream é fechado (None na fila) para não segurar o worker; o cliente reconecta em outro
+    cancelar_aviso = ao_encerrar(lambda: loop.call_soon_threadsafe(_enfileirar, fila, None))
+
+    async def gerar_eventos():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    evento = await asyncio.wait_for(fila.get(), timeout=INTERVALO_KEEP_ALIVE_SEGUNDOS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if evento is None:
+                    break
+                yield f"event: {evento['tipo']}\ndata: {json.dumps(evento, default=str)}\n\n"
+        finally:
+            cancelar_assinatura()
+            cancelar_aviso()
+
+    return StreamingResponse(
+        gerar_eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,56 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from app.core.medicao import RotaMedida
+from app.core.perfilador import ConfiguracaoPerfilador, obter_perfilador
+from app.core.security import require_admin_role
+from app.schemas.perfilador import ArquivoPerfil, ConfiguracaoPerfiladorSchema, EstadoPerfilador
+
+router = APIRouter(route_class=RotaMedida)
+
+
+def _estado() -> EstadoPerfilador:
+    perfilador = obter_perfilador()
+    arquivos = []
+    for caminho in perfilador.arquivos():
+        info = caminho.stat()
+        arquivos.append(ArquivoPerfil(nome=caminho.name, bytes=info.st_size,
+                                      criado_em=datetime.fromtimestamp(info.st_mtime)))
+    return EstadoPerfilador(
+        configuracao=ConfiguracaoPerfiladorSchema.model_validate(perfilador.configuracao),
+        diretorio=str(perfilador.diretorio),
+        max_arquivos=perfilador.max_arquivos,
+        arquivos=arquivos,
+    )
+
+
+@router.get("/", response_model=EstadoPerfilador)
+def get_perfilador(_admin_user: dict = Depends(require_admin_role)):
+    """
+    Configuração da amostragem e perfis gravados. Cada worker tem a sua configuração e os seus perfis; com vários
+    workers, prefira PERFILADOR_A_CADA/PERFILADOR_ROTAS no ambiente ou o cabeçalho 'X-Perfilar: 1'.
+    """
+    return _estado()
+
+
+@router.put("/", response_model=EstadoPerfilador)
+def configurar_perfilador(
+        configuracao_in: ConfiguracaoPerfiladorSchema,
+        _admin_user: dict = Depends(require_admin_role)
+):
+    """Altera, sem reiniciar a API, quais requisições este worker perfila."""
+    obter_perfilador().configuracao = ConfiguracaoPerfilador(a_cada=configuracao_in.a_cada,
+                                                             rotas=list(configuracao_in.rotas))
+    return _estado()
+
+
+@router.get("/{nome}")
+def baixar_perfil(nome: str, _admin_user: dict = Depends(require_admin_role)):
+    """
+    Perfil no formato 'collapsed stacks' (uma pilha por linha com o número de amostras), aceito pelo speedscope
+    (https://www.speedscope.app) e pelo flamegraph.pl.
+    """
+    caminho = obter_perfilador().arquivo(nome)
+    if caminho is None:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado.")
+    return FileResponse(caminho, media_type="text/plain", filename=nome)
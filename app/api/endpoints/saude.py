@@ -0,0 +1,74 @@
+import threading
+import anyio
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from app.core.ciclo_vida import encerrando
+from app.core.config import SAUDE_TEMPO_LIMITE_SEGUNDOS, SAUDE_VERIFICACOES_SIMULTANEAS
+from app.core.disjuntor import CircuitoAberto
+from app.db.database import disjuntor_banco, engine
+
+router = APIRouter()
+
+# Threads próprias para a verificação: com o threadpool dos endpoints (do tamanho do pool do banco) tomado por
+# requisições presas no banco, a sonda esperaria na mesma fila e o balanceador veria um timeout em vez do 503
+_limitador_verificacoes = anyio.CapacityLimiter(SAUDE_VERIFICACOES_SIMULTANEAS)
+# Uma verificação abandonada pelo tempo limite continua na thread até o banco responder (e já devolveu a vaga do
+# limitador): a contagem abaixo evita que sondas repetidas contra um banco travado acumulem threads
+_verificacoes_em_andamento = 0
+_lock = threading.Lock()
+
+
+def _verificar_banco() -> None:
+    """SELECT 1 passando pelo disjuntor (que, aberto, recusa na hora e, meio aberto, usa esta chamada como teste)."""
+    global _verificacoes_em_andamento
+    with _lock:
+        _verificacoes_em_andamento += 1
+    try:
+        disjuntor_banco.permitir()
+        with engine.connect() as conexao:
+            conexao.execute(text("SELECT 1"))
+    finally:
+        with _lock:
+            _verificacoes_em_andamento -= 1
+
+
+def _indisponivel(motivo: str, headers: dict = None) -> JSONResponse:
+    return JSONResponse({"status": "indisponivel", "banco": disjuntor_banco.estado, "motivo": motivo},
+                        status_code=503, headers=headers)
+
+
+@router.get("/live")
+async def vivo():
+    """
+    Liveness: o processo está de pé e o event loop responde. Não consulta o banco, para que uma queda do MySQL não faça
+    o orquestrador reiniciar todos os workers.
+    """
+    return {"status": "vivo"}
+
+
+@router.get("/ready")
+async def pronto():
+    """
+    Readiness: o worker consegue atender requisições que usam o banco. Com o disjuntor aberto responde 503 na hora,
+    para que o balanceador tire o worker de rotação até o banco voltar; se o banco não responder em
+    SAUDE_TEMPO_LIMITE_SEGUNDOS, também. Depois do sinal de parada também responde 503, enquanto as requisições em
+    andamento terminam.
+    """
+    if encerrando():
+        return JSONResponse({"status": "encerrando"}, status_code=503)
+    if engine is None:
+        return {"status": "pronto", "banco": "memoria"}
+    if _verificacoes_em_andamento >= SAUDE_VERIFICACOES_SIMULTANEAS:
+        return _indisponivel("verificações anteriores do banco ainda sem resposta")
+    try:
+        with anyio.fail_after(SAUDE_TEMPO_LIMITE_SEGUNDOS):
+            await anyio.to_thread.run_sync(_verificar_banco, abandon_on_cancel=True, limiter=_limitador_verificacoes)
+    except TimeoutError:
+        return _indisponivel(f"o banco não respondeu em {SAUDE_TEMPO_LIMITE_SEGUNDOS:g}s")
+    except CircuitoAberto as e:
+        return _indisponivel("disjuntor aberto", headers={"Retry-After": str(e.tentar_em)})
+    except DBAPIError:
+        return _indisponivel("falha ao consultar o banco")
+    return {"status": "pronto", "banco": disjuntor_banco.estado}
@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.core.config import SYNC_MARGEM_SEGUNDOS
+from app.core.security import get_current_active_user
+from app.db.database import get_db
+from app.models.chamado import OrdemServico
+from app.repositories.mysql_repository import SQLRepository
+from app.repositories.fabrica import criar_repositorio
+from app.schemas.sync import SyncResponse, RemovidosSync, LoteSyncRequest, LoteSyncResponse
+from app.services.chamado_service import ChamadoService
+from app.core.medicao import RotaMedida
+
+router = APIRouter(route_class=RotaMedida)
+
+
+def get_sync_repository(db: Session = Depends(get_db)):
+    return criar_repositorio(db)
+
+
+def _ler_cursor(since: Optional[str]) -> Optional[datetime]:
+    if not since:
+        return None
+    try:
+        desde = datetime.fromisoformat(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Cursor de sincronização inválido: '{since}'.")
+    # As datas do banco não têm fuso: um cursor com fuso (ex: '...+00:00') é convertido para UTC sem fuso
+    if desde.tzinfo is not None:
+        desde = desde.astimezone(timezone.utc).replace(tzinfo=None)
+    return desde
+
+
+@router.get("/", response_model=SyncResponse)
+def sincronizar(
+        since: Optional[str] = Query(None, description="Cursor retornado pela sincronização anterior. Vazio na primeira."),
+        repo: SQLRepository = Depends(get_sync_repository),
+        current_user: dict = Depends(get_current_active_user)
+):
+    """
+    Retorna apenas o que mudou desde o cursor: chamados, visitas e clientes alterados, e os ids que devem ser removidos.
+    Técnicos recebem somente o que pertence aos chamados atribuídos a eles; administradores recebem tudo.
+    Sem cursor, retorna o escopo completo (carga inicial do aplicativo).
+    """
+    desde = _ler_cursor(since)
+    id_tecnico = current_user.get("user_id") if current_user.get("role") == "tecnico" else None
+
+    # O cursor é gerado antes das consultas e recuado pela margem, para que alterações feitas durante a sincronização
+    # (ou em transações ainda abertas) apareçam de novo na próxima chamada em vez de se perderem.
+    proximo_cursor = repo.get_agora_banco() - timedelta(seconds=SYNC_MARGEM_SEGUNDOS)
+
+    chamados = repo.get_chamados_alterados(desde, id_tecnico)
+    visitas = repo.get_visitas_alteradas(desde, id_tecnico)
+    ids_clientes_dos_chamados = {chamado.id_cliente for chamado in chamados if not chamado.is_cancelled}
+    clientes = repo.get_clientes_alterados(desde, id_tecnico, ids_incluir=ids_clientes_dos_chamados)
+
+    removidos = RemovidosSync(
+        chamados=[chamado.id_os for chamado in chamados if chamado.is_cancelled],
+        clientes=[cliente.id_cliente for cliente in clientes if not cliente.is_active],
+    )
+    if id_tecnico is not None:
+        ids_ainda_no_escopo = {chamado.id_os for chamado in chamados if not chamado.is_cancelled}
+        for id_os in repo.get_remocoes_sync(desde, id_tecnico, OrdemServico.__tablename__):
+            if id_os not in ids_ainda_no_escopo and id_os not in removidos.chamados:
+                removidos.chamados.append(id_os)
+
+    tecnico = None
+    if id_tecnico is not None:
+        tecnico_db = repo.get_tecnico_by_id(id_tecnico)
+        if tecnico_db and (desde is None or tecnico_db.updated_at >= desde):
+            tecnico = tecnico_db
+
+    return SyncResponse(
+        cursor=proximo_cursor.isoformat(),
+        chamados=[chamado for chamado in chamados if not chamado.is_cancelled],
+        visitas=[visita for visita in visitas if visita.ordem_servico and not visita.ordem_servico.is_cancelled],
+        clientes=[cliente for cliente in clientes if cliente.is_active],
+        tecnico=tecnico,
+        removidos=removidos,
+    )
+
+
+@router.post("/lote", response_model=LoteSyncResponse)
+def sincronizar_lote(
+        lote_in: LoteSyncRequest,
+        repo: SQLRepository = Depends(get_sync_repository),
+        current_user: dict = Depends(get_current_active_user)
+):
+    """
+    Envia de uma vez as operações feitas offline pelo técnico (novas visitas, correções de visitas e mudanças de status).
+    As operações são validadas com as mesmas regras dos endpoints individuais e aplicadas em ordem em uma única transação.
+    Uma operação inválida não impede as demais: cada uma tem o seu resultado na resposta, na mesma ordem do envio.
+    """
+    service = ChamadoService(repo)
+    return LoteSyncResponse(resultados=service.aplicar_lote(lote_in.operacoes, current_user))
@@ -1,19 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, Response, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, Query, UploadFile, File
 from typing import List, Optional
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.repositories.mysql_repository import SQLRepository
+from app.repositories.fabrica import criar_repositorio
 from app.schemas.base_schemas import UserRole
 from app.schemas.tecnico import Tecnico, TecnicoCreate, TecnicoUpdate
 from app.core.security import hash_password, require_admin_role, get_current_active_user, verify_password
 from app.schemas.token import PasswordUpdate
+from app.schemas.importacao import RelatorioImportacao
+from app.services.importacao_service import detectar_formato, ler_registros, importar_tecnicos as importar_tecnicos_arquivo
+from app.core.medicao import RotaMedida
 
-router = APIRouter()
+router = APIRouter(route_class=RotaMedida)
 
 
 def get_tecnico_repository(db: Session = Depends(get_db)):
     """Dependência para criar e retornar uma instância do SQLRepository com uma sessão do banco de dados."""
-    return SQLRepository(db=db)
+    return criar_repositorio(db)
 
 
 @router.post("/", response_model=Tecnico, status_code=201)
@@ -31,13 +35,30 @@ def create_tecnico(
     return tecnico_criado_db
 
 
+@router.post("/importar", response_model=RelatorioImportacao)
+def importar_tecnicos(
+        arquivo: UploadFile = File(..., description="Arquivo .csv, .json (lista) ou .ndjson com os técnicos"),
+        repo: SQLRepository = Depends(get_tecnico_repository),
+        admin_user: dict = Depends(require_admin_role)
+):
+    """
+    Cadastro em massa de técnicos (com 'password' em texto, como no cadastro individual). Técnicos com um email já
+    cadastrado são atualizados, inclusive a senha. No CSV, os dados bancários usam colunas como 'dados_bancarios.banco'.
+    Os registros inválidos aparecem no relatório com a linha e o motivo, sem impedir a importação dos demais.
+    """
+    formato = detectar_formato(arquivo.filename, arquivo.content_type)
+    return importar_tecnicos_arquivo(repo, ler_registros(arquivo.file, formato))
+
+
 @router.get("/", response_model=List[Tecnico])
 def get_todos_tecnicos(
         repo: SQLRepository = Depends(get_tecnico_repository),
         is_active: Optional[bool] = Query(None, description="Filtra técnicos pelo status de atividade"),
+        apos: Optional[int] = Query(None, description="Paginação: id do último técnico da página anterior"),
+        limite: Optional[int] = Query(None, ge=1, le=500, description="Paginação: quantidade máxima de técnicos"),
         admin_user: dict = Depends(require_admin_role)
 ):
-    tecnicos_list = repo.get_tecnicos(is_active=is_active)
+    tecnicos_list = repo.get_tecnicos(is_active=is_active, apos=apos, limite=limite)
     return tecnicos_list
 
 
@@ -66,7 +87,7 @@ def update_tecnico(
     if not update_data:
         raise HTTPException(status_code=400, detail="Nenhum dado para atualizar foi fornecido.")
 
-    updated_tecnico = repo.update_tecnico(tecnico_id, update_data)
+    updated_tecnico = repo.update_tecnico(tecnico_id, tecnico_in)
     if updated_tecnico is None:
         raise HTTPException(status_code=404, detail="Técnico não encontrado.")
 
@@ -84,18 +105,15 @@ def update_current_user_password(
     """
     user_id = current_user.get("user_id")
 
-    user_db = repo.get_tecnico_by_id(user_id)
-    if not user_db:
+    current_hash = repo.get_senha_hash_tecnico(user_id)
+    if current_hash is None:
         raise HTTPException(status_code=404, detail="Usuário não encontrado.")
 
-    current_hash = user_db.password_hash
     if not verify_password(password_data.old_password, current_hash):
         raise HTTPException(status_code=400, detail="Senha antiga incorreta.")
 
     new_password_hash = hash_password(password_data.new_password)
-    user_db.password_hash = new_password_hash
-    repo.db.add(user_db)
-    repo.db.commit()
+    repo.update_tecnico_senha(user_id, new_password_hash)
 
     return Response(status_code=204)
 
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.endpoints import chamados, tecnicos, clientes, auth
+from app.api.endpoints import chamados, tecnicos, clientes, auth, sync, eventos, perfilador, estatisticas
 
 api_router = APIRouter()
 
@@ -7,3 +7,7 @@ api_router.include_router(auth.router, prefix="/auth", tags=["Auth"])
 api_router.include_router(chamados.router, prefix="/chamados", tags=["Chamados"])
 api_router.include_router(tecnicos.router, prefix="/tecnicos", tags=["Técnicos"])
 api_router.include_router(clientes.router, prefix="/clientes", tags=["Clientes"])
+api_router.include_router(sync.router, prefix="/sync", tags=["Sincronização"])
+api_router.include_router(eventos.router, prefix="/eventos", tags=["Eventos"])
+api_router.include_router(perfilador.router, prefix="/perfilador", tags=["Perfilador"])
+api_router.include_router(estatisticas.router, prefix="/estatisticas", tags=["Estatísticas"])
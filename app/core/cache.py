@@ -0,0 +1,160 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from app.core.config import CACHE_ENTIDADES_MAX_ITENS, CACHE_ENTIDADES_TTL_SEGUNDOS, CACHE_INVALIDACAO_DISTRIBUIDA
+from app.core.metricas import CACHE_CONSULTAS, CACHE_INVALIDACOES
+
+logger = logging.getLogger(__name__)
+
+CANAL_INVALIDACAO_CACHE = "cache_invalidacao"
+
+_AUSENTE = object()
+
+
+class CacheTTL:
+    """
+    Cache em memória com tempo de expiração e número máximo de itens (os menos usados saem primeiro).
+    As chaves são tuplas cujo primeiro elemento é o namespace (ex: a entidade), para que uma escrita invalide o namespace
+    inteiro. Cada namespace tem uma geração: quem leu do banco antes de uma invalidação não consegue gravar o valor antigo
+    no cache depois dela (ver 'geracao' e 'guardar').
+    Usado pelas threads do threadpool do FastAPI, então todo acesso é protegido por lock.
+    """
+
+    def __init__(self, max_itens: int = CACHE_ENTIDADES_MAX_ITENS, ttl_segundos: float = CACHE_ENTIDADES_TTL_SEGUNDOS,
+                 nome: str = "cache"):
+        self.nome = nome
+        self.max_itens = max_itens
+        self.ttl_segundos = ttl_segundos
+        self._lock = threading.Lock()
+        self._itens: "OrderedDict[Tuple[Hashable, ...], Tuple[float, Any]]" = OrderedDict()
+        self._geracoes: Dict[Hashable, int] = {}
+        self.acertos = 0
+        self.falhas = 0
+        self.expirados = 0
+        self.descartados = 0
+        self.invalidacoes = 0
+        self._metrica_acertos = CACHE_CONSULTAS.labels(cache=nome, resultado="acerto")
+        self._metrica_falhas = CACHE_CONSULTAS.labels(cache=nome, resultado="falha")
+        self._metrica_invalidacoes = CACHE_INVALIDACOES.labels(cache=nome)
+
+    @property
+    def ativo(self) -> bool:
+        return self.ttl_segundos > 0 and self.max_itens > 0
+
+    def geracao(self, namespace: Hashable) -> int:
+        with self._lock:
+            return self._geracoes.get(namespace, 0)
+
+    def buscar(self, chave: Tuple[Hashable, ...]) -> Any:
+        """Retorna o valor guardado ou None se não houver (ou se tiver expirado)."""
+        if not self.ativo:
+            return None
+        with self._lock:
+            item = self._itens.get(chave, _AUSENTE)
+            if item is _AUSENTE:
+                self.falhas += 1
+                self._metrica_falhas.inc()
+                return None
+            expira_em, valor = item
+            if expira_em <= time.monotonic():
+                del self._itens[chave]
+                self.expirados += 1
+                self.falhas += 1
+                self._metrica_falhas.inc()
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            self._metrica_acertos.inc()
+            return valor
+
+    def guardar(self, chave: Tuple[Hashable, ...], valor: Any, geracao: int) -> None:
+        """Guarda o valor, a menos que o namespace tenha sido invalidado depois de 'geracao' (valor lido do banco)."""
+        if not self.ativo:
+            return
+        with self._lock:
+            if self._geracoes.get(chave[0], 0) != geracao:
+                return
+            self._itens[chave] = (time.monotonic() + self.ttl_segundos, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self.descartados += 1
+
+    def invalidar(self, namespace: Hashable) -> None:
+        with self._lock:
+            self._geracoes[namespace] = self._geracoes.get(namespace, 0) + 1
+            for chave in [chave for chave in self._itens if chave[0] == namespace]:
+                del self._itens[chave]
+            self.invalidacoes += 1
+        self._metrica_invalidacoes.inc()
+
+    def limpar(self) -> None:
+        with self._lock:
+            for namespace in {chave[0] for chave in self._itens} | set(self._geracoes):
+                self._geracoes[namespace] = self._geracoes.get(namespace, 0) + 1
+            self._itens.clear()
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "itens": len(self._itens),
+                "max_itens": self.max_itens,
+                "ttl_segundos": self.ttl_segundos,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": round(self.acertos / consultas, 4) if consultas else 0.0,
+                "expirados": self.expirados,
+                "descartados": self.descartados,
+                "invalidacoes": self.invalidacoes,
+            }
+
+
+class CacheEntidades(CacheTTL):
+    """
+    Cache dos cadastros de referência (clientes e técnicos) usado pelo SQLRepository.
+    Com CACHE_INVALIDACAO_DISTRIBUIDA, as invalidações também são publicadas no backend de eventos, para que os outros
+    workers (com EVENTOS_BACKEND='redis') descartem as suas cópias. Sem isso, cada worker só enxerga as próprias
+    escritas até o TTL expirar.
+    """
+
+    def __init__(self, distribuida: bool = CACHE_INVALIDACAO_DISTRIBUIDA, **kwargs):
+        kwargs.setdefault("nome", "entidades")
+        super().__init__(**kwargs)
+        self.distribuida = distribuida
+        self._origem = f"{os.getpid()}-{uuid.uuid4().hex}"
+        if self.distribuida:
+            from app.core.eventos import obter_backend_eventos
+            obter_backend_eventos().assinar(CANAL_INVALIDACAO_CACHE, self._ao_receber_invalidacao)
+
+    def invalidar_e_avisar(self, namespace: str) -> None:
+        self.invalidar(namespace)
+        if not self.distribuida:
+            return
+        try:
+            from app.core.eventos import obter_backend_eventos
+            obter_backend_eventos().publicar(CANAL_INVALIDACAO_CACHE, {"namespace": namespace, "origem": self._origem})
+        except Exception:
+            logger.exception("Falha ao publicar a invalidação do cache '%s'", namespace)
+
+    def _ao_receber_invalidacao(self, mensagem: dict) -> None:
+        if mensagem.get("origem") != self._origem:
+            self.invalidar(mensagem.get("namespace"))
+
+
+_cache_entidades: Optional[CacheEntidades] = None
+_cache_lock = threading.Lock()
+
+
+def obter_cache_entidades() -> CacheEntidades:
+    """Retorna o cache de clientes e técnicos do worker, criado uma única vez."""
+    global _cache_entidades
+    if _cache_entidades is None:
+        with _cache_lock:
+            if _cache_entidades is None:
+                _cache_entidades = CacheEntidades()
+    return _cache_entidades
@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+from typing import Callable, List
+from anyio import to_thread
+from app.core.config import (AQUECIMENTO_CHAMADOS, AQUECIMENTO_CONEXOES, DB_POOL_OVERFLOW, DB_POOL_TAMANHO,
+                             THREADPOOL_TAMANHO)
+
+logger = logging.getLogger("app.ciclo_vida")
+
+# Loggers com registros INFO (uma linha por requisição, consultas lentas, etapas do aquecimento). O uvicorn não configura
+# o logger raiz, então sem isto só os avisos apareceriam
+LOGGERS_DA_APLICACAO = ("app.medicao", "app.consultas_lentas", "app.ciclo_vida")
+
+_encerrando = threading.Event()
+_ao_encerrar: List[Callable[[], None]] = []
+_lock = threading.Lock()
+
+
+def encerrando() -> bool:
+    """Verdadeiro depois que o servidor recebeu o sinal para parar (o /health/ready passa a responder 503)."""
+    return _encerrando.is_set()
+
+
+def ao_encerrar(callback: Callable[[], None]) -> Callable[[], None]:
+    """
+    Registra um callback chamado quando o encerramento começa (ex: fechar um stream SSE, que de outra forma seguraria o
+    worker até o fim do prazo de encerramento). Chamado no tratador do sinal, então deve só agendar o trabalho (ex:
+    loop.call_soon_threadsafe). Retorna a função que cancela o registro.
+    """
+    with _lock:
+        _ao_encerrar.append(callback)
+
+    def cancelar():
+        with _lock:
+            if callback in _ao_encerrar:
+                _ao_encerrar.remove(callback)
+    return cancelar
+
+
+def iniciar_encerramento() -> None:
+    _encerrando.set()
+    with _lock:
+        callbacks = list(_ao_encerrar)
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception:
+            logger.exception("Erro ao avisar o encerramento")
+
+
+def configurar_logs() -> None:
+    """Envia os loggers da aplicação para o stderr, uma mensagem por linha (várias são JSON). Chamada na subida."""
+    for nome in LOGGERS_DA_APLICACAO:
+        registrador = logging.getLogger(nome)
+        if registrador.handlers:
+            continue
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        registrador.addHandler(handler)
+        registrador.setLevel(logging.INFO)
+        registrador.propagate = False
+
+
+def tamanho_threadpool() -> int:
+    """
+    THREADPOOL_TAMANHO ou, se 0, o máximo de conexões do pool do banco (DB_POOL_TAMANHO + DB_POOL_OVERFLOW): com mais
+    threads que conexões, as requisições excedentes só ficariam presas na fila do pool, ocupando threads.
+    """
+    from app.db.database import engine
+
+    if THREADPOOL_TAMANHO:
+        return THREADPOOL_TAMANHO
+    if engine is not None and hasattr(engine.pool, "size"):
+        return DB_POOL_TAMANHO + DB_POOL_OVERFLOW
+    return int(to_thread.current_default_thread_limiter().total_tokens)
+
+
+def ajustar_threadpool() -> None:
+    """Ajusta o threadpool dos endpoints síncronos. Precisa rodar dentro do event loop (no lifespan)."""
+    to_thread.current_default_thread_limiter().total_tokens = tamanho_threadpool()
+
+
+def aquecer(app) -> None:
+    """
+    Paga na subida do worker os custos de primeira execução, para que eles não caiam nas primeiras requisições:
+    abre as conexões do pool, configura os mappers, gera o schema OpenAPI, compila as consultas das listagens e
+    serializa os resultados pelos schemas de resposta, preenchendo também o cache de clientes e técnicos.
+    Falhas (ex: banco fora do ar) só geram aviso: o worker sobe e o /health/ready mostra a situação do banco.
+    """
+    from sqlalchemy import text
+    from sqlalchemy.orm import configure_mappers
+    from app.db.database import SessionLocal, engine
+    from app.repositories.fabrica import criar_repositorio
+    from app.schemas.chamado import Chamado
+    from app.schemas.cliente import Cliente
+    from app.schemas.tecnico import Tecnico
+
+    def etapa(nome: str, funcao: Callable[[], None]) -> None:
+        inicio = time.perf_counter()
+        try:
+            funcao()
+        except Exception as e:
+            logger.warning("Aquecimento: %s falhou (%s: %s)", nome, type(e).__name__, e)
+            return
+        logger.info("Aquecimento: %s em %.0f ms", nome, (time.perf_counter() - inicio) * 1000)
+
+    def abrir_conexoes():
+        conexoes = []
+        try:
+            for _ in range(AQUECIMENTO_CONEXOES or DB_POOL_TAMANHO):
+                conexao = engine.connect()
+                conexoes.append(conexao)
+                conexao.execute(text("SELECT 1"))
+        finally:
+            for conexao in conexoes:
+                conexao.close()
+
+    def consultas_e_schemas():
+        db = SessionLocal() if engine is not None else None
+        try:
+            repo = criar_repositorio(db)
+            # Mesmos argumentos das listagens sem filtro, para que as chaves do cache sejam as das requisições
+            for tecnico in repo.get_tecnicos(is_active=None, apos=None, limite=None):
+                Tecnico.model_validate(tecnico).model_dump_json()
+            for cliente in repo.get_clientes(is_active=None, apos=None, limite=None):
+                Cliente.model_validate(cliente).model_dump_json()
+            for chamado in repo.get_chamados(limite=AQUECIMENTO_CHAMADOS):
+                Chamado.model_validate(chamado).model_dump_json()
+        finally:
+            if db is not None:
+                db.close()
+
+    if engine is not None:
+        etapa("conexões do pool", abrir_conexoes)
+        etapa("mappers", configure_mappers)
+    etapa("schema OpenAPI", app.openapi)
+    etapa("consultas, schemas e caches", consultas_e_schemas)
@@ -7,6 +7,108 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
+# Sobreposição (em segundos) aplicada ao cursor do /sync para não perder alterações de transações que ainda não tinham
+# feito commit quando o cursor foi gerado. Os itens repetidos são inofensivos, o aplicativo faz upsert pelo id.
+SYNC_MARGEM_SEGUNDOS = int(os.getenv("SYNC_MARGEM_SEGUNDOS", 5))
+
+# Idempotency-Key: onde as chaves ficam ('memoria' vale por worker, então o servidor de produção sobe um único worker;
+# com vários, use 'redis'), quantas chaves cada worker guarda na memória, por quanto tempo, quanto uma repetição
+# simultânea espera a original e por quanto tempo, no Redis, uma requisição em andamento segura a chave
+IDEMPOTENCIA_BACKEND = os.getenv("IDEMPOTENCIA_BACKEND", "memoria")
+IDEMPOTENCIA_REDIS_URL = os.getenv("IDEMPOTENCIA_REDIS_URL", os.getenv("EVENTOS_REDIS_URL", "redis://localhost:6379/0"))
+IDEMPOTENCIA_MAX_CHAVES = int(os.getenv("IDEMPOTENCIA_MAX_CHAVES", 10000))
+IDEMPOTENCIA_TTL_SEGUNDOS = int(os.getenv("IDEMPOTENCIA_TTL_SEGUNDOS", 24 * 60 * 60))
+IDEMPOTENCIA_ESPERA_SEGUNDOS = float(os.getenv("IDEMPOTENCIA_ESPERA_SEGUNDOS", 30))
+IDEMPOTENCIA_RESERVA_SEGUNDOS = int(os.getenv("IDEMPOTENCIA_RESERVA_SEGUNDOS", 300))
+
+# Pub/sub das alterações de chamados (SSE): 'memoria' atende um único worker; com vários workers, use 'redis'
+EVENTOS_BACKEND = os.getenv("EVENTOS_BACKEND", "memoria")
+EVENTOS_REDIS_URL = os.getenv("EVENTOS_REDIS_URL", "redis://localhost:6379/0")
+EVENTOS_FILA_MAX = int(os.getenv("EVENTOS_FILA_MAX", 1000))
+
+# Cache de clientes e técnicos no SQLRepository (TTL 0 desliga). Com vários workers, ative a invalidação distribuída
+# (usa o backend de eventos, então precisa de EVENTOS_BACKEND='redis') ou use um TTL curto
+CACHE_ENTIDADES_TTL_SEGUNDOS = float(os.getenv("CACHE_ENTIDADES_TTL_SEGUNDOS", 300))
+CACHE_ENTIDADES_MAX_ITENS = int(os.getenv("CACHE_ENTIDADES_MAX_ITENS", 1000))
+CACHE_INVALIDACAO_DISTRIBUIDA = os.getenv("CACHE_INVALIDACAO_DISTRIBUIDA", "false").lower() in ("1", "true", "sim")
+
+# Backend dos repositórios: 'mysql' (padrão) ou 'memoria', que roda a API sem banco (testes de carga e benchmarks do
+# framework). O backend em memória vale por processo, então use um único worker; REPOSITORIO_MEMORIA_ARQUIVO pode
+# apontar para um JSON com os dados iniciais ({"tecnicos": [...], "clientes": [...], "chamados": [...]})
+REPOSITORIO_BACKEND = os.getenv("REPOSITORIO_BACKEND", "mysql")
+REPOSITORIO_MEMORIA_ARQUIVO = os.getenv("REPOSITORIO_MEMORIA_ARQUIVO")
+
+# Importação em massa de clientes e técnicos: registros por transação e threads usadas para gerar os hashes das senhas
+IMPORTACAO_TAMANHO_LOTE = int(os.getenv("IMPORTACAO_TAMANHO_LOTE", 500))
+IMPORTACAO_THREADS_HASH = int(os.getenv("IMPORTACAO_THREADS_HASH", os.cpu_count() or 4))
+
+# Medição por requisição (cabeçalho Server-Timing e log JSON no logger 'app.medicao'). Requisições mais lentas que o
+# limite (em ms; 0 desliga) são registradas com a lista dos comandos SQL, guardando no máximo MEDICAO_MAX_COMANDOS
+MEDICAO_ATIVA = os.getenv("MEDICAO_ATIVA", "true").lower() in ("1", "true", "sim")
+MEDICAO_LIMITE_LENTA_MS = float(os.getenv("MEDICAO_LIMITE_LENTA_MS", 500))
+MEDICAO_MAX_COMANDOS = int(os.getenv("MEDICAO_MAX_COMANDOS", 200))
+
+# Endpoint /metrics (formato Prometheus). Com vários workers, defina também PROMETHEUS_MULTIPROC_DIR
+METRICAS_ATIVAS = os.getenv("METRICAS_ATIVAS", "true").lower() in ("1", "true", "sim")
+
+# Detecção de N+1 (desenvolvimento e CI): 'desligado', 'avisar' (log ao fim da requisição) ou 'erro' (a consulta que
+# atinge o limiar levanta ConsultasNMaisUm). Limiar = lazy loads do mesmo relacionamento a partir do mesmo local
+N_MAIS_UM_MODO = os.getenv("N_MAIS_UM_MODO", "desligado").lower()
+N_MAIS_UM_LIMIAR = int(os.getenv("N_MAIS_UM_LIMIAR", 3))
+
+# Perfilador por amostragem: perfila uma a cada PERFILADOR_A_CADA requisições (0 desliga) e as requisições cujos
+# caminhos começam com um dos prefixos de PERFILADOR_ROTAS (separados por vírgula); administradores também podem pedir o
+# perfil de uma requisição com o cabeçalho 'X-Perfilar: 1'. Os perfis (collapsed stacks, para flame graphs) ficam em
+# PERFILADOR_DIRETORIO, que guarda no máximo PERFILADOR_MAX_ARQUIVOS arquivos
+PERFILADOR_A_CADA = int(os.getenv("PERFILADOR_A_CADA", 0))
+PERFILADOR_ROTAS = os.getenv("PERFILADOR_ROTAS", "")
+PERFILADOR_DIRETORIO = os.getenv("PERFILADOR_DIRETORIO", "perfis")
+PERFILADOR_MAX_ARQUIVOS = int(os.getenv("PERFILADOR_MAX_ARQUIVOS", 100))
+PERFILADOR_INTERVALO_MS = float(os.getenv("PERFILADOR_INTERVALO_MS", 5))
+
+# Tempo limite dos SELECTs no servidor (MySQL: hint MAX_EXECUTION_TIME; MariaDB: max_statement_time), em ms (0 desliga).
+# CONSULTA_TEMPOS_LIMITE ajusta métodos específicos do repositório (ex: 'get_chamados=5000,get_chamados_alterados=20000').
+# Comandos mais lentos que CONSULTA_LENTA_MS (0 desliga) vão para o logger 'app.consultas_lentas'
+CONSULTA_TEMPO_LIMITE_MS = float(os.getenv("CONSULTA_TEMPO_LIMITE_MS", 10000))
+CONSULTA_TEMPOS_LIMITE = os.getenv("CONSULTA_TEMPOS_LIMITE", "")
+CONSULTA_LENTA_MS = float(os.getenv("CONSULTA_LENTA_MS", 200))
+
+# Repetição das transações de escrita desfeitas por deadlock ou espera por lock: tentativas no total e o backoff
+# exponencial (com jitter) entre elas, em ms
+REPETICAO_MAX_TENTATIVAS = int(os.getenv("REPETICAO_MAX_TENTATIVAS", 3))
+REPETICAO_ESPERA_BASE_MS = float(os.getenv("REPETICAO_ESPERA_BASE_MS", 50))
+REPETICAO_ESPERA_MAX_MS = float(os.getenv("REPETICAO_ESPERA_MAX_MS", 1000))
+
+# Disjuntor (circuit breaker) do banco: abre depois de DISJUNTOR_FALHAS falhas de conexão seguidas e, por
+# DISJUNTOR_ABERTO_SEGUNDOS, as requisições que usam o banco recebem 503 na hora em vez de esperar o timeout de conexão
+# (DB_TEMPO_CONEXAO_SEGUNDOS, aplicado ao MySQL/MariaDB)
+DISJUNTOR_FALHAS = int(os.getenv("DISJUNTOR_FALHAS", 5))
+DISJUNTOR_ABERTO_SEGUNDOS = float(os.getenv("DISJUNTOR_ABERTO_SEGUNDOS", 10))
+DB_TEMPO_CONEXAO_SEGUNDOS = int(os.getenv("DB_TEMPO_CONEXAO_SEGUNDOS", 5))
+
+# Tempo máximo da verificação do banco no /health/ready (acima disso responde 503) e quantas verificações podem estar
+# em andamento ao mesmo tempo, em threads próprias (fora do threadpool dos endpoints)
+SAUDE_TEMPO_LIMITE_SEGUNDOS = float(os.getenv("SAUDE_TEMPO_LIMITE_SEGUNDOS", 2))
+SAUDE_VERIFICACOES_SIMULTANEAS = int(os.getenv("SAUDE_VERIFICACOES_SIMULTANEAS", 2))
+
+# Pool de conexões do MySQL/MariaDB por worker e o threadpool dos endpoints síncronos (0 = o máximo de conexões do pool)
+DB_POOL_TAMANHO = int(os.getenv("DB_POOL_TAMANHO", 5))
+DB_POOL_OVERFLOW = int(os.getenv("DB_POOL_OVERFLOW", 10))
+THREADPOOL_TAMANHO = int(os.getenv("THREADPOOL_TAMANHO", 0))
+
+# Aquecimento na subida de cada worker: conexões abertas no pool (0 = DB_POOL_TAMANHO) e chamados lidos para compilar as
+# consultas e exercitar os schemas de resposta
+AQUECIMENTO_ATIVO = os.getenv("AQUECIMENTO_ATIVO", "true").lower() in ("1", "true", "sim")
+AQUECIMENTO_CONEXOES = int(os.getenv("AQUECIMENTO_CONEXOES", 0))
+AQUECIMENTO_CHAMADOS = int(os.getenv("AQUECIMENTO_CHAMADOS", 50))
+
+# Servidor de produção (python -m app.servidor): endereço, workers (0 = um por CPU) e o prazo, em segundos, para as
+# requisições em andamento (ex: uploads) terminarem depois do sinal de parada
+SERVIDOR_HOST = os.getenv("SERVIDOR_HOST", "0.0.0.0")
+SERVIDOR_PORTA = int(os.getenv("SERVIDOR_PORTA", 8000))
+SERVIDOR_WORKERS = int(os.getenv("SERVIDOR_WORKERS", 0))
+SERVIDOR_TEMPO_ENCERRAMENTO = int(os.getenv("SERVIDOR_TEMPO_ENCERRAMENTO", 30))
+
 if not SECRET_KEY:
     raise ValueError("SECRET_KEY não definida no .env. Crie um arquivo .env e crie uma SECRET_KEY.")
 
@@ -0,0 +1,130 @@
+import json
+import logging
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from app.core.config import CONSULTA_LENTA_MS, CONSULTA_TEMPO_LIMITE_MS, CONSULTA_TEMPOS_LIMITE
+from app.core.metricas import CONSULTAS_LENTAS, CONSULTAS_TEMPO_ESGOTADO
+
+logger = logging.getLogger("app.consultas_lentas")
+
+# Códigos de erro de consulta interrompida pelo limite de tempo: 3024 no MySQL, 1969 no MariaDB
+ERROS_TEMPO_ESGOTADO = (3024, 1969)
+
+
+def _ler_tempos_limite(texto: str) -> Dict[str, float]:
+    """'get_chamados=5000,get_chamados_alterados=20000' -> {'get_chamados': 5000.0, ...}"""
+    tempos = {}
+    for item in texto.split(","):
+        if "=" in item:
+            metodo, ms = item.split("=", 1)
+            tempos[metodo.strip()] = float(ms)
+    return tempos
+
+
+TEMPOS_LIMITE_POR_METODO = _ler_tempos_limite(CONSULTA_TEMPOS_LIMITE)
+
+# (método do repositório, tempo limite em ms) da chamada em andamento; só o método mais externo conta
+_metodo_atual: ContextVar[Optional[Tuple[str, float]]] = ContextVar("metodo_repositorio", default=None)
+
+
+def metodo_atual() -> Optional[str]:
+    atual = _metodo_atual.get()
+    return atual[0] if atual is not None else None
+
+
+def rastrear_metodos(cls):
+    """
+    Decorador de classe: cada método público passa a registrar o próprio nome (para o log de consultas lentas) e o tempo
+    limite dos SELECTs que executa (CONSULTA_TEMPOS_LIMITE ou, se o método não estiver lá, CONSULTA_TEMPO_LIMITE_MS).
+    Uma consulta interrompida pelo limite vira HTTP 503, em vez de segurar a conexão do pool até terminar.
+    """
+    for nome, funcao in list(vars(cls).items()):
+        if nome.startswith("_") or not callable(funcao) or isinstance(funcao, (staticmethod, classmethod, type)):
+            continue
+        setattr(cls, nome, _rastrear(funcao, f"{cls.__name__}.{nome}",
+                                     TEMPOS_LIMITE_POR_METODO.get(nome, CONSULTA_TEMPO_LIMITE_MS)))
+    return cls
+
+
+def _rastrear(funcao, nome: str, tempo_limite_ms: float):
+    @wraps(funcao)
+    def rastreado(*args, **kwargs):
+        if _metodo_atual.get() is not None:
+            return funcao(*args, **kwargs)
+        token = _metodo_atual.set((nome, tempo_limite_ms))
+        try:
+            return funcao(*args, **kwargs)
+        except OperationalError as e:
+            if getattr(e.orig, "args", (None,))[0] not in ERROS_TEMPO_ESGOTADO:
+                raise
+            CONSULTAS_TEMPO_ESGOTADO.labels(metodo=nome).inc()
+            logger.warning(json.dumps({"metodo": nome, "tempo_esgotado": True, "tempo_limite_ms": tempo_limite_ms,
+                                       "sql": " ".join(e.statement.split()) if e.statement else None},
+                                      ensure_ascii=False))
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="A consulta excedeu o tempo limite. Refine os filtros ou use a paginação e tente novamente."
+            )
+        finally:
+            _metodo_atual.reset(token)
+    return rastreado
+
+
+def _formato_parametros(parametros, executemany: bool) -> Any:
+    """Forma dos parâmetros (tipos e quantidade), sem os valores, que podem conter dados pessoais."""
+    if executemany:
+        parametros = list(parametros or [])
+        return {"linhas": len(parametros), "formato": _formato_parametros(parametros[0], False) if parametros else None}
+    if isinstance(parametros, dict):
+        return {chave: type(valor).__name__ for chave, valor in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        return [type(valor).__name__ for valor in parametros]
+    return type(parametros).__name__ if parametros is not None else None
+
+
+def _com_tempo_limite(dialeto, sql: str, tempo_limite_ms: float) -> str:
+    """Aplica o tempo limite a um SELECT: hint MAX_EXECUTION_TIME no MySQL, SET STATEMENT no MariaDB."""
+    inicio = len(sql) - len(sql.lstrip())
+    if sql[inicio:inicio + 6].upper() != "SELECT":
+        return sql
+    if getattr(dialeto, "is_mariadb", False):
+        return f"SET STATEMENT max_statement_time={tempo_limite_ms / 1000:g} FOR {sql}"
+    return f"{sql[:inicio + 6]} /*+ MAX_EXECUTION_TIME({int(tempo_limite_ms)}) */{sql[inicio + 6:]}"
+
+
+def registrar_se_lenta(statement: str, parametros, executemany: bool, duracao: float, linhas: int) -> None:
+    """
+    Chamada pelo cronômetro dos comandos SQL (app.core.medicao.registrar_eventos_sql) ao fim de cada comando: os mais
+    lentos que CONSULTA_LENTA_MS (0 desliga) vão para o logger 'app.consultas_lentas' com o SQL, a forma dos parâmetros,
+    a duração e o método do repositório que os executou.
+    """
+    duracao_ms = duracao * 1000
+    if not CONSULTA_LENTA_MS or duracao_ms < CONSULTA_LENTA_MS:
+        return
+    metodo = metodo_atual()
+    CONSULTAS_LENTAS.labels(metodo=metodo or "<fora do repositório>").inc()
+    logger.warning(json.dumps({
+        "metodo": metodo,
+        "duracao_ms": round(duracao_ms, 2),
+        "linhas": linhas,
+        "sql": " ".join(statement.split()),
+        "parametros": _formato_parametros(parametros, executemany),
+    }, ensure_ascii=False))
+
+
+def registrar_tempo_limite(engine) -> None:
+    """Tempo limite por comando, apenas no MySQL/MariaDB, que interrompem o SELECT no servidor."""
+    if engine.dialect.name not in ("mysql", "mariadb"):
+        return
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def _aplicar_tempo_limite(conn, cursor, statement, parameters, context, executemany):
+        atual = _metodo_atual.get()
+        tempo_limite_ms = atual[1] if atual is not None else CONSULTA_TEMPO_LIMITE_MS
+        if tempo_limite_ms and not executemany:
+            statement = _com_tempo_limite(conn.dialect, statement, tempo_limite_ms)
+        return statement, parameters
@@ -0,0 +1,102 @@
+import math
+import threading
+import time
+from sqlalchemy import event
+from app.core.config import DISJUNTOR_ABERTO_SEGUNDOS, DISJUNTOR_FALHAS
+from app.core.metricas import DISJUNTOR_ESTADO, DISJUNTOR_REJEICOES
+
+FECHADO = "fechado"
+MEIO_ABERTO = "meio_aberto"
+ABERTO = "aberto"
+_VALOR_ESTADO = {FECHADO: 0, MEIO_ABERTO: 1, ABERTO: 2}
+
+
+class CircuitoAberto(Exception):
+    """Levantada por Disjuntor.permitir enquanto o disjuntor está aberto; 'tentar_em' é a espera sugerida, em segundos."""
+
+    def __init__(self, nome: str, tentar_em: int):
+        super().__init__(f"{nome} indisponível, tente novamente em {tentar_em}s")
+        self.tentar_em = tentar_em
+
+
+class Disjuntor:
+    """
+    Circuit breaker: depois de 'limite_falhas' falhas consecutivas, abre e recusa as chamadas na hora (sem esperar o
+    timeout de conexão) por 'tempo_aberto' segundos. Passado esse tempo, fica meio aberto e deixa passar uma única
+    chamada de teste: se ela der certo o disjuntor fecha, se falhar abre de novo.
+    """
+
+    def __init__(self, nome: str, limite_falhas: int = DISJUNTOR_FALHAS,
+                 tempo_aberto: float = DISJUNTOR_ABERTO_SEGUNDOS):
+        self.nome = nome
+        self.limite_falhas = limite_falhas
+        self.tempo_aberto = tempo_aberto
+        self._lock = threading.Lock()
+        self._estado = FECHADO
+        self._falhas = 0
+        self._aberto_em = 0.0
+        self._teste_em = 0.0
+        self._metrica_estado = DISJUNTOR_ESTADO.labels(nome=nome)
+        self._metrica_rejeicoes = DISJUNTOR_REJEICOES.labels(nome=nome)
+        self._metrica_estado.set(0)
+
+    @property
+    def estado(self) -> str:
+        return self._estado
+
+    def _mudar(self, estado: str) -> None:
+        self._estado = estado
+        self._metrica_estado.set(_VALOR_ESTADO[estado])
+
+    def permitir(self) -> bool:
+        """
+        Levanta CircuitoAberto se a chamada deve falhar rápido. Retorna True quando a chamada é o teste do estado meio
+        aberto (quem chama deve então exercitar o recurso na hora, para que o resultado decida o estado).
+        """
+        if self._estado == FECHADO:
+            return False
+        with self._lock:
+            agora = time.monotonic()
+            if self._estado == ABERTO and agora - self._aberto_em >= self.tempo_aberto:
+                self._mudar(MEIO_ABERTO)
+                self._teste_em = agora
+                return True
+            # Um teste que não terminou dentro de 'tempo_aberto' não segura o disjuntor meio aberto para sempre
+            if self._estado == MEIO_ABERTO and agora - self._teste_em >= self.tempo_aberto:
+                self._teste_em = agora
+                return True
+            if self._estado == FECHADO:
+                return False
+            self._metrica_rejeicoes.inc()
+            referencia = self._aberto_em if self._estado == ABERTO else self._teste_em
+            raise CircuitoAberto(self.nome, max(1, math.ceil(self.tempo_aberto - (agora - referencia))))
+
+    def registrar_sucesso(self) -> None:
+        if self._estado == FECHADO and not self._falhas:
+            return
+        with self._lock:
+            self._falhas = 0
+            self._mudar(FECHADO)
+
+    def registrar_falha(self) -> None:
+        with self._lock:
+            self._falhas += 1
+            if self._estado == MEIO_ABERTO or (self._estado == FECHADO and self._falhas >= self.limite_falhas):
+                self._aberto_em = time.monotonic()
+                self._mudar(ABERTO)
+
+
+def registrar_disjuntor(engine, disjuntor: Disjuntor) -> None:
+    """
+    Alimenta o disjuntor pelos eventos do engine: uma falha ao conectar ou uma conexão perdida conta como falha; uma
+    conexão entregue pelo pool, como sucesso. Erros de SQL (sintaxe, constraint, deadlock) não contam.
+    """
+
+    @event.listens_for(engine, "handle_error")
+    def _erro(contexto_excecao):
+        if contexto_excecao.connection is None or contexto_excecao.is_disconnect:
+            disjuntor.registrar_falha()
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(*_):
+        disjuntor.registrar_sucesso()
@@ -0,0 +1,51 @@
+import hashlib
+from typing import Optional
+from fastapi import HTTPException, status
+
+
+def gerar_etag(versao: int) -> str:
+    """Gera o ETag forte de um recurso a partir da sua versão (ex: '"3"')."""
+    return f'"{versao}"'
+
+
+def versao_do_if_match(if_match: Optional[str]) -> Optional[int]:
+    """
+    Extrai a versão esperada de um cabeçalho If-Match.
+    Retorna None quando o cabeçalho não foi enviado ou é '*', ou seja, quando a atualização não é condicional.
+    """
+    if if_match is None:
+        return None
+
+    valor = if_match.strip()
+    if valor == "*":
+        return None
+    if valor.startswith("W/"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="If-Match exige um ETag forte (sem o prefixo 'W/').")
+    try:
+        return int(valor.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Cabeçalho If-Match inválido: '{if_match}'.")
+
+
+def etag_corresponde(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Verifica se o ETag atual aparece no cabeçalho If-None-Match (comparação fraca, como pede o HTTP para GET).
+    Quando corresponde, o cliente já tem a representação atual e a resposta pode ser 304.
+    """
+    if not if_none_match:
+        return False
+
+    atual = etag.removeprefix("W/")
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or candidato.removeprefix("W/") == atual:
+            return True
+    return False
+
+
+def gerar_etag_colecao(*componentes) -> str:
+    """Gera o ETag de uma listagem a partir de agregados baratos (contagem, somas de versões, etc.)."""
+    assinatura = ":".join(str(componente or 0) for componente in componentes)
+    return f'"{hashlib.sha1(assinatura.encode("utf-8")).hexdigest()[:20]}"'
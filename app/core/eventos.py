@@ -0,0 +1,129 @@
+import json
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+from app.core.config import EVENTOS_BACKEND, EVENTOS_REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+Callback = Callable[[dict], None]
+
+
+class BackendEventos:
+    """
+    Interface do pub/sub usado para avisar sobre alterações (ex: mudanças de status dos chamados).
+    Os callbacks podem ser chamados de qualquer thread; quem assina é responsável por levar o evento para o seu contexto.
+    """
+
+    def publicar(self, canal: str, mensagem: dict) -> None:
+        raise NotImplementedError
+
+    def assinar(self, canal: str, callback: Callback) -> Callable[[], None]:
+        """Registra o callback no canal e retorna a função que cancela a assinatura."""
+        raise NotImplementedError
+
+    def fechar(self) -> None:
+        pass
+
+
+class _Assinantes:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_canal: Dict[str, List[Callback]] = {}
+
+    def adicionar(self, canal: str, callback: Callback) -> Callable[[], None]:
+        with self._lock:
+            self._por_canal.setdefault(canal, []).append(callback)
+
+        def cancelar():
+            with self._lock:
+                callbacks = self._por_canal.get(canal, [])
+                if callback in callbacks:
+                    callbacks.remove(callback)
+
+        return cancelar
+
+    def entregar(self, canal: str, mensagem: dict) -> None:
+        with self._lock:
+            callbacks = list(self._por_canal.get(canal, []))
+        for callback in callbacks:
+            try:
+                callback(mensagem)
+            except Exception:
+                logger.exception("Erro ao entregar evento do canal '%s'", canal)
+
+
+class BackendEventosMemoria(BackendEventos):
+    """Backend padrão: entrega os eventos apenas dentro do próprio processo (um worker)."""
+
+    def __init__(self):
+        self._assinantes = _Assinantes()
+
+    def publicar(self, canal: str, mensagem: dict) -> None:
+        self._assinantes.entregar(canal, mensagem)
+
+    def assinar(self, canal: str, callback: Callback) -> Callable[[], None]:
+        return self._assinantes.adicionar(canal, callback)
+
+
+class BackendEventosRedis(BackendEventos):
+    """
+    Backend para vários workers/servidores: os eventos passam pelo pub/sub do Redis e chegam a todos os processos.
+    Requer o pacote opcional 'redis' (pip install redis).
+    """
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("EVENTOS_BACKEND='redis' requer o pacote 'redis' (pip install redis).") from e
+
+        self._redis = redis.Redis.from_url(url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._assinantes = _Assinantes()
+        self._canais_assinados = set()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def publicar(self, canal: str, mensagem: dict) -> None:
+        self._redis.publish(canal, json.dumps(mensagem, default=str))
+
+    def assinar(self, canal: str, callback: Callback) -> Callable[[], None]:
+        cancelar = self._assinantes.adicionar(canal, callback)
+        with self._lock:
+            if canal not in self._canais_assinados:
+                self._pubsub.subscribe(**{canal: self._ao_receber})
+                self._canais_assinados.add(canal)
+            if self._thread is None:
+                self._thread = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+        return cancelar
+
+    def _ao_receber(self, mensagem_redis: dict) -> None:
+        canal = mensagem_redis["channel"]
+        if isinstance(canal, bytes):
+            canal = canal.decode("utf-8")
+        self._assinantes.entregar(canal, json.loads(mensagem_redis["data"]))
+
+    def fechar(self) -> None:
+        if self._thread is not None:
+            self._thread.stop()
+        self._pubsub.close()
+
+
+_backend: Optional[BackendEventos] = None
+_backend_lock = threading.Lock()
+
+
+def obter_backend_eventos() -> BackendEventos:
+    """Retorna o backend configurado em EVENTOS_BACKEND ('memoria' por padrão ou 'redis'), criado uma única vez."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if EVENTOS_BACKEND == "redis":
+                    _backend = BackendEventosRedis(EVENTOS_REDIS_URL)
+                elif EVENTOS_BACKEND == "memoria":
+                    _backend = BackendEventosMemoria()
+                else:
+                    raise ValueError(f"EVENTOS_BACKEND inválido: '{EVENTOS_BACKEND}'. Use 'memoria' ou 'redis'.")
+    return _backend
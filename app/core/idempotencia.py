@@ -0,0 +1,379 @@
+import asyncio
+import base64
+import hashlib
+import json
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from app.core.config import (IDEMPOTENCIA_BACKEND, IDEMPOTENCIA_ESPERA_SEGUNDOS, IDEMPOTENCIA_MAX_CHAVES,
+                             IDEMPOTENCIA_REDIS_URL, IDEMPOTENCIA_RESERVA_SEGUNDOS, IDEMPOTENCIA_TTL_SEGUNDOS)
+from app.core.security import decode_access_token
+
+CABECALHO_CHAVE = b"idempotency-key"
+CABECALHO_REPETIDA = b"idempotent-replayed"
+
+
+@dataclass
+class RegistroIdempotencia:
+    """Situação de uma chave: em processamento (status None) ou concluída, com a resposta guardada."""
+    dono: str
+    impressao: Optional[str] = None
+    status: Optional[int] = None
+    cabecalhos: list = field(default_factory=list)
+    corpo: bytes = b""
+
+
+class ArmazenamentoIdempotencia:
+    """
+    Interface do armazenamento das respostas das requisições com Idempotency-Key. 'dono' identifica a requisição que
+    reservou a chave, para que uma reserva expirada e tomada por outra requisição não seja apagada pela primeira.
+    """
+
+    async def reservar(self, chave: str, dono: str) -> Optional[RegistroIdempotencia]:
+        """Reserva a chave para a requisição 'dono' e retorna None; se ela já existir, retorna o registro existente."""
+        raise NotImplementedError
+
+    async def esperar(self, chave: str, timeout: float) -> bool:
+        """Espera a chave sair do processamento (concluída ou descartada); False se o tempo acabar antes."""
+        raise NotImplementedError
+
+    async def concluir(self, chave: str, dono: str, impressao: str, status: int, cabecalhos: list,
+                       corpo: bytes) -> None:
+        raise NotImplementedError
+
+    async def descartar(self, chave: str, dono: str) -> None:
+        """Remove a reserva sem guardar resposta (erro), liberando quem estava esperando para tentar de novo."""
+        raise NotImplementedError
+
+
+@dataclass
+class _RegistroMemoria:
+    registro: RegistroIdempotencia
+    expira_em: float
+    pronto: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class ArmazenamentoIdempotenciaMemoria(ArmazenamentoIdempotencia):
+    """
+    Armazenamento no próprio processo, com número máximo de chaves e tempo de expiração. Roda sempre no event loop do
+    worker, então não precisa de locks. Cada worker tem o seu: com vários workers, use IDEMPOTENCIA_BACKEND='redis'.
+    """
+
+    def __init__(self, max_chaves: int = IDEMPOTENCIA_MAX_CHAVES, ttl_segundos: int = IDEMPOTENCIA_TTL_SEGUNDOS):
+        self.max_chaves = max_chaves
+        self.ttl_segundos = ttl_segundos
+        self._registros: "OrderedDict[str, _RegistroMemoria]" = OrderedDict()
+
+    async def reservar(self, chave: str, dono: str) -> Optional[RegistroIdempotencia]:
+        self._remover_expirados()
+        existente = self._registros.get(chave)
+        if existente is not None:
+            return existente.registro
+        self._registros[chave] = _RegistroMemoria(RegistroIdempotencia(dono=dono),
+                                                  expira_em=time.monotonic() + self.ttl_segundos)
+        self._limitar_tamanho()
+        return None
+
+    async def esperar(self, chave: str, timeout: float) -> bool:
+        existente = self._registros.get(chave)
+        if existente is None:
+            return True
+        try:
+            await asyncio.wait_for(existente.pronto.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def concluir(self, chave: str, dono: str, impressao: str, status: int, cabecalhos: list,
+                       corpo: bytes) -> None:
+        existente = self._registros.get(chave)
+        if existente is None or existente.registro.dono != dono:
+            return
+        registro = existente.registro
+        registro.impressao, registro.status, registro.cabecalhos, registro.corpo = impressao, status, cabecalhos, corpo
+        existente.pronto.set()
+
+    async def descartar(self, chave: str, dono: str) -> None:
+        existente = self._registros.get(chave)
+        if existente is None or existente.registro.dono != dono:
+            return
+        del self._registros[chave]
+        existente.pronto.set()
+
+    def _remover_expirados(self) -> None:
+        agora = time.monotonic()
+        while self._registros:
+            chave, existente = next(iter(self._registros.items()))
+            if existente.expira_em > agora:
+                break
+            self._registros.popitem(last=False)
+            existente.pronto.set()
+
+    def _limitar_tamanho(self) -> None:
+        excesso = len(self._registros) - self.max_chaves
+        if excesso <= 0:
+            return
+        # Remove as chaves concluídas mais antigas; as que ainda estão em processamento são mantidas
+        for chave in [chave for chave, existente in self._registros.items() if existente.pronto.is_set()][:excesso]:
+            del self._registros[chave]
+
+
+# Apaga a chave só se ela ainda for da reserva informada (compara o valor inteiro guardado)
+_SCRIPT_DESCARTAR = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+# Grava a resposta só se a reserva ainda for da mesma requisição (ela pode ter expirado e sido tomada por outra)
+_SCRIPT_CONCLUIR = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('set', KEYS[1], ARGV[2], 'EX', ARGV[3])
+end
+return 0
+"""
+
+
+class ArmazenamentoIdempotenciaRedis(ArmazenamentoIdempotencia):
+    """
+    Armazenamento compartilhado por todos os workers/servidores: a reserva é um SET NX no Redis, então só uma das
+    requisições repetidas executa o endpoint, qualquer que seja o worker que a recebeu. A reserva expira em
+    'reserva_segundos' (um worker que morreu no meio da requisição não bloqueia a chave por 'ttl_segundos').
+    Requer o pacote opcional 'redis' (pip install redis).
+    """
+
+    INTERVALO_ESPERA_SEGUNDOS = 0.1
+
+    def __init__(self, url: str, ttl_segundos: int = IDEMPOTENCIA_TTL_SEGUNDOS,
+                 reserva_segundos: int = IDEMPOTENCIA_RESERVA_SEGUNDOS):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("IDEMPOTENCIA_BACKEND='redis' requer o pacote 'redis' (pip install redis).") from e
+        self._redis = redis.Redis.from_url(url)
+        self.ttl_segundos = ttl_segundos
+        self.reserva_segundos = reserva_segundos
+
+    @staticmethod
+    def _chave(chave: str) -> str:
+        return "idempotencia:" + chave
+
+    @staticmethod
+    def _reserva(dono: str) -> str:
+        return json.dumps({"dono": dono})
+
+    async def reservar(self, chave: str, dono: str) -> Optional[RegistroIdempotencia]:
+        while True:
+            if await self._redis.set(self._chave(chave), self._reserva(dono), nx=True, ex=self.reserva_segundos):
+                return None
+            existente = await self._ler(chave)
+            # A chave pode ter expirado ou sido descartada entre o SET e o GET
+            if existente is not None:
+                return existente
+
+    async def esperar(self, chave: str, timeout: float) -> bool:
+        limite = time.monotonic() + timeout
+        while True:
+            existente = await self._ler(chave)
+            if existente is None or existente.status is not None:
+                return True
+            if time.monotonic() >= limite:
+                return False
+            await asyncio.sleep(self.INTERVALO_ESPERA_SEGUNDOS)
+
+    async def concluir(self, chave: str, dono: str, impressao: str, status: int, cabecalhos: list,
+                       corpo: bytes) -> None:
+        valor = json.dumps({
+            "dono": dono,
+            "impressao": impressao,
+            "status": status,
+            "cabecalhos": [[nome.decode("latin-1"), valor.decode("latin-1")] for nome, valor in cabecalhos],
+            "corpo": base64.b64encode(corpo).decode("ascii"),
+        })
+        await self._redis.eval(_SCRIPT_CONCLUIR, 1, self._chave(chave), self._reserva(dono), valor,
+                               self.ttl_segundos)
+
+    async def descartar(self, chave: str, dono: str) -> None:
+        await self._redis.eval(_SCRIPT_DESCARTAR, 1, self._chave(chave), self._reserva(dono))
+
+    async def _ler(self, chave: str) -> Optional[RegistroIdempotencia]:
+        valor = await self._redis.get(self._chave(chave))
+        if valor is None:
+            return None
+        dados = json.loads(valor)
+        return RegistroIdempotencia(
+            dono=dados["dono"],
+            impressao=dados.get("impressao"),
+            status=dados.get("status"),
+            cabecalhos=[(nome.encode("latin-1"), valor.encode("latin-1"))
+                        for nome, valor in dados.get("cabecalhos", [])],
+            corpo=base64.b64decode(dados.get("corpo", "")),
+        )
+
+
+def criar_armazenamento_idempotencia() -> ArmazenamentoIdempotencia:
+    """Armazenamento configurado em IDEMPOTENCIA_BACKEND ('memoria' por padrão ou 'redis')."""
+    if IDEMPOTENCIA_BACKEND == "redis":
+        return ArmazenamentoIdempotenciaRedis(IDEMPOTENCIA_REDIS_URL)
+    if IDEMPOTENCIA_BACKEND == "memoria":
+        return ArmazenamentoIdempotenciaMemoria()
+    raise ValueError(f"IDEMPOTENCIA_BACKEND inválido: '{IDEMPOTENCIA_BACKEND}'. Use 'memoria' ou 'redis'.")
+
+
+class _Impressao:
+    """
+    SHA-256 do corpo calculado aos pedaços, conforme ele é lido. Em multipart, o delimitador (boundary) é removido: ele
+    é aleatório e costuma mudar quando o cliente repete o upload, sem que o conteúdo mude.
+    """
+
+    def __init__(self, delimitador: bytes = b""):
+        self._hash = hashlib.sha256()
+        self._delimitador = delimitador
+        self._resto = b""
+
+    def atualizar(self, parte: bytes) -> None:
+        if not self._delimitador:
+            self._hash.update(parte)
+            return
+        pedacos = (self._resto + parte).split(self._delimitador)
+        for pedaco in pedacos[:-1]:
+            self._hash.update(pedaco)
+        # O fim do último pedaço pode ser o começo de um delimitador que continua na próxima parte
+        ultimo = pedacos[-1]
+        corte = max(len(ultimo) - (len(self._delimitador) - 1), 0)
+        self._hash.update(ultimo[:corte])
+        self._resto = ultimo[corte:]
+
+    def hexdigest(self) -> str:
+        self._hash.update(self._resto)
+        self._resto = b""
+        return self._hash.hexdigest()
+
+
+def _delimitador_multipart(cabecalhos: Dict[bytes, bytes]) -> bytes:
+    tipo = cabecalhos.get(b"content-type", b"")
+    if not tipo.lower().startswith(b"multipart/"):
+        return b""
+    for parametro in tipo.split(b";")[1:]:
+        nome, _, valor = parametro.strip().partition(b"=")
+        if nome.lower() == b"boundary" and valor:
+            return valor.strip(b'"')
+    return b""
+
+
+def _usuario(cabecalhos: Dict[bytes, bytes]) -> Optional[str]:
+    """user_id do token: a chave continua valendo para o mesmo usuário depois que o token é renovado."""
+    autorizacao = cabecalhos.get(b"authorization", b"").decode("latin-1")
+    if not autorizacao.lower().startswith("bearer "):
+        return None
+    payload = decode_access_token(autorizacao[7:])
+    if not payload or payload.get("user_id") is None:
+        return None
+    return str(payload["user_id"])
+
+
+class IdempotenciaMiddleware:
+    """
+    Suporte ao cabeçalho Idempotency-Key nos POSTs dos caminhos informados.
+    A primeira requisição com uma chave é processada e sua resposta (2xx) guardada; as repetições recebem a mesma
+    resposta sem executar o endpoint (nem abrir sessão no banco). Repetições simultâneas esperam a primeira terminar.
+    A chave vale por usuário (user_id do token), método e caminho; requisições sem token válido passam direto (o
+    endpoint responde 401). O corpo não é guardado: a impressão (SHA-256) é calculada enquanto ele passa para o
+    endpoint.
+    """
+
+    def __init__(self, app, prefixos: tuple = ("/api/chamados",),
+                 armazenamento: Optional[ArmazenamentoIdempotencia] = None):
+        self.app = app
+        self.prefixos = prefixos
+        self.armazenamento = armazenamento or criar_armazenamento_idempotencia()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].startswith(self.prefixos):
+            await self.app(scope, receive, send)
+            return
+
+        cabecalhos = dict(scope["headers"])
+        chave_cliente = cabecalhos.get(CABECALHO_CHAVE)
+        usuario = _usuario(cabecalhos) if chave_cliente else None
+        if usuario is None:
+            await self.app(scope, receive, send)
+            return
+
+        chave = ":".join([usuario, scope["method"], scope["path"], chave_cliente.decode("latin-1")])
+        dono = uuid.uuid4().hex
+        delimitador = _delimitador_multipart(cabecalhos)
+
+        while True:
+            existente = await self.armazenamento.reservar(chave, dono)
+            if existente is None:
+                break
+            if existente.status is None:
+                # O corpo só é lido depois da espera: se a original falhar, esta requisição assume a chave e o corpo
+                # ainda está disponível para o endpoint
+                if not await self.armazenamento.esperar(chave, IDEMPOTENCIA_ESPERA_SEGUNDOS):
+                    await _responder_json(send, 409, "Requisição com esta Idempotency-Key ainda em processamento.")
+                    return
+                continue
+            if await _impressao_do_corpo(receive, delimitador) != existente.impressao:
+                await _responder_json(send, 422, "Idempotency-Key já utilizada com uma requisição diferente.")
+                return
+            await _repetir_resposta(send, existente)
+            return
+
+        impressao = _Impressao(delimitador)
+        resposta = {"status": None, "cabecalhos": [], "corpo": []}
+
+        async def receive_calculando():
+            message = await receive()
+            if message["type"] == "http.request":
+                impressao.atualizar(message.get("body", b""))
+            return message
+
+        async def send_capturando(message):
+            if message["type"] == "http.response.start":
+                resposta["status"] = message["status"]
+                resposta["cabecalhos"] = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                resposta["corpo"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_calculando, send_capturando)
+        except BaseException:
+            await self.armazenamento.descartar(chave, dono)
+            raise
+
+        if resposta["status"] is not None and 200 <= resposta["status"] < 300:
+            await self.armazenamento.concluir(chave, dono, impressao.hexdigest(), resposta["status"],
+                                              resposta["cabecalhos"], b"".join(resposta["corpo"]))
+        else:
+            await self.armazenamento.descartar(chave, dono)
+
+
+async def _impressao_do_corpo(receive, delimitador: bytes) -> str:
+    """Impressão do corpo de uma repetição, lido aos pedaços e descartado (o endpoint não vai executar)."""
+    impressao = _Impressao(delimitador)
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        impressao.atualizar(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return impressao.hexdigest()
+
+
+async def _repetir_resposta(send, registro: RegistroIdempotencia) -> None:
+    await send({"type": "http.response.start", "status": registro.status,
+                "headers": registro.cabecalhos + [(CABECALHO_REPETIDA, b"true")]})
+    await send({"type": "http.response.body", "body": registro.corpo})
+
+
+async def _responder_json(send, status: int, detalhe: str) -> None:
+    corpo = json.dumps({"detail": detalhe}).encode("utf-8")
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(corpo)).encode())]})
+    await send({"type": "http.response.body", "body": corpo})
@@ -0,0 +1,205 @@
+import inspect
+import json
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import List, Optional
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from app.core.config import MEDICAO_LIMITE_LENTA_MS, MEDICAO_MAX_COMANDOS
+from app.core.consultas import registrar_se_lenta
+from app.core.perfilador import acompanhar_thread_atual
+
+logger = logging.getLogger("app.medicao")
+
+CABECALHO_SERVER_TIMING = b"server-timing"
+
+
+@dataclass
+class ComandoSQL:
+    sql: str
+    duracao: float
+    linhas: int
+
+
+@dataclass
+class MedicaoRequisicao:
+    """Tempos e consultas de uma requisição, acumulados pelos eventos do engine e pela RotaMedida."""
+    inicio: float = field(default_factory=time.perf_counter)
+    sql_comandos: int = 0
+    sql_tempo: float = 0.0
+    linhas: int = 0
+    serializacao: float = 0.0
+    fim_endpoint: Optional[float] = None
+    comandos: List[ComandoSQL] = field(default_factory=list)
+    comandos_descartados: int = 0
+
+    def registrar_comando(self, sql: str, duracao: float, linhas: int) -> None:
+        self.sql_comandos += 1
+        self.sql_tempo += duracao
+        self.linhas += max(linhas, 0)
+        if len(self.comandos) < MEDICAO_MAX_COMANDOS:
+            self.comandos.append(ComandoSQL(sql, duracao, linhas))
+        else:
+            self.comandos_descartados += 1
+
+
+# O FastAPI copia o contexto para a thread dos endpoints síncronos, então o mesmo objeto é visto nas duas pontas
+_medicao_atual: ContextVar[Optional[MedicaoRequisicao]] = ContextVar("medicao_atual", default=None)
+
+
+def medicao_atual() -> Optional[MedicaoRequisicao]:
+    return _medicao_atual.get()
+
+
+def registrar_eventos_sql(engine) -> None:
+    """
+    Cronometra cada comando executado no engine: contabiliza-o na medição da requisição em andamento (se houver) e o
+    repassa ao log de consultas lentas (app.core.consultas).
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("medicao_inicios", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _depois(conn, cursor, statement, parameters, context, executemany):
+        duracao = time.perf_counter() - conn.info["medicao_inicios"].pop()
+        # rowcount: linhas devolvidas (SELECT no PyMySQL) ou afetadas; drivers que não informam devolvem -1
+        medicao = _medicao_atual.get()
+        if medicao is not None:
+            medicao.registrar_comando(statement, duracao, cursor.rowcount)
+        registrar_se_lenta(statement, parameters, executemany, duracao, cursor.rowcount)
+
+    @event.listens_for(engine, "handle_error")
+    def _erro(contexto_excecao):
+        inicios = contexto_excecao.connection.info.get("medicao_inicios") if contexto_excecao.connection else None
+        if inicios:
+            inicios.pop()
+
+
+def _cronometrar_endpoint(endpoint):
+    """
+    Marca o fim do endpoint; o que a rota gasta depois disso é a serialização da resposta. Endpoints síncronos rodam
+    no threadpool, então a thread deles também é incluída no perfil da requisição, quando ela está sendo perfilada.
+    """
+    def marcar_fim():
+        medicao = _medicao_atual.get()
+        if medicao is not None:
+            medicao.fim_endpoint = time.perf_counter()
+
+    if _e_corrotina(endpoint):
+        @wraps(endpoint)
+        async def endpoint_cronometrado(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                marcar_fim()
+    else:
+        @wraps(endpoint)
+        def endpoint_cronometrado(*args, **kwargs):
+            acompanhar_thread_atual()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                marcar_fim()
+    return endpoint_cronometrado
+
+
+def _e_corrotina(funcao) -> bool:
+    return inspect.iscoroutinefunction(funcao) or inspect.iscoroutinefunction(getattr(funcao, "__call__", None))
+
+
+class RotaMedida(APIRoute):
+    """
+    APIRoute que mede o tempo de serialização: validação pelo response_model e geração do JSON, incluindo as consultas
+    de lazy loading que essa validação dispara.
+    """
+
+    def get_route_handler(self):
+        self.dependant.call = _cronometrar_endpoint(self.dependant.call)
+        tratar = super().get_route_handler()
+
+        async def tratar_medindo(request):
+            resposta = await tratar(request)
+            medicao = _medicao_atual.get()
+            if medicao is not None and medicao.fim_endpoint is not None:
+                medicao.serializacao += time.perf_counter() - medicao.fim_endpoint
+                medicao.fim_endpoint = None
+            return resposta
+
+        return tratar_medindo
+
+
+def _ms(segundos: float) -> float:
+    return round(segundos * 1000, 2)
+
+
+class MedicaoMiddleware:
+    """
+    Mede cada requisição HTTP: tempo total, número de comandos SQL, tempo em SQL, linhas e tempo de serialização.
+    Os valores vão no cabeçalho Server-Timing e em uma linha de log JSON (logger 'app.medicao'). Requisições mais
+    lentas que MEDICAO_LIMITE_LENTA_MS são registradas como aviso, com a lista dos comandos SQL executados.
+    Os caminhos em 'ignorar' (ex: o stream de eventos, que fica aberto) não são medidos.
+    """
+
+    def __init__(self, app, ignorar: tuple = (), limite_lenta_ms: float = MEDICAO_LIMITE_LENTA_MS):
+        self.app = app
+        self.ignorar = ignorar
+        self.limite_lenta_ms = limite_lenta_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (self.ignorar and scope["path"].startswith(self.ignorar)):
+            await self.app(scope, receive, send)
+            return
+
+        medicao = MedicaoRequisicao()
+        token = _medicao_atual.set(medicao)
+        status = {"codigo": 500}
+
+        async def send_medindo(message):
+            if message["type"] == "http.response.start":
+                status["codigo"] = message["status"]
+                cabecalhos = list(message.get("headers", []))
+                cabecalhos.append((CABECALHO_SERVER_TIMING, _server_timing(medicao).encode("latin-1")))
+                message = {**message, "headers": cabecalhos}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_medindo)
+        finally:
+            _medicao_atual.reset(token)
+            self._registrar(scope, status["codigo"], medicao)
+
+    def _registrar(self, scope, status: int, medicao: MedicaoRequisicao) -> None:
+        total_ms = _ms(time.perf_counter() - medicao.inicio)
+        rota = scope.get("route")
+        registro = {
+            "metodo": scope["method"],
+            "caminho": scope["path"],
+            "rota": getattr(rota, "path", None),
+            "status": status,
+            "total_ms": total_ms,
+            "sql_comandos": medicao.sql_comandos,
+            "sql_ms": _ms(medicao.sql_tempo),
+            "linhas": medicao.linhas,
+            "serializacao_ms": _ms(medicao.serializacao),
+        }
+        if not self.limite_lenta_ms or total_ms < self.limite_lenta_ms:
+            logger.info(json.dumps(registro, ensure_ascii=False))
+            return
+        registro["lenta"] = True
+        registro["comandos"] = [{"sql": " ".join(c.sql.split()), "ms": _ms(c.duracao), "linhas": c.linhas}
+                                for c in medicao.comandos]
+        registro["comandos_omitidos"] = medicao.comandos_descartados
+        logger.warning(json.dumps(registro, ensure_ascii=False))
+
+
+def _server_timing(medicao: MedicaoRequisicao) -> str:
+    """Tempos até o início da resposta, no formato do cabeçalho Server-Timing (durações em milissegundos)."""
+    total = _ms(time.perf_counter() - medicao.inicio)
+    return (f'total;dur={total}, '
+            f'sql;dur={_ms(medicao.sql_tempo)};desc="{medicao.sql_comandos} comandos, {medicao.linhas} linhas", '
+            f'serializacao;dur={_ms(medicao.serializacao)}')
@@ -0,0 +1,167 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+from sqlalchemy import event
+
+# Com vários workers, PROMETHEUS_MULTIPROC_DIR (um diretório vazio a cada subida) deve estar definido antes de iniciar
+# o servidor: cada processo grava os seus valores em arquivos ali e o /metrics de qualquer worker soma todos eles
+MULTIPROCESSO = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUISICOES = Counter(
+    "http_requisicoes_total", "Requisições HTTP atendidas.", ["metodo", "rota", "status"]
+)
+LATENCIA = Histogram(
+    "http_requisicao_duracao_segundos", "Duração das requisições HTTP.", ["metodo", "rota"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+EM_ANDAMENTO = Gauge(
+    "http_requisicoes_em_andamento", "Requisições HTTP em andamento.", multiprocess_mode="livesum"
+)
+
+POOL_CONEXOES = Gauge(
+    "db_pool_conexoes", "Conexões do pool do banco, por situação.", ["situacao"], multiprocess_mode="livesum"
+)
+POOL_CAPACIDADE = Gauge(
+    "db_pool_capacidade", "Tamanho configurado do pool (sem o overflow).", multiprocess_mode="livesum"
+)
+
+CACHE_CONSULTAS = Counter(
+    "cache_consultas_total", "Consultas aos caches em memória.", ["cache", "resultado"]
+)
+CACHE_INVALIDACOES = Counter(
+    "cache_invalidacoes_total", "Invalidações de namespaces dos caches em memória.", ["cache"]
+)
+SINGLEFLIGHT_CHAMADAS = Counter(
+    "singleflight_chamadas_total", "Chamadas coalescidas: executadas de fato ou atendidas com o resultado de outra.",
+    ["nome", "tipo"]
+)
+
+UPLOAD_BYTES = Histogram(
+    "upload_bytes", "Tamanho dos arquivos enviados.",
+    buckets=(16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2),
+)
+UPLOAD_DURACAO = Histogram(
+    "upload_duracao_segundos", "Tempo para gravar um arquivo enviado em disco.",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+BCRYPT_DURACAO = Histogram(
+    "bcrypt_duracao_segundos", "Tempo do bcrypt, por operação.", ["operacao"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 2),
+)
+
+TRANSICOES_STATUS = Counter(
+    "chamados_transicoes_status_total", "Mudanças de status dos chamados ('novo' na criação).", ["de", "para"]
+)
+
+CONSULTAS_LENTAS = Counter(
+    "db_consultas_lentas_total", "Comandos SQL acima de CONSULTA_LENTA_MS, por método do repositório.", ["metodo"]
+)
+CONSULTAS_TEMPO_ESGOTADO = Counter(
+    "db_consultas_tempo_esgotado_total", "Consultas interrompidas pelo tempo limite, por método do repositório.",
+    ["metodo"]
+)
+TRANSACOES_REPETIDAS = Counter(
+    "db_transacoes_repetidas_total", "Transações repetidas após deadlock ou espera por lock.", ["metodo", "erro"]
+)
+TRANSACOES_DESISTENCIAS = Counter(
+    "db_transacoes_desistencias_total", "Transações que esgotaram as tentativas (respondidas com 503).", ["metodo"]
+)
+DISJUNTOR_ESTADO = Gauge(
+    "disjuntor_estado", "Estado do disjuntor: 0 = fechado, 1 = meio aberto, 2 = aberto.", ["nome"],
+    multiprocess_mode="max"
+)
+DISJUNTOR_REJEICOES = Counter(
+    "disjuntor_rejeicoes_total", "Chamadas recusadas na hora pelo disjuntor aberto.", ["nome"]
+)
+
+SEM_ROTA = "<sem rota>"
+
+
+def _valor(status) -> str:
+    return getattr(status, "value", status)
+
+
+def registrar_transicao_status(de, para) -> None:
+    """Conta a mudança de status de um chamado; 'de' é None na criação."""
+    if para is None or _valor(de) == _valor(para):
+        return
+    TRANSICOES_STATUS.labels(de=_valor(de) if de is not None else "novo", para=_valor(para)).inc()
+
+
+@contextmanager
+def cronometrar(histograma):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        histograma.observe(time.perf_counter() - inicio)
+
+
+def registrar_metricas_pool(engine) -> None:
+    """Atualiza os gauges do pool a cada checkout e checkin de conexão."""
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return
+    if hasattr(pool, "size"):
+        POOL_CAPACIDADE.set(pool.size())
+
+    def atualizar(*_):
+        POOL_CONEXOES.labels(situacao="em_uso").set(pool.checkedout())
+        POOL_CONEXOES.labels(situacao="livres").set(pool.checkedin())
+        POOL_CONEXOES.labels(situacao="overflow").set(max(pool.overflow(), 0))
+
+    event.listen(engine, "checkout", atualizar)
+    event.listen(engine, "checkin", atualizar)
+
+
+class MetricasMiddleware:
+    """
+    Contagem e latência das requisições por método, rota (o modelo do caminho, ex: /api/chamados/{chamado_id}) e status,
+    e o número de requisições em andamento. Caminhos que não correspondem a nenhuma rota ficam em '<sem rota>', para
+    que URLs arbitrárias não criem séries novas.
+    """
+
+    def __init__(self, app, ignorar: tuple = ()):
+        self.app = app
+        self.ignorar = ignorar
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (self.ignorar and scope["path"].startswith(self.ignorar)):
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status = {"codigo": 500}
+
+        async def send_registrando(message):
+            if message["type"] == "http.response.start":
+                status["codigo"] = message["status"]
+            await send(message)
+
+        EM_ANDAMENTO.inc()
+        try:
+            await self.app(scope, receive, send_registrando)
+        finally:
+            EM_ANDAMENTO.dec()
+            rota = getattr(scope.get("route"), "path", None) or SEM_ROTA
+            REQUISICOES.labels(metodo=scope["method"], rota=rota, status=str(status["codigo"])).inc()
+            LATENCIA.labels(metodo=scope["method"], rota=rota).observe(time.perf_counter() - inicio)
+
+
+def gerar_metricas() -> bytes:
+    """Texto do /metrics: a soma de todos os workers em modo multiprocesso, ou só os deste processo."""
+    if MULTIPROCESSO:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def encerrar_worker(pid: Optional[int] = None) -> None:
+    """Remove os gauges 'live' do worker que está saindo, para que não continuem somando no /metrics."""
+    if MULTIPROCESSO:
+        multiprocess.mark_process_dead(pid or os.getpid())
+
@@ -0,0 +1,118 @@
+import logging
+import os
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional, Tuple
+from sqlalchemy import event
+from app.core.config import N_MAIS_UM_LIMIAR
+from app.core.medicao import medicao_atual
+
+logger = logging.getLogger("app.n_mais_um")
+
+_DIRETORIO_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_DIRETORIO_CORE = os.path.dirname(os.path.abspath(__file__))
+SERIALIZACAO = "serialização da resposta (response_model)"
+
+
+class ConsultasNMaisUm(Exception):
+    """Levantada no modo 'erro' quando um relacionamento é carregado sob demanda repetidamente no mesmo ponto do código."""
+
+
+@dataclass
+class DeteccaoNMaisUm:
+    """Lazy loads de uma requisição (ou de um bloco 'with'), agrupados por relacionamento e local da chamada."""
+    descricao: str
+    limiar: int
+    levantar: bool
+    cargas: Dict[Tuple[str, str], int] = field(default_factory=dict)
+
+    def suspeitas(self) -> Dict[Tuple[str, str], int]:
+        return {chave: total for chave, total in self.cargas.items() if total >= self.limiar}
+
+    def registrar(self, relacionamento: str, local: str) -> None:
+        chave = (relacionamento, local)
+        total = self.cargas.get(chave, 0) + 1
+        self.cargas[chave] = total
+        if self.levantar and total == self.limiar:
+            raise ConsultasNMaisUm(
+                f"{self.descricao}: {relacionamento} carregado sob demanda {total} vezes em {local}. "
+                f"Use selectinload/joinedload na consulta que trouxe os objetos."
+            )
+
+
+_deteccao_atual: ContextVar[Optional[DeteccaoNMaisUm]] = ContextVar("deteccao_n_mais_um", default=None)
+
+
+@contextmanager
+def detectar_n_mais_um(descricao: str = "bloco", limiar: int = N_MAIS_UM_LIMIAR,
+                       levantar: bool = False) -> Iterator[DeteccaoNMaisUm]:
+    """
+    Acompanha os lazy loads feitos dentro do bloco. Um mesmo relacionamento carregado pelo menos 'limiar' vezes a partir
+    do mesmo local é o padrão N+1 (uma consulta por item de uma lista) e gera um aviso no log ao final do bloco; com
+    'levantar', a consulta que atinge o limiar levanta ConsultasNMaisUm (útil nos testes).
+    """
+    deteccao = DeteccaoNMaisUm(descricao=descricao, limiar=limiar, levantar=levantar)
+    token = _deteccao_atual.set(deteccao)
+    try:
+        yield deteccao
+    finally:
+        _deteccao_atual.reset(token)
+        for (relacionamento, local), total in deteccao.suspeitas().items():
+            logger.warning("Possível N+1 em %s: %s carregado sob demanda %d vezes em %s",
+                           descricao, relacionamento, total, local)
+
+
+def _local_da_chamada() -> str:
+    """
+    Ponto do código que disparou a carga: o frame mais interno da aplicação fora de app/core ou, fora da aplicação
+    (ex: um teste), o mais interno fora das bibliotecas instaladas.
+    """
+    medicao = medicao_atual()
+    if medicao is not None and medicao.fim_endpoint is not None:
+        return SERIALIZACAO
+    externo = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        arquivo = frame.f_code.co_filename
+        if arquivo.startswith(_DIRETORIO_APP):
+            if not arquivo.startswith(_DIRETORIO_CORE):
+                return _formatar_frame(frame)
+        elif externo is None and "site-packages" not in arquivo and not arquivo.startswith("<frozen"):
+            externo = frame
+        frame = frame.f_back
+    return _formatar_frame(externo) if externo is not None else SERIALIZACAO
+
+
+def _formatar_frame(frame) -> str:
+    arquivo = frame.f_code.co_filename
+    if arquivo.startswith(_DIRETORIO_APP):
+        arquivo = os.path.relpath(arquivo, os.path.dirname(_DIRETORIO_APP))
+    return f"{arquivo}:{frame.f_lineno} ({frame.f_code.co_name})"
+
+
+def registrar_deteccao_n_mais_um(fabrica_sessoes) -> None:
+    """Observa as consultas das sessões criadas pela fábrica; fora de um detectar_n_mais_um, não faz nada."""
+
+    @event.listens_for(fabrica_sessoes, "do_orm_execute")
+    def _ao_executar(estado):
+        deteccao = _deteccao_atual.get()
+        if deteccao is None or not estado.is_select or not estado.is_relationship_load or estado.lazy_loaded_from is None:
+            return
+        deteccao.registrar(str(estado.loader_strategy_path[-1]), _local_da_chamada())
+
+
+class NMaisUmMiddleware:
+    """Roda cada requisição HTTP dentro de um detectar_n_mais_um (modos 'avisar' e 'erro' de N_MAIS_UM_MODO)."""
+
+    def __init__(self, app, levantar: bool = False):
+        self.app = app
+        self.levantar = levantar
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with detectar_n_mais_um(f"{scope['method']} {scope['path']}", levantar=self.levantar):
+            await self.app(scope, receive, send)
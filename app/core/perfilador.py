@@ -0,0 +1,220 @@
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Set
+import anyio
+from app.core.config import (PERFILADOR_A_CADA, PERFILADOR_DIRETORIO, PERFILADOR_INTERVALO_MS,
+                             PERFILADOR_MAX_ARQUIVOS, PERFILADOR_ROTAS)
+from app.core.security import decode_access_token
+
+CABECALHO_PERFILAR = b"x-perfilar"
+EXTENSAO = ".folded"
+MAX_AMOSTRAS = 60_000
+
+_DIRETORIO_PROJETO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_NOME_ARQUIVO_VALIDO = re.compile(r"^[\w.-]+\.folded$")
+
+
+@dataclass
+class ConfiguracaoPerfilador:
+    """Quando perfilar: uma a cada 'a_cada' requisições (0 desliga) e/ou as requisições cujo caminho começa com 'rotas'."""
+    a_cada: int = PERFILADOR_A_CADA
+    rotas: List[str] = field(default_factory=lambda: [r.strip() for r in PERFILADOR_ROTAS.split(",") if r.strip()])
+
+
+class PerfilRequisicao:
+    """
+    Amostragem das pilhas das threads que atendem uma requisição: a do event loop e as do threadpool em que os
+    endpoints síncronos rodam (registradas por acompanhar_thread_atual). Uma thread auxiliar lê sys._current_frames()
+    a cada 'intervalo' e conta cada pilha, no formato 'collapsed stacks' dos flame graphs. As amostras do event loop
+    parado no select (esperando o threadpool ou a rede) são descartadas.
+    """
+
+    def __init__(self, intervalo: float):
+        self.intervalo = intervalo
+        self.thread_loop = threading.get_ident()
+        self.threads: Set[int] = {self.thread_loop}
+        self.pilhas: Counter = Counter()
+        self.amostras = 0
+        self._parar = threading.Event()
+        self._amostrador = threading.Thread(target=self._amostrar, name="perfilador", daemon=True)
+
+    def iniciar(self) -> None:
+        self._amostrador.start()
+
+    def parar(self) -> None:
+        self._parar.set()
+        self._amostrador.join()
+
+    def _amostrar(self) -> None:
+        while not self._parar.wait(self.intervalo) and self.amostras < MAX_AMOSTRAS:
+            frames = sys._current_frames()
+            for tid in list(self.threads):
+                frame = frames.get(tid)
+                if frame is not None and not (tid == self.thread_loop and _loop_ocioso(frame)):
+                    self.pilhas[_pilha(frame)] += 1
+            self.amostras += 1
+
+
+def _loop_ocioso(frame) -> bool:
+    return frame.f_code.co_filename.endswith("selectors.py")
+
+
+def _nome_frame(frame) -> str:
+    arquivo = frame.f_code.co_filename
+    if arquivo.startswith(_DIRETORIO_PROJETO):
+        arquivo = os.path.relpath(arquivo, _DIRETORIO_PROJETO)
+    elif "site-packages" in arquivo:
+        arquivo = arquivo.split("site-packages" + os.sep, 1)[1]
+    else:
+        arquivo = os.path.basename(arquivo)
+    return f"{frame.f_code.co_name} ({arquivo}:{frame.f_lineno})".replace(";", ":")
+
+
+def _pilha(frame) -> str:
+    nomes = []
+    while frame is not None:
+        nomes.append(_nome_frame(frame))
+        frame = frame.f_back
+    return ";".join(reversed(nomes))
+
+
+_perfil_atual: ContextVar[Optional[PerfilRequisicao]] = ContextVar("perfil_atual", default=None)
+
+
+def acompanhar_thread_atual() -> None:
+    """Inclui a thread atual na amostragem da requisição sendo perfilada (se houver). Chamado pela RotaMedida."""
+    perfil = _perfil_atual.get()
+    if perfil is not None:
+        perfil.threads.add(threading.get_ident())
+
+
+class Perfilador:
+    """
+    Decide quais requisições perfilar e grava os perfis em PERFILADOR_DIRETORIO, mantendo no máximo 'max_arquivos'
+    (os mais antigos são apagados). Além da amostragem configurada, um administrador pode pedir o perfil de uma
+    requisição específica com o cabeçalho 'X-Perfilar: 1'. A configuração vale por worker.
+    """
+
+    def __init__(self, diretorio: str = PERFILADOR_DIRETORIO, max_arquivos: int = PERFILADOR_MAX_ARQUIVOS,
+                 intervalo_ms: float = PERFILADOR_INTERVALO_MS):
+        self.diretorio = Path(diretorio)
+        self.max_arquivos = max_arquivos
+        self.intervalo = intervalo_ms / 1000
+        self.configuracao = ConfiguracaoPerfilador()
+        self._contador = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def deve_perfilar(self, scope) -> bool:
+        configuracao = self.configuracao
+        if configuracao.a_cada and next(self._contador) % configuracao.a_cada == 0:
+            return True
+        if configuracao.rotas and scope["path"].startswith(tuple(configuracao.rotas)):
+            return True
+        return _pedido_por_admin(scope)
+
+    def iniciar(self) -> PerfilRequisicao:
+        perfil = PerfilRequisicao(self.intervalo)
+        perfil.iniciar()
+        return perfil
+
+    def salvar(self, scope, perfil: PerfilRequisicao, status: int, duracao: float) -> Optional[Path]:
+        if not perfil.pilhas:
+            return None
+        rota = getattr(scope.get("route"), "path", None) or scope["path"]
+        nome = "_".join([
+            datetime.now().strftime("%Y%m%d-%H%M%S-%f"), scope["method"], re.sub(r"[^\w]+", "-", rota).strip("-"),
+            str(status), f"{round(duracao * 1000)}ms", str(os.getpid()),
+        ]) + EXTENSAO
+        with self._lock:
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+            caminho = self.diretorio / nome
+            with caminho.open("w", encoding="utf-8") as arquivo:
+                for pilha, total in perfil.pilhas.most_common():
+                    arquivo.write(f"{pilha} {total}\n")
+            self._limitar()
+        return caminho
+
+    def _limitar(self) -> None:
+        arquivos = sorted(self.diretorio.glob("*" + EXTENSAO), key=lambda a: a.stat().st_mtime)
+        for arquivo in arquivos[:max(len(arquivos) - self.max_arquivos, 0)]:
+            arquivo.unlink(missing_ok=True)
+
+    def arquivos(self) -> List[Path]:
+        if not self.diretorio.is_dir():
+            return []
+        return sorted(self.diretorio.glob("*" + EXTENSAO), key=lambda a: a.stat().st_mtime, reverse=True)
+
+    def arquivo(self, nome: str) -> Optional[Path]:
+        """Caminho de um perfil pelo nome; None se o nome for inválido (ex: tentativa de sair do diretório) ou não existir."""
+        if not _NOME_ARQUIVO_VALIDO.match(nome):
+            return None
+        caminho = self.diretorio / nome
+        return caminho if caminho.is_file() else None
+
+
+def _pedido_por_admin(scope) -> bool:
+    """O cabeçalho X-Perfilar só vale para requisições autenticadas por um administrador."""
+    cabecalhos = dict(scope["headers"])
+    if cabecalhos.get(CABECALHO_PERFILAR) not in (b"1", b"true"):
+        return False
+    autorizacao = cabecalhos.get(b"authorization", b"").decode("latin-1")
+    if not autorizacao.lower().startswith("bearer "):
+        return False
+    payload = decode_access_token(autorizacao[7:])
+    return bool(payload) and payload.get("role") == "admin"
+
+
+_perfilador = Perfilador()
+
+
+def obter_perfilador() -> Perfilador:
+    return _perfilador
+
+
+class PerfiladorMiddleware:
+    """Perfila as requisições escolhidas pelo Perfilador; nas demais, o custo é um contador e uma comparação de prefixo."""
+
+    def __init__(self, app, ignorar: tuple = (), perfilador: Optional[Perfilador] = None):
+        self.app = app
+        self.ignorar = ignorar
+        self.perfilador = perfilador or obter_perfilador()
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or (self.ignorar and scope["path"].startswith(self.ignorar))
+                or not self.perfilador.deve_perfilar(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        status = {"codigo": 500}
+
+        async def send_registrando(message):
+            if message["type"] == "http.response.start":
+                status["codigo"] = message["status"]
+            await send(message)
+
+        inicio = time.perf_counter()
+        perfil = self.perfilador.iniciar()
+        token = _perfil_atual.set(perfil)
+        try:
+            await self.app(scope, receive, send_registrando)
+        finally:
+            _perfil_atual.reset(token)
+            duracao = time.perf_counter() - inicio
+
+            def finalizar():
+                perfil.parar()
+                self.perfilador.salvar(scope, perfil, status["codigo"], duracao)
+
+            # Esperar o amostrador e gravar o arquivo bloqueariam o event loop; a proteção contra cancelamento garante
+            # que o perfil seja gravado mesmo quando o cliente desconecta no meio da requisição
+            with anyio.CancelScope(shield=True):
+                await anyio.to_thread.run_sync(finalizar)
@@ -0,0 +1,93 @@
+import logging
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Optional, TypeVar
+from fastapi import HTTPException, status
+from sqlalchemy.exc import DBAPIError
+from app.core.config import REPETICAO_ESPERA_BASE_MS, REPETICAO_ESPERA_MAX_MS, REPETICAO_MAX_TENTATIVAS
+from app.core.metricas import TRANSACOES_DESISTENCIAS, TRANSACOES_REPETIDAS
+
+logger = logging.getLogger("app.repeticao")
+
+T = TypeVar("T")
+
+# Erros do MySQL/MariaDB em que o InnoDB desfaz a transação (ou o comando) sem ter gravado nada, então repetir é seguro:
+# 1213 = deadlock, 1205 = tempo de espera por lock esgotado. Queda de conexão (2006/2013) fica de fora: se ela acontecer
+# durante o COMMIT, não há como saber se a transação foi gravada
+ERROS_TRANSITORIOS = {1213: "deadlock", 1205: "espera_lock"}
+
+# Só a chamada mais externa repete: um método que chama outro (ex: update_chamado -> update_chamado_campos) não
+# multiplica as tentativas
+_repetindo: ContextVar[bool] = ContextVar("repetindo_transacao", default=False)
+
+
+def codigo_erro_transitorio(erro: BaseException) -> Optional[int]:
+    """
+    Código do erro transitório que causou 'erro', procurando também nas exceções encadeadas: um deadlock dentro de um
+    SAVEPOINT costuma chegar mascarado pela falha do ROLLBACK TO SAVEPOINT (a transação inteira já foi desfeita).
+    """
+    vistos = set()
+    while erro is not None and id(erro) not in vistos:
+        vistos.add(id(erro))
+        if isinstance(erro, DBAPIError) and erro.orig is not None and erro.orig.args:
+            if erro.orig.args[0] in ERROS_TRANSITORIOS:
+                return erro.orig.args[0]
+        erro = erro.__cause__ or erro.__context__
+    return None
+
+
+def _espera(tentativa: int) -> float:
+    """Backoff exponencial com jitter total, para que as transações que colidiram não colidam de novo na repetição."""
+    teto = min(REPETICAO_ESPERA_MAX_MS, REPETICAO_ESPERA_BASE_MS * 2 ** (tentativa - 1))
+    return random.uniform(0, teto) / 1000
+
+
+def executar_com_repeticao(nome: str, funcao: Callable[[], T], desfazer: Optional[Callable[[], None]] = None) -> T:
+    """
+    Executa a transação de 'funcao', repetindo-a (até REPETICAO_MAX_TENTATIVAS vezes no total) quando o banco a desfaz
+    por deadlock ou espera por lock. 'funcao' precisa poder rodar de novo do zero: não pode alterar os argumentos
+    recebidos nem ter efeitos fora do banco antes do commit. 'desfazer' (ex: session.rollback) limpa a sessão entre as
+    tentativas. Esgotadas as tentativas, responde 503 com Retry-After, em vez de um erro 500.
+    """
+    if _repetindo.get():
+        return funcao()
+    token = _repetindo.set(True)
+    try:
+        tentativa = 1
+        while True:
+            try:
+                return funcao()
+            except Exception as e:
+                codigo = codigo_erro_transitorio(e)
+                if codigo is None:
+                    raise
+                if desfazer is not None:
+                    desfazer()
+                if tentativa >= REPETICAO_MAX_TENTATIVAS:
+                    TRANSACOES_DESISTENCIAS.labels(metodo=nome).inc()
+                    logger.warning("%s: %s em %d tentativas, desistindo", nome, ERROS_TRANSITORIOS[codigo], tentativa)
+                    raise HTTPException(
+                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        detail="O banco de dados está ocupado com alterações concorrentes. Tente novamente.",
+                        headers={"Retry-After": "1"},
+                    ) from e
+                TRANSACOES_REPETIDAS.labels(metodo=nome, erro=ERROS_TRANSITORIOS[codigo]).inc()
+                time.sleep(_espera(tentativa))
+                tentativa += 1
+    finally:
+        _repetindo.reset(token)
+
+
+def repetir_transacao(metodo):
+    """
+    Decorador dos métodos de escrita do SQLRepository (executar_com_repeticao com rollback da sessão entre as
+    tentativas). Dentro de um lote, a transação pertence ao lote e quem repete é quem o abriu.
+    """
+    @wraps(metodo)
+    def repetindo(self, *args, **kwargs):
+        if self.em_lote:
+            return metodo(self, *args, **kwargs)
+        return executar_com_repeticao(metodo.__qualname__, lambda: metodo(self, *args, **kwargs), self.db.rollback)
+    return repetindo
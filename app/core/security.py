@@ -5,6 +5,7 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from typing import Optional
 from app.core.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.core.metricas import BCRYPT_DURACAO, cronometrar
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -12,7 +13,8 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     try:
         password_bytes = plain_password.encode('utf-8')
         hashed_password_bytes = hashed_password.encode('utf-8')
-        return bcrypt.checkpw(password_bytes, hashed_password_bytes)
+        with cronometrar(BCRYPT_DURACAO.labels(operacao="verificar")):
+            return bcrypt.checkpw(password_bytes, hashed_password_bytes)
     except (ValueError, TypeError):
         return False
 
@@ -21,7 +23,8 @@ def hash_password(password: str) -> str:
     """Gera o hash de uma senha em texto puro."""
     pwd_bytes = password.encode('utf-8')
     salt = bcrypt.gensalt()
-    hashed_password = bcrypt.hashpw(pwd_bytes, salt)
+    with cronometrar(BCRYPT_DURACAO.labels(operacao="gerar")):
+        hashed_password = bcrypt.hashpw(pwd_bytes, salt)
     return hashed_password.decode('utf-8')
 
 
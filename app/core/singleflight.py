@@ -0,0 +1,94 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List
+from app.core.metricas import SINGLEFLIGHT_CHAMADAS
+
+
+class _Chamada:
+    __slots__ = ("evento", "resultado", "erro", "seguidores")
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+        self.seguidores = 0
+
+
+class SingleFlight:
+    """
+    Coalescência de chamadas idênticas simultâneas: enquanto uma chamada para a chave está em andamento, as demais
+    esperam e recebem o mesmo resultado em vez de repetir a consulta ou o cálculo.
+    O resultado é compartilhado entre threads, então deve ser imutável na prática (ex: schemas pydantic, não modelos ORM).
+    """
+
+    instancias: List["SingleFlight"] = []
+
+    def __init__(self, nome: str, max_chaves_metricas: int = 1000):
+        self.nome = nome
+        self.max_chaves_metricas = max_chaves_metricas
+        self._lock = threading.Lock()
+        self._em_voo: Dict[Hashable, _Chamada] = {}
+        self._metricas: "OrderedDict[Hashable, Dict[str, int]]" = OrderedDict()
+        self.total_execucoes = 0
+        self.total_compartilhadas = 0
+        self._metrica_execucoes = SINGLEFLIGHT_CHAMADAS.labels(nome=nome, tipo="execucao")
+        self._metrica_compartilhadas = SINGLEFLIGHT_CHAMADAS.labels(nome=nome, tipo="compartilhada")
+        SingleFlight.instancias.append(self)
+
+    def executar(self, chave: Hashable, funcao: Callable[[], Any]) -> Any:
+        with self._lock:
+            chamada = self._em_voo.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = _Chamada()
+                self._em_voo[chave] = chamada
+            else:
+                chamada.seguidores += 1
+
+        if not lider:
+            chamada.evento.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return chamada.resultado
+
+        try:
+            chamada.resultado = funcao()
+            return chamada.resultado
+        except BaseException as e:
+            chamada.erro = e
+            raise
+        finally:
+            with self._lock:
+                del self._em_voo[chave]
+                self._registrar(chave, chamada.seguidores)
+            chamada.evento.set()
+
+    def _registrar(self, chave: Hashable, seguidores: int) -> None:
+        self.total_execucoes += 1
+        self.total_compartilhadas += seguidores
+        self._metrica_execucoes.inc()
+        if seguidores:
+            self._metrica_compartilhadas.inc(seguidores)
+        metricas = self._metricas.pop(chave, None) or {"execucoes": 0, "compartilhadas": 0}
+        metricas["execucoes"] += 1
+        metricas["compartilhadas"] += seguidores
+        self._metricas[chave] = metricas
+        while len(self._metricas) > self.max_chaves_metricas:
+            self._metricas.popitem(last=False)
+
+    def estatisticas(self) -> dict:
+        """
+        Quantas execuções reais aconteceram e quantas chamadas foram atendidas com o resultado de outra (economizadas),
+        no total e por chave (apenas as chaves mais recentes).
+        """
+        with self._lock:
+            por_chave = {str(chave): dict(metricas) for chave, metricas in self._metricas.items()}
+            total = self.total_execucoes + self.total_compartilhadas
+            return {
+                "nome": self.nome,
+                "execucoes": self.total_execucoes,
+                "compartilhadas": self.total_compartilhadas,
+                "taxa_economia": round(self.total_compartilhadas / total, 4) if total else 0.0,
+                "em_andamento": len(self._em_voo),
+                "por_chave": por_chave,
+            }
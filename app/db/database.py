@@ -1,27 +1,72 @@
 import os
 from dotenv import load_dotenv
+from fastapi import HTTPException, status
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from app.core.config import DB_POOL_OVERFLOW, DB_POOL_TAMANHO, DB_TEMPO_CONEXAO_SEGUNDOS, REPOSITORIO_BACKEND
+from app.core.consultas import registrar_tempo_limite
+from app.core.disjuntor import CircuitoAberto, Disjuntor, registrar_disjuntor
+from app.core.medicao import registrar_eventos_sql
+from app.core.metricas import registrar_metricas_pool
+from app.core.n_mais_um import registrar_deteccao_n_mais_um
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-if not DATABASE_URL:
+if not DATABASE_URL and REPOSITORIO_BACKEND != "memoria":
     raise ValueError("Variável de ambiente DATABASE_URL não definida, crie uma DATABASE_URL no arquivo .env")
 
-engine = create_engine(DATABASE_URL)
+# Com REPOSITORIO_BACKEND='memoria' e sem DATABASE_URL, a API roda sem banco e get_db não abre sessão
+engine = None
+if DATABASE_URL:
+    # Limita a espera por um servidor que não responde (padrão do PyMySQL: 10s), que segura a thread da requisição
+    argumentos_engine = {}
+    if make_url(DATABASE_URL).get_backend_name() in ("mysql", "mariadb"):
+        argumentos_engine = {"connect_args": {"connect_timeout": DB_TEMPO_CONEXAO_SEGUNDOS},
+                             "pool_size": DB_POOL_TAMANHO, "max_overflow": DB_POOL_OVERFLOW}
+    engine = create_engine(DATABASE_URL, **argumentos_engine)
+disjuntor_banco = Disjuntor("banco")
+if engine is not None:
+    registrar_disjuntor(engine, disjuntor_banco)
+    registrar_eventos_sql(engine)
+    registrar_tempo_limite(engine)
+    registrar_metricas_pool(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+registrar_deteccao_n_mais_um(SessionLocal)
 Base = declarative_base()
 
 
+def _banco_indisponivel(tentar_em: int) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                         detail="Banco de dados indisponível no momento. Tente novamente.",
+                         headers={"Retry-After": str(tentar_em)})
+
+
 def get_db():
     """
-    Dependência do FastAPI para gerenciar a sessão do banco de dados e garantir que a sessão sempre feche depois de cada requisição
+    Dependência do FastAPI para gerenciar a sessão do banco de dados e garantir que a sessão sempre feche depois de cada requisição.
+    Com o disjuntor do banco aberto, responde 503 na hora; a requisição de teste do estado meio aberto conecta já aqui.
     """
+    if engine is None:
+        yield None
+        return
+
+    try:
+        teste = disjuntor_banco.permitir()
+    except CircuitoAberto as e:
+        raise _banco_indisponivel(e.tentar_em)
+
     db = SessionLocal()
     try:
+        if teste:
+            try:
+                db.connection()
+            except DBAPIError:
+                raise _banco_indisponivel(max(1, round(disjuntor_banco.tempo_aberto)))
         yield db
     finally:
         db.close()
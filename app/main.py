@@ -1,14 +1,37 @@
+from contextlib import asynccontextmanager
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.cors import CORSMiddleware
 
+from app.api.endpoints import saude
 from app.api.router import api_router
+from app.core.ciclo_vida import ajustar_threadpool, aquecer, configurar_logs
+from app.core.config import AQUECIMENTO_ATIVO, MEDICAO_ATIVA, METRICAS_ATIVAS, N_MAIS_UM_MODO
+from app.core.idempotencia import IdempotenciaMiddleware
+from app.core.medicao import MedicaoMiddleware
+from app.core.metricas import CONTENT_TYPE_LATEST, MetricasMiddleware, encerrar_worker, gerar_metricas
+from app.core.n_mais_um import NMaisUmMiddleware
+from app.core.perfilador import PerfiladorMiddleware
 
 # TODO: Lembrar de documentar melhor as classes, métodos e utilizar as docstrings para melhorar as descrições no Swagger
 # TODO: Durante a refatoração, documentação e validações, lembrar de alterar algumas ordens dos atributos dos retornos dos Endpoints
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # O servidor só começa a aceitar conexões depois desta etapa, então as primeiras requisições já encontram tudo pronto
+    configurar_logs()
+    ajustar_threadpool()
+    if AQUECIMENTO_ATIVO:
+        await run_in_threadpool(aquecer, _app)
+    yield
+    encerrar_worker()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Fast Ariam API",
     description="API para o sistema de gerenciamento de Ordens de Serviço da Fast Ariam.",
     version="0.1.0" # Protótipo humildão
@@ -21,6 +44,8 @@ origins = [
     # TODO: Adicionar a URL de produção
 ]
 
+# Adicionado antes do CORS para ficar por dentro dele: as respostas repetidas também recebem os cabeçalhos de CORS
+app.add_middleware(IdempotenciaMiddleware, prefixos=("/api/chamados",))
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -28,13 +53,30 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(PerfiladorMiddleware, ignorar=("/api/eventos", "/api/perfilador"))
+if N_MAIS_UM_MODO in ("avisar", "erro"):
+    app.add_middleware(NMaisUmMiddleware, levantar=N_MAIS_UM_MODO == "erro")
+# Por último para ficarem por fora dos demais: os tempos incluem os outros middlewares. O stream de eventos fica aberto
+# enquanto o cliente estiver conectado, então não faz sentido medi-lo; as sondas do balanceador só encheriam o log
+if MEDICAO_ATIVA:
+    app.add_middleware(MedicaoMiddleware, ignorar=("/api/eventos", "/health"))
+if METRICAS_ATIVAS:
+    app.add_middleware(MetricasMiddleware, ignorar=("/api/eventos",))
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 app.include_router(api_router, prefix="/api")
+app.include_router(saude.router, prefix="/health", tags=["Saúde"])
 
+# async: roda no event loop, então continua respondendo mesmo com o threadpool ocupado por requisições presas no banco
 @app.get("/", tags=["Root"])
-def read_root():
+async def read_root():
     return {"status": "A API da Fast Ariam está no ar!"}
 
+
+if METRICAS_ATIVAS:
+    @app.get("/metrics", include_in_schema=False)
+    def metricas():
+        return Response(gerar_metricas(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
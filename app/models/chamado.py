@@ -1,10 +1,11 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, Text, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Boolean, Date, Text, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base
+from app.models.rastreamento import RastreavelMixin
 from app.schemas.base_schemas import StatusChamado
 
 
-class OrdemServico(Base):
+class OrdemServico(RastreavelMixin, Base):
     __tablename__ = "ordem_servico"
     id_os = Column(Integer, primary_key=True, autoincrement=True)
     id_cliente = Column(Integer, ForeignKey("cliente.id_cliente"), nullable=False)
@@ -19,6 +20,15 @@ class OrdemServico(Base):
     pedido = Column(String(100))
     data_faturamento = Column(Date)
     em_garantia = Column(Boolean, nullable=False, default=True)
+    versao = Column(Integer, nullable=False, default=1)
     cliente = relationship("Cliente", back_populates="chamados")
     tecnico = relationship("Tecnico", back_populates="chamados")
     visitas = relationship("Visita", back_populates="ordem_servico", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_ordem_servico_tecnico_updated_at", "id_tecnico_atribuido", "updated_at"),
+        Index("ix_ordem_servico_tecnico_cancelado_status", "id_tecnico_atribuido", "is_cancelled", "status"),
+        Index("ix_ordem_servico_status_cancelado", "status", "is_cancelled"),
+        Index("ix_ordem_servico_cancelado_agendamento", "is_cancelled", "data_agendamento"),
+    )
+    __mapper_args__ = {"version_id_col": versao}
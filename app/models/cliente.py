@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base
+from app.models.rastreamento import RastreavelMixin
 
 
-class Cliente(Base):
+class Cliente(RastreavelMixin, Base):
     __tablename__ = "cliente"
     id_cliente = Column(Integer, primary_key=True, autoincrement=True)
     razao_social = Column(String(100), nullable=False)
@@ -17,4 +18,8 @@ class Cliente(Base):
     cidade = Column(String(100))
     uf = Column(String(2), nullable=False)
     is_active = Column(Boolean, nullable=False, default=True)
-    chamados = relationship("OrdemServico", back_populates="cliente")
\ No newline at end of file
+    chamados = relationship("OrdemServico", back_populates="cliente")
+
+    __table_args__ = (
+        Index("ix_cliente_uf_cidade", "uf", "cidade"),
+    )
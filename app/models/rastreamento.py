@@ -0,0 +1,47 @@
+from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy.dialects import mysql
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from app.db.database import Base
+
+DATA_HORA_PRECISA = DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql", "mariadb")
+
+
+class agora_utc(FunctionElement):
+    """Data e hora atual em UTC calculada pelo próprio banco, com microssegundos (evita depender do relógio de cada worker)."""
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(agora_utc)
+def _agora_utc_padrao(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(agora_utc, "mysql")
+@compiles(agora_utc, "mariadb")
+def _agora_utc_mysql(element, compiler, **kw):
+    return "UTC_TIMESTAMP(6)"
+
+
+@compiles(agora_utc, "sqlite")
+def _agora_utc_sqlite(element, compiler, **kw):
+    return "STRFTIME('%Y-%m-%d %H:%M:%f000', 'now')"
+
+
+class RastreavelMixin:
+    """Adiciona a coluna updated_at, atualizada em toda inserção e UPDATE feito pela aplicação (inclusive os em lote)."""
+    updated_at = Column(DATA_HORA_PRECISA, nullable=False, default=agora_utc(), onupdate=agora_utc(), index=True)
+
+
+class RemocaoSync(Base):
+    """
+    Registro de que um item saiu do escopo de um técnico (ex: chamado reatribuído a outro técnico).
+    Como a linha continua existindo, só o updated_at não basta para o aplicativo do técnico antigo saber que deve removê-la.
+    """
+    __tablename__ = "remocao_sync"
+    id_remocao = Column(Integer, primary_key=True, autoincrement=True)
+    entidade = Column(String(50), nullable=False)
+    id_registro = Column(Integer, nullable=False)
+    id_tecnico = Column(Integer, nullable=False, index=True)
+    removido_em = Column(DATA_HORA_PRECISA, nullable=False, default=agora_utc(), index=True)
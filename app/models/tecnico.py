@@ -2,6 +2,7 @@
 from sqlalchemy import Column, Integer, String, Boolean, JSON, Enum
 from sqlalchemy.orm import relationship
 from app.db.database import Base
+from app.models.rastreamento import RastreavelMixin
 from app.schemas.base_schemas import UserRole
 
 
@@ -10,7 +11,7 @@ from app.schemas.base_schemas import UserRole
 #     tecnico = "tecnico"
 
 
-class Tecnico(Base):
+class Tecnico(RastreavelMixin, Base):
     __tablename__ = "tecnico"
     id_tecnico = Column(Integer, primary_key=True, autoincrement=True)
     nome = Column(String(100), nullable=False)
@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, Text, ForeignKey, Numeric, JSON
+from sqlalchemy import Column, Integer, String, Boolean, Date, Text, ForeignKey, Numeric, JSON, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base
+from app.models.rastreamento import RastreavelMixin
 
 
-class Visita(Base):
+class Visita(RastreavelMixin, Base):
     __tablename__ = "visita"
     id_visita = Column(Integer, primary_key=True, autoincrement=True)
     id_os = Column(Integer, ForeignKey("ordem_servico.id_os"), nullable=False)
@@ -25,5 +26,11 @@ class Visita(Base):
     assinatura_cliente_url = Column(String(255))
     comprovante_pedagio_urls = Column(JSON, nullable=False, server_default='[]')
     comprovante_frete_urls = Column(JSON, nullable=False, server_default='[]')
+    versao = Column(Integer, nullable=False, default=1)
     ordem_servico = relationship("OrdemServico", back_populates="visitas")
     servicos_realizados = relationship("ServicoEquipamento", back_populates="visita", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_visita_data_visita", "data_visita"),
+    )
+    __mapper_args__ = {"version_id_col": versao}
@@ -0,0 +1,221 @@
+import collections.abc
+import copy
+from typing import Any, Dict, Generic, Iterable, List, NamedTuple, Optional, Sequence, Set, Type, TypeVar
+from sqlalchemy import JSON, exists, insert, inspect, select
+from sqlalchemy.orm import Session
+from app.models.rastreamento import agora_utc
+from app.repositories.in_memory_repository import deep_update
+
+ModelT = TypeVar("ModelT")
+
+# Quantidade máxima de ids por cláusula IN; listas maiores são divididas em várias consultas
+TAMANHO_LOTE_IN = 1000
+
+
+class ResultadoUpsert(NamedTuple):
+    inseridos: int
+    atualizados: int
+    # Posição na lista recebida -> motivo, para os registros que não foram gravados
+    rejeitados: Dict[int, str]
+
+
+class BaseRepository(Generic[ModelT]):
+    """
+    Operações genéricas de acesso a uma tabela, sem commit: quem controla a transação é o SQLRepository.
+    As subclasses informam o modelo e, se houver, a coluna de soft delete e se a tabela tem a coluna 'versao'.
+    """
+
+    modelo: Type[ModelT]
+    coluna_soft_delete: Optional[str] = None
+    valor_soft_delete: Any = False
+    versionado: bool = False
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @property
+    def chave_primaria(self):
+        return inspect(self.modelo).primary_key[0]
+
+    @property
+    def colunas(self) -> Dict[str, Any]:
+        return {attr.key: attr.columns[0] for attr in inspect(self.modelo).column_attrs}
+
+    def get(self, id_registro: Any, opcoes: Sequence = (), atualizar: bool = False) -> Optional[ModelT]:
+        """Busca pela chave primária. Com atualizar=True, sobrescreve a instância que já estiver na sessão."""
+        query = self.db.query(self.modelo).options(*opcoes).filter(self.chave_primaria == id_registro)
+        if atualizar:
+            query = query.populate_existing()
+        return query.first()
+
+    def get_many(self, ids: Iterable[Any], opcoes: Sequence = ()) -> Dict[Any, ModelT]:
+        """Busca vários registros com IN (uma consulta a cada TAMANHO_LOTE_IN ids), indexados pela chave primária."""
+        ids = list(dict.fromkeys(ids))
+        encontrados = {}
+        for inicio in range(0, len(ids), TAMANHO_LOTE_IN):
+            lote = ids[inicio:inicio + TAMANHO_LOTE_IN]
+            for registro in self.db.query(self.modelo).options(*opcoes).filter(self.chave_primaria.in_(lote)):
+                encontrados[getattr(registro, self.chave_primaria.key)] = registro
+        return encontrados
+
+    def exists(self, id_registro: Any, *condicoes) -> bool:
+        return self.db.query(exists().where(self.chave_primaria == id_registro, *condicoes)).scalar()
+
+    def ids_existentes(self, ids: Iterable[Any], *condicoes) -> Set[Any]:
+        """Quais dos ids existem (e atendem às condições), sem carregar as linhas."""
+        ids = list(dict.fromkeys(ids))
+        existentes = set()
+        for inicio in range(0, len(ids), TAMANHO_LOTE_IN):
+            lote = ids[inicio:inicio + TAMANHO_LOTE_IN]
+            existentes.update(self.db.scalars(select(self.chave_primaria).where(self.chave_primaria.in_(lote), *condicoes)))
+        return existentes
+
+    def buscar_por_coluna(self, coluna: str, valores: Iterable[Any]) -> Dict[Any, Any]:
+        """Mapeia valor -> chave primária para os valores da coluna (única) que já existem, com IN."""
+        campo = getattr(self.modelo, coluna)
+        valores = [valor for valor in dict.fromkeys(valores) if valor is not None]
+        encontrados = {}
+        for inicio in range(0, len(valores), TAMANHO_LOTE_IN):
+            lote = valores[inicio:inicio + TAMANHO_LOTE_IN]
+            encontrados.update(self.db.execute(select(campo, self.chave_primaria).where(campo.in_(lote))).all())
+        return encontrados
+
+    def list(
+            self,
+            apos: Optional[Any] = None,
+            limite: Optional[int] = None,
+            opcoes: Sequence = (),
+            **filtros
+    ) -> List[ModelT]:
+        """
+        Lista ordenada pela chave primária, com paginação por cursor (keyset): 'apos' é a chave do último registro da
+        página anterior. Filtros com valor None são ignorados.
+        """
+        query = self.db.query(self.modelo).options(*opcoes)
+        for campo, valor in filtros.items():
+            if valor is not None:
+                query = query.filter(getattr(self.modelo, campo) == valor)
+        if apos is not None:
+            query = query.filter(self.chave_primaria > apos)
+        query = query.order_by(self.chave_primaria)
+        if limite is not None:
+            query = query.limit(limite)
+        return query.all()
+
+    def update_parcial(self, id_registro: Any, dados: Dict[str, Any], *condicoes) -> int:
+        """
+        UPDATE ... SET apenas das colunas informadas (campos que não são colunas são ignorados), sem carregar o registro.
+        Dicts em colunas JSON são mesclados ao valor atual, lido apenas para essas colunas.
+        Em tabelas versionadas, incrementa a versão. Retorna quantos registros atenderam ao filtro.
+        """
+        colunas = self.colunas
+        valores = {campo: valor for campo, valor in dados.items() if campo in colunas}
+        valores = self._mesclar_json(id_registro, valores, colunas)
+        if self.versionado:
+            valores["versao"] = self.modelo.versao + 1
+        if not valores:
+            return 1 if self.exists(id_registro, *condicoes) else 0
+
+        return self.db.query(self.modelo).filter(self.chave_primaria == id_registro, *condicoes).update(
+            valores, synchronize_session=False
+        )
+
+    def _mesclar_json(self, id_registro: Any, valores: Dict[str, Any], colunas: Dict[str, Any]) -> Dict[str, Any]:
+        campos_json = [campo for campo, valor in valores.items()
+                       if isinstance(valor, collections.abc.Mapping) and isinstance(colunas[campo].type, JSON)]
+        if not campos_json:
+            return valores
+
+        atuais = self.db.query(*(getattr(self.modelo, campo) for campo in campos_json)).filter(
+            self.chave_primaria == id_registro
+        ).first()
+        if atuais is None:
+            return valores
+        for campo, atual in zip(campos_json, atuais):
+            valores[campo] = deep_update(copy.deepcopy(atual or {}), valores[campo])
+        return valores
+
+    def insert_many(self, registros: List[Dict[str, Any]]) -> List[Any]:
+        """
+        INSERT de várias linhas por comando (TAMANHO_LOTE_IN por vez), sem commit. Retorna as chaves primárias geradas,
+        na ordem dos registros. Os registros devem ter as mesmas colunas.
+        Com RETURNING (SQLite, PostgreSQL, MariaDB) as chaves vêm do próprio comando. O MySQL não tem RETURNING: um
+        INSERT com a lista de VALUES é um "simple insert", que recebe de uma vez valores consecutivos em qualquer
+        innodb_autoinc_lock_mode (inclusive no 2, padrão do MySQL 8), e as chaves saem de LAST_INSERT_ID() (supõe o
+        auto_increment_increment padrão, 1).
+        """
+        if not registros:
+            return []
+        tabela = self.modelo.__table__
+        returning = self.db.get_bind().dialect.insert_returning
+
+        ids = []
+        for inicio in range(0, len(registros), TAMANHO_LOTE_IN):
+            lote = registros[inicio:inicio + TAMANHO_LOTE_IN]
+            if returning:
+                # Chaves autoincrementais de um mesmo comando crescem na ordem dos VALUES
+                ids.extend(sorted(self.db.scalars(insert(tabela).values(lote).returning(self.chave_primaria))))
+            else:
+                primeiro = self.db.execute(insert(tabela).values(lote)).lastrowid
+                ids.extend(range(primeiro, primeiro + len(lote)))
+        return ids
+
+    def upsert_many(self, registros: List[Dict[str, Any]], chave: str) -> None:
+        """
+        INSERT de várias linhas por comando; linhas cuja coluna única 'chave' já existe são atualizadas no lugar.
+        Usa ON DUPLICATE KEY UPDATE no MySQL/MariaDB e ON CONFLICT no SQLite/PostgreSQL. Os registros devem ter as
+        mesmas colunas.
+        """
+        if not registros:
+            return
+        tabela = self.modelo.__table__
+        colunas_update = [campo for campo in registros[0] if campo not in (chave, self.chave_primaria.key)]
+        dialeto = self.db.get_bind().dialect.name
+
+        for inicio in range(0, len(registros), TAMANHO_LOTE_IN):
+            lote = registros[inicio:inicio + TAMANHO_LOTE_IN]
+            if dialeto in ("mysql", "mariadb"):
+                from sqlalchemy.dialects.mysql import insert
+                stmt = insert(tabela).values(lote)
+                stmt = stmt.on_duplicate_key_update(self._valores_upsert(stmt.inserted, colunas_update))
+            elif dialeto in ("sqlite", "postgresql"):
+                if dialeto == "sqlite":
+                    from sqlalchemy.dialects.sqlite import insert
+                else:
+                    from sqlalchemy.dialects.postgresql import insert
+                stmt = insert(tabela).values(lote)
+                stmt = stmt.on_conflict_do_update(index_elements=[chave],
+                                                  set_=self._valores_upsert(stmt.excluded, colunas_update))
+            else:
+                raise NotImplementedError(f"Upsert não suportado no dialeto '{dialeto}'.")
+            self.db.execute(stmt)
+
+    def _valores_upsert(self, novos, colunas_update: List[str]) -> Dict[str, Any]:
+        # O onupdate das colunas não é aplicado pelo upsert, então updated_at e versao entram explicitamente
+        valores = {campo: novos[campo] for campo in colunas_update}
+        if "updated_at" in self.colunas:
+            valores["updated_at"] = agora_utc()
+        if self.versionado:
+            valores["versao"] = self.modelo.__table__.c.versao + 1
+        return valores
+
+    def soft_delete_many(self, ids: Iterable[Any]) -> int:
+        """Marca os registros como removidos (ou cancelados) com um UPDATE por lote de ids. Retorna quantos existiam."""
+        if self.coluna_soft_delete is None:
+            raise NotImplementedError(f"{type(self).__name__} não tem coluna de soft delete.")
+
+        valores = {self.coluna_soft_delete: self.valor_soft_delete}
+        if self.versionado:
+            valores["versao"] = self.modelo.versao + 1
+
+        ids = list(dict.fromkeys(ids))
+        total = 0
+        for inicio in range(0, len(ids), TAMANHO_LOTE_IN):
+            lote = ids[inicio:inicio + TAMANHO_LOTE_IN]
+            total += self.db.query(self.modelo).filter(self.chave_primaria.in_(lote)).update(
+                valores, synchronize_session=False
+            )
+        return total
+
+    def soft_delete(self, id_registro: Any) -> bool:
+        return self.soft_delete_many([id_registro]) > 0
@@ -0,0 +1,33 @@
+from typing import Optional
+from sqlalchemy.orm import joinedload
+from app.models.chamado import OrdemServico
+from app.models.servico_equipamento import ServicoEquipamento
+from app.models.visita import Visita
+from app.repositories.base_repository import BaseRepository
+from app.schemas.base_schemas import StatusChamado
+
+# Carrega o chamado com toda a árvore usada nas respostas (visitas, serviços, materiais, cliente e técnico)
+OPCOES_ARVORE_CHAMADO = (
+    joinedload(OrdemServico.visitas)
+    .joinedload(Visita.servicos_realizados)
+    .joinedload(ServicoEquipamento.materiais_utilizados),
+    joinedload(OrdemServico.cliente),
+    joinedload(OrdemServico.tecnico),
+)
+
+
+class ChamadoRepository(BaseRepository[OrdemServico]):
+    modelo = OrdemServico
+    coluna_soft_delete = "is_cancelled"
+    valor_soft_delete = True
+    versionado = True
+
+    @staticmethod
+    def filtrar(query, is_cancelled: Optional[bool], id_tecnico: Optional[int], status: Optional[StatusChamado] = None):
+        if status is not None:
+            query = query.filter(OrdemServico.status == status)
+        if is_cancelled is not None:
+            query = query.filter(OrdemServico.is_cancelled == is_cancelled)
+        if id_tecnico is not None:
+            query = query.filter(OrdemServico.id_tecnico_atribuido == id_tecnico)
+        return query
@@ -0,0 +1,8 @@
+from app.models.cliente import Cliente
+from app.repositories.base_repository import BaseRepository
+
+
+class ClienteRepository(BaseRepository[Cliente]):
+    modelo = Cliente
+    coluna_soft_delete = "is_active"
+    valor_soft_delete = False
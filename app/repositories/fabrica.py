@@ -0,0 +1,14 @@
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.core.config import REPOSITORIO_BACKEND
+from app.repositories.mysql_repository import SQLRepository
+
+
+def criar_repositorio(db: Optional[Session]):
+    """Repositório do backend configurado em REPOSITORIO_BACKEND ('mysql' ou 'memoria'), usado pelas dependências dos endpoints."""
+    if REPOSITORIO_BACKEND == "memoria":
+        from app.repositories.in_memory_repository import InMemoryRepository
+        return InMemoryRepository()
+    if REPOSITORIO_BACKEND == "mysql":
+        return SQLRepository(db=db)
+    raise ValueError(f"REPOSITORIO_BACKEND inválido: '{REPOSITORIO_BACKEND}'. Use 'mysql' ou 'memoria'.")
@@ -1,12 +1,28 @@
-# Repositório para simular um banco de dados enquanto o final não fica pronto
-import csv
-import json
+# Repositório em memória com a mesma interface do SQLRepository, para rodar a API sem banco (testes e benchmarks)
 import collections.abc
-from typing import List, Dict, Any, Optional
-from datetime import date
-
-TECNICOS_CSV = 'tecnicos_db.csv'
-CHAMADOS_CSV = 'chamados_db.csv'
+import copy
+import json
+import threading
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional, Set
+from fastapi import HTTPException
+from sqlalchemy import JSON, inspect
+from app.models.tecnico import Tecnico
+from app.models.cliente import Cliente
+from app.models.chamado import OrdemServico
+from app.models.visita import Visita
+from app.models.servico_equipamento import ServicoEquipamento
+from app.models.material import Material
+from app.models.rastreamento import RemocaoSync
+from app.schemas.base_schemas import StatusChamado, UserRole
+from app.schemas.tecnico import TecnicoUpdate
+from app.schemas.cliente import ClienteUpdate
+from app.schemas.visita import VisitaUpdate
+from app.services.visita_service import dados_chamado_pela_visita
 
 
 def deep_update(d, u):
@@ -24,115 +40,569 @@ def json_converter(o):
     return None
 
 
-# class InMemoryRepository:
-#     def __init__(self, collection_name: str):
-#         self._collection_name = collection_name
-#         self._csv_file = f"{collection_name}_db.csv"
-#         self._collection = self._load_from_csv()
-#         if self._collection:
-#             self._next_id = max(int(item.get('id', 0)) for item in self._collection) + 1
-#         else:
-#             self._next_id = 1
-#
-#     def _load_from_csv(self) -> List[Dict[str, Any]]:
-#         try:
-#             with open(self._csv_file, mode='r', newline='', encoding='utf-8') as file:
-#                 reader = csv.DictReader(file)
-#                 data = []
-#                 for row in reader:
-#
-#                     int_fields = ['id', 'cliente_id', 'id_tecnico_atribuido',
-#                                   'codigo']  # Resolve os problemas de ints tratadas como strings
-#                     for field in int_fields:
-#                         if field in row:
-#                             value = row[field]
-#                             if value == '':
-#                                 row[field] = None
-#                             else:
-#                                 try:
-#                                     row[field] = int(row[field])
-#                                 except (ValueError, TypeError):
-#                                     row[field] = None
-#
-#                     json_fields = ['dados_bancarios', 'cliente', 'visitas', 'materiais_utilizados', "contato_principal",
-#                                    'comprovante_pedagio_urls',
-#                                    'comprovante_frete_urls']  # Resolve os problemas de JSON aninhado que são tratados como strings
-#                     for field in json_fields:
-#                         if field in row and row[field]:
-#                             try:
-#                                 row[field] = json.loads(row[field])
-#                             except json.JSONDecodeError:
-#                                 pass
-#
-#                     bool_fields = ['is_active', 'is_cancelled',
-#                                    'em_garantia']  # Resolve os problemas de booleans sendo tratados como strings
-#                     for field in bool_fields:
-#                         if field in row:
-#                             row[field] = row[field] == 'True'
-#
-#                     optional_date_fields = ['data_conclusao', 'data_faturamento', 'data_agendamento']
-#                     for field in optional_date_fields:
-#                         if field in row and row[field] == '':
-#                             row[field] = None
-#
-#                     data.append(row)
-#                 return data
-#         except FileNotFoundError:
-#             return []
-#
-#     def _save_to_csv(self):
-#         if not self._collection:
-#             return
-#
-#         data_to_save = []
-#         for item in self._collection:
-#             item_copy = item.copy()
-#             for key, value in item_copy.items():
-#                 if isinstance(value, (dict, list)):
-#                     item_copy[key] = json.dumps(value, default=json_converter)
-#             data_to_save.append(item_copy)
-#
-#         with open(self._csv_file, mode='w', newline='', encoding='utf-8') as file:
-#             writer = csv.DictWriter(file, fieldnames=data_to_save[0].keys())
-#             writer.writeheader()
-#             writer.writerows(data_to_save)
-#
-#     def create(self, item_data: Dict[str, Any]) -> Dict[str, Any]:
-#         item_data["id"] = self._next_id
-#         self._collection.append(item_data)
-#         self._next_id += 1
-#         self._save_to_csv()
-#         return item_data
-#
-#     def get_all(self, is_active: Optional[bool] = None) -> List[Dict[str, Any]]:
-#         if is_active is None:
-#             return self._collection
-#         return [item for item in self._collection if item.get('is_active') == is_active]
-#
-#     def get_by_id(self, item_id: int) -> Dict[str, Any] | None:
-#         for item in self._collection:
-#             if item.get("id") == item_id:
-#                 return item
-#         return None
-#
-#     def update(self, item_id: int, item_data: Dict[str, Any]) -> Dict[str, Any] | None:
-#         item_to_update = self.get_by_id(item_id)
-#         if item_to_update is None:
-#             return None
-#
-#         updated_item = deep_update(item_to_update, item_data)
-#         self._save_to_csv()
-#         return updated_item
-#
-#     def delete(self, item_id: int) -> bool:
-#         item_to_deactivate = self.get_by_id(item_id)
-#         if item_to_deactivate is None:
-#             return False
-#
-#         if 'is_active' in item_to_deactivate:
-#             item_to_deactivate['is_active'] = False
-#         if 'is_cancelled' in item_to_deactivate:
-#             item_to_deactivate['is_cancelled'] = True
-#
-#         self._save_to_csv()
-#         return True
+VersaoChamado = namedtuple("VersaoChamado", "versao id_tecnico_atribuido is_cancelled")
+ResumoChamado = namedtuple("ResumoChamado", "id_os status is_cancelled id_tecnico_atribuido versao")
+VersaoVisita = namedtuple("VersaoVisita", "versao id_os id_tecnico_atribuido is_cancelled")
+
+
+def _agora() -> datetime:
+    # Mesmo formato do updated_at gravado pelo banco: UTC sem fuso
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _valor_status(status) -> str:
+    return getattr(status, "value", status)
+
+
+class ArmazenamentoMemoria:
+    """
+    Dados do backend em memória, compartilhados por todas as requisições do processo.
+    Os registros são instâncias transitórias dos próprios modelos ORM (sem sessão), então os schemas de resposta
+    funcionam sem alteração. Além do índice pela chave primária de cada tabela, mantém índices de técnicos por email
+    e de chamados por técnico atribuído e por status, para que as consultas mais comuns não percorram todos os chamados.
+    Toda leitura e escrita acontece com o lock, então cada operação do repositório é atômica.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.tabelas: Dict[str, Dict[int, Any]] = defaultdict(dict)
+        self._ultimos_ids: Dict[str, int] = defaultdict(int)
+        self.tecnico_por_email: Dict[str, int] = {}
+        self.chamados_por_tecnico: Dict[Optional[int], Set[int]] = defaultdict(set)
+        self.chamados_por_status: Dict[str, Set[int]] = defaultdict(set)
+        self.remocoes: List[RemocaoSync] = []
+
+    def inserir(self, obj):
+        """Atribui a chave primária e os valores padrão das colunas (o que o banco faria no INSERT) e guarda o registro."""
+        mapper = inspect(type(obj))
+        tabela = mapper.local_table.name
+        chave = mapper.primary_key[0].key
+        if getattr(obj, chave) is None:
+            self._ultimos_ids[tabela] += 1
+            setattr(obj, chave, self._ultimos_ids[tabela])
+        else:
+            self._ultimos_ids[tabela] = max(self._ultimos_ids[tabela], getattr(obj, chave))
+
+        for attr in mapper.column_attrs:
+            coluna = attr.columns[0]
+            if getattr(obj, attr.key) is not None:
+                continue
+            if coluna.default is not None and coluna.default.is_scalar:
+                setattr(obj, attr.key, coluna.default.arg)
+            elif attr.key == "updated_at" or (coluna.default is not None and coluna.default.is_clause_element):
+                setattr(obj, attr.key, _agora())
+            elif coluna.server_default is not None and isinstance(coluna.type, JSON):
+                setattr(obj, attr.key, [])
+
+        self.tabelas[tabela][getattr(obj, chave)] = obj
+        return obj
+
+    def indexar_chamado(self, chamado: OrdemServico, tecnico_anterior=None, status_anterior=None) -> None:
+        self.chamados_por_tecnico[tecnico_anterior].discard(chamado.id_os)
+        self.chamados_por_status[_valor_status(status_anterior)].discard(chamado.id_os)
+        self.chamados_por_tecnico[chamado.id_tecnico_atribuido].add(chamado.id_os)
+        self.chamados_por_status[_valor_status(chamado.status)].add(chamado.id_os)
+
+    def indexar_tecnico(self, tecnico: Tecnico, email_anterior: Optional[str] = None) -> None:
+        if email_anterior:
+            self.tecnico_por_email.pop(email_anterior.lower(), None)
+        self.tecnico_por_email[tecnico.email.lower()] = tecnico.id_tecnico
+
+
+_armazenamento: Optional[ArmazenamentoMemoria] = None
+_armazenamento_lock = threading.Lock()
+
+
+def obter_armazenamento() -> ArmazenamentoMemoria:
+    """Armazenamento do processo, criado (e carregado de REPOSITORIO_MEMORIA_ARQUIVO, se houver) uma única vez."""
+    global _armazenamento
+    if _armazenamento is None:
+        with _armazenamento_lock:
+            if _armazenamento is None:
+                from app.core.config import REPOSITORIO_MEMORIA_ARQUIVO
+                armazenamento = ArmazenamentoMemoria()
+                if REPOSITORIO_MEMORIA_ARQUIVO:
+                    carregar_arquivo(InMemoryRepository(armazenamento), REPOSITORIO_MEMORIA_ARQUIVO)
+                _armazenamento = armazenamento
+    return _armazenamento
+
+
+def carregar_arquivo(repo: "InMemoryRepository", caminho: str) -> None:
+    """
+    Carrega os dados iniciais de um JSON com as listas 'tecnicos', 'clientes' e 'chamados' (com as visitas).
+    Técnicos podem trazer 'password' em vez de 'password_hash'.
+    """
+    from app.core.security import hash_password
+
+    with open(caminho, encoding="utf-8") as arquivo:
+        dados = json.load(arquivo)
+
+    for tecnico in dados.get("tecnicos", []):
+        if "password" in tecnico:
+            tecnico["password_hash"] = hash_password(tecnico.pop("password"))
+        repo.create_tecnico(tecnico)
+    for cliente in dados.get("clientes", []):
+        repo.create_cliente(cliente)
+    for chamado in dados.get("chamados", []):
+        visitas = chamado.pop("visitas", [])
+        for campo in ("data_abertura", "data_agendamento", "data_conclusao", "data_faturamento"):
+            if chamado.get(campo):
+                chamado[campo] = date.fromisoformat(chamado[campo])
+        chamado_db = repo.create_chamado(chamado)
+        for visita in visitas:
+            visita["data_visita"] = date.fromisoformat(visita["data_visita"])
+            repo.create_visita(chamado_db.id_os, visita)
+
+
+class InMemoryRepository:
+    """
+    Implementação em memória da interface do SQLRepository (REPOSITORIO_BACKEND='memoria').
+    Não há transações: lote() apenas segura o lock durante o lote inteiro, e ponto_de_salvamento() não desfaz nada,
+    o que basta porque as operações validam tudo (versão, regras de finalização) antes de alterar os registros.
+    """
+
+    def __init__(self, armazenamento: Optional[ArmazenamentoMemoria] = None):
+        self._dados = armazenamento or obter_armazenamento()
+        self._em_lote = False
+
+    @property
+    def em_lote(self) -> bool:
+        return self._em_lote
+
+    @contextmanager
+    def lote(self):
+        with self._dados.lock:
+            self._em_lote = True
+            try:
+                yield self
+            finally:
+                self._em_lote = False
+
+    @contextmanager
+    def ponto_de_salvamento(self):
+        yield self
+
+    def _tabela(self, modelo) -> Dict[int, Any]:
+        return self._dados.tabelas[modelo.__tablename__]
+
+    def _listar(self, modelo, ids=None, apos: Optional[int] = None, limite: Optional[int] = None, **filtros) -> list:
+        tabela = self._tabela(modelo)
+        ids = sorted(tabela if ids is None else ids)
+        if apos is not None:
+            ids = [id_registro for id_registro in ids if id_registro > apos]
+        registros = []
+        for id_registro in ids:
+            registro = tabela.get(id_registro)
+            if registro is None or any(valor is not None and getattr(registro, campo) != valor
+                                       for campo, valor in filtros.items()):
+                continue
+            registros.append(registro)
+            if limite is not None and len(registros) >= limite:
+                break
+        return registros
+
+    @staticmethod
+    def _atualizar_campos(obj, dados: Dict[str, Any]) -> None:
+        colunas = {attr.key: attr.columns[0] for attr in inspect(type(obj)).column_attrs}
+        for campo, valor in dados.items():
+            if campo not in colunas:
+                continue
+            if isinstance(valor, collections.abc.Mapping) and isinstance(colunas[campo].type, JSON):
+                valor = deep_update(copy.deepcopy(getattr(obj, campo) or {}), valor)
+            setattr(obj, campo, valor)
+        obj.updated_at = _agora()
+
+    @staticmethod
+    def _normalizar_visita(visita_data: dict) -> dict:
+        # Numeric do banco devolve Decimal; mantém o mesmo tipo para o cálculo de custos
+        for campo in ("valor_pedagio", "valor_frete_devolucao"):
+            if visita_data.get(campo) is not None:
+                visita_data[campo] = Decimal(str(visita_data[campo]))
+        return visita_data
+
+    def get_tecnico_by_id(self, tecnico_id: int) -> Optional[Tecnico]:
+        return self._tabela(Tecnico).get(tecnico_id)
+
+    def get_tecnico_by_email(self, email: str) -> Optional[Tecnico]:
+        with self._dados.lock:
+            tecnico_id = self._dados.tecnico_por_email.get(email.lower())
+            return self.get_tecnico_by_id(tecnico_id) if tecnico_id is not None else None
+
+    def get_senha_hash_tecnico(self, tecnico_id: int) -> Optional[str]:
+        tecnico = self.get_tecnico_by_id(tecnico_id)
+        return tecnico.password_hash if tecnico else None
+
+    def get_tecnicos(
+            self,
+            is_active: Optional[bool] = None,
+            apos: Optional[int] = None,
+            limite: Optional[int] = None
+    ) -> list[Tecnico]:
+        with self._dados.lock:
+            return self._listar(Tecnico, apos=apos, limite=limite, is_active=is_active)
+
+    def create_tecnico(self, tecnico_data: dict) -> Tecnico:
+        with self._dados.lock:
+            if tecnico_data["email"].lower() in self._dados.tecnico_por_email:
+                raise HTTPException(status_code=409, detail="Já existe um técnico com este email.")
+            db_tecnico = Tecnico(**tecnico_data)
+            db_tecnico.role = UserRole(_valor_status(db_tecnico.role or UserRole.TECNICO))
+            self._dados.inserir(db_tecnico)
+            self._dados.indexar_tecnico(db_tecnico)
+            return db_tecnico
+
+    def update_tecnico(self, tecnico_id: int, tecnico_in: TecnicoUpdate) -> Optional[Tecnico]:
+        with self._dados.lock:
+            db_tecnico = self.get_tecnico_by_id(tecnico_id)
+            if not db_tecnico:
+                return None
+            email_anterior = db_tecnico.email
+            self._atualizar_campos(db_tecnico, tecnico_in.model_dump(exclude_unset=True))
+            self._dados.indexar_tecnico(db_tecnico, email_anterior)
+            return db_tecnico
+
+    def update_tecnico_senha(self, tecnico_id: int, password_hash: str) -> bool:
+        with self._dados.lock:
+            db_tecnico = self.get_tecnico_by_id(tecnico_id)
+            if not db_tecnico:
+                return False
+            self._atualizar_campos(db_tecnico, {"password_hash": password_hash})
+            return True
+
+    def delete_tecnico(self, tecnico_id: int) -> bool:
+        with self._dados.lock:
+            db_tecnico = self.get_tecnico_by_id(tecnico_id)
+            if not db_tecnico:
+                return False
+            self._atualizar_campos(db_tecnico, {"is_active": False})
+            return True
+
+    def upsert_tecnicos(self, registros: List[dict]):
+        from app.repositories.base_repository import ResultadoUpsert
+
+        with self._dados.lock:
+            por_cnpj = {tecnico.cnpj: tecnico.id_tecnico for tecnico in self._tabela(Tecnico).values()}
+            inseridos, atualizados, rejeitados = 0, 0, {}
+            for indice, registro in enumerate(registros):
+                id_existente = self._dados.tecnico_por_email.get(registro["email"].lower())
+                dono_do_cnpj = por_cnpj.get(registro["cnpj"])
+                if dono_do_cnpj is not None and dono_do_cnpj != id_existente:
+                    rejeitados[indice] = f"cnpj: {registro['cnpj']} já pertence a outro técnico"
+                elif id_existente is not None:
+                    db_tecnico = self.get_tecnico_by_id(id_existente)
+                    self._atualizar_campos(db_tecnico, registro)
+                    db_tecnico.role = UserRole(_valor_status(db_tecnico.role))
+                    atualizados += 1
+                else:
+                    por_cnpj[registro["cnpj"]] = self.create_tecnico(registro).id_tecnico
+                    inseridos += 1
+            return ResultadoUpsert(inseridos, atualizados, rejeitados)
+
+    def get_cliente_by_id(self, cliente_id: int) -> Optional[Cliente]:
+        return self._tabela(Cliente).get(cliente_id)
+
+    def get_clientes(
+            self,
+            is_active: Optional[bool] = None,
+            apos: Optional[int] = None,
+            limite: Optional[int] = None
+    ) -> list[Cliente]:
+        with self._dados.lock:
+            return self._listar(Cliente, apos=apos, limite=limite, is_active=is_active)
+
+    def create_cliente(self, cliente_data: dict) -> Cliente:
+        with self._dados.lock:
+            return self._dados.inserir(Cliente(**cliente_data))
+
+    def update_cliente(self, cliente_id: int, cliente_in: ClienteUpdate) -> Optional[Cliente]:
+        with self._dados.lock:
+            db_cliente = self.get_cliente_by_id(cliente_id)
+            if not db_cliente:
+                return None
+            self._atualizar_campos(db_cliente, cliente_in.model_dump(exclude_unset=True))
+            return db_cliente
+
+    def delete_cliente(self, cliente_id: int) -> bool:
+        with self._dados.lock:
+            db_cliente = self.get_cliente_by_id(cliente_id)
+            if not db_cliente:
+                return False
+            self._atualizar_campos(db_cliente, {"is_active": False})
+            return True
+
+    def upsert_clientes(self, registros: List[dict]):
+        from app.repositories.base_repository import ResultadoUpsert
+
+        with self._dados.lock:
+            por_codigo = {cliente.codigo: cliente for cliente in self._tabela(Cliente).values()}
+            inseridos, atualizados = 0, 0
+            for registro in registros:
+                db_cliente = por_codigo.get(registro["codigo"])
+                if db_cliente is not None:
+                    self._atualizar_campos(db_cliente, registro)
+                    atualizados += 1
+                else:
+                    por_codigo[registro["codigo"]] = self.create_cliente(registro)
+                    inseridos += 1
+            return ResultadoUpsert(inseridos, atualizados, {})
+
+    def _ids_chamados(self, id_tecnico: Optional[int] = None, status: Optional[StatusChamado] = None) -> Optional[set]:
+        """Ids candidatos pelos índices (None quando nenhum filtro indexado foi informado)."""
+        ids = None
+        if id_tecnico is not None:
+            ids = set(self._dados.chamados_por_tecnico.get(id_tecnico, ()))
+        if status is not None:
+            por_status = self._dados.chamados_por_status.get(_valor_status(status), set())
+            ids = set(por_status) if ids is None else ids & por_status
+        return ids
+
+    def get_chamado_by_id(self, chamado_id: int) -> Optional[OrdemServico]:
+        return self._tabela(OrdemServico).get(chamado_id)
+
+    def get_chamados(
+            self,
+            is_cancelled: Optional[bool] = None,
+            id_tecnico: Optional[int] = None,
+            apos: Optional[int] = None,
+            limite: Optional[int] = None,
+            status: Optional[StatusChamado] = None
+    ) -> list[OrdemServico]:
+        with self._dados.lock:
+            return self._listar(OrdemServico, self._ids_chamados(id_tecnico, status), apos=apos, limite=limite,
+                                is_cancelled=is_cancelled)
+
+    def get_chamado_versao(self, chamado_id: int):
+        chamado = self.get_chamado_by_id(chamado_id)
+        if chamado is None:
+            return None
+        return VersaoChamado(chamado.versao, chamado.id_tecnico_atribuido, chamado.is_cancelled)
+
+    def get_versao_colecao_chamados(
+            self,
+            is_cancelled: Optional[bool] = None,
+            id_tecnico: Optional[int] = None,
+            status: Optional[StatusChamado] = None
+    ) -> tuple:
+        chamados = self.get_chamados(is_cancelled=is_cancelled, id_tecnico=id_tecnico, status=status)
+        if not chamados:
+            return 0, None, None, None
+        return (
+            len(chamados),
+            sum(chamado.id_os for chamado in chamados),
+            sum(chamado.versao for chamado in chamados),
+            sum(chamado.id_os * chamado.versao for chamado in chamados),
+        )
+
+    def create_chamado(self, chamado_data: dict) -> OrdemServico:
+        with self._dados.lock:
+            db_chamado = OrdemServico(**chamado_data)
+            db_chamado.status = StatusChamado(_valor_status(db_chamado.status or StatusChamado.ABERTO))
+            db_chamado.cliente = self.get_cliente_by_id(db_chamado.id_cliente)
+            if db_chamado.id_tecnico_atribuido is not None:
+                db_chamado.tecnico = self.get_tecnico_by_id(db_chamado.id_tecnico_atribuido)
+            self._dados.inserir(db_chamado)
+            self._dados.indexar_chamado(db_chamado)
+            return db_chamado
+
+    def get_ids_clientes_ativos(self, ids: List[int]) -> set:
+        clientes = self._tabela(Cliente)
+        return {i for i in ids if i in clientes and clientes[i].is_active}
+
+    def get_ids_tecnicos_ativos(self, ids: List[int]) -> set:
+        tecnicos = self._tabela(Tecnico)
+        return {i for i in ids if i in tecnicos and tecnicos[i].is_active}
+
+    def create_chamados(self, lista_chamados: List[dict]) -> List[int]:
+        with self._dados.lock:
+            return [self.create_chamado(chamado_data).id_os for chamado_data in lista_chamados]
+
+    def update_chamado(
+            self,
+            chamado_id: int,
+            update_data: dict,
+            versao_esperada: Optional[int] = None
+    ) -> Optional[OrdemServico]:
+        if not self.update_chamado_campos(chamado_id, update_data, versao_esperada):
+            return None
+        return self.get_chamado_by_id(chamado_id)
+
+    def update_chamado_campos(self, chamado_id: int, update_data: dict, versao_esperada: Optional[int] = None) -> bool:
+        with self._dados.lock:
+            db_chamado = self.get_chamado_by_id(chamado_id)
+            if db_chamado is None:
+                return False
+            if versao_esperada is not None and db_chamado.versao != versao_esperada:
+                raise HTTPException(status_code=409,
+                                    detail="O chamado foi alterado por outro usuário. Recarregue e tente novamente.")
+            if 'id_tecnico_atribuido' in update_data:
+                self._registrar_saida_do_tecnico(chamado_id, update_data['id_tecnico_atribuido'])
+            self._alterar_chamado(db_chamado, update_data)
+            return True
+
+    def _alterar_chamado(self, db_chamado: OrdemServico, update_data: dict) -> None:
+        tecnico_anterior, status_anterior = db_chamado.id_tecnico_atribuido, db_chamado.status
+        self._atualizar_campos(db_chamado, update_data)
+        if 'status' in update_data:
+            db_chamado.status = StatusChamado(_valor_status(db_chamado.status))
+        if db_chamado.id_tecnico_atribuido != tecnico_anterior:
+            db_chamado.tecnico = self.get_tecnico_by_id(db_chamado.id_tecnico_atribuido)
+        if 'id_cliente' in update_data:
+            db_chamado.cliente = self.get_cliente_by_id(db_chamado.id_cliente)
+        db_chamado.versao += 1
+        self._dados.indexar_chamado(db_chamado, tecnico_anterior, status_anterior)
+
+    def get_chamado_resumo(self, chamado_id: int):
+        chamado = self.get_chamado_by_id(chamado_id)
+        if chamado is None:
+            return None
+        return ResumoChamado(chamado.id_os, chamado.status, chamado.is_cancelled, chamado.id_tecnico_atribuido,
+                             chamado.versao)
+
+    def _registrar_saida_do_tecnico(self, chamado_id: int, novo_tecnico_id: Optional[int]) -> None:
+        tecnico_anterior_id = self.get_chamado_by_id(chamado_id).id_tecnico_atribuido
+        if tecnico_anterior_id is not None and tecnico_anterior_id != novo_tecnico_id:
+            self._dados.remocoes.append(RemocaoSync(entidade=OrdemServico.__tablename__, id_registro=chamado_id,
+                                                    id_tecnico=tecnico_anterior_id, removido_em=_agora()))
+
+    def _incrementar_versao_chamado(self, chamado_id: int) -> None:
+        chamado = self.get_chamado_by_id(chamado_id)
+        if chamado is not None:
+            chamado.versao += 1
+            chamado.updated_at = _agora()
+
+    def delete_chamado(self, chamado_id: int) -> bool:
+        with self._dados.lock:
+            db_chamado = self.get_chamado_by_id(chamado_id)
+            if db_chamado is None:
+                return False
+            self._alterar_chamado(db_chamado, {"is_cancelled": True})
+            return True
+
+    def create_visita(self, chamado_id: int, visita_data: dict) -> Visita:
+        with self._dados.lock:
+            servicos_data = visita_data.pop('servicos_realizados', [])
+            db_visita = Visita(**self._normalizar_visita(visita_data), id_os=chamado_id)
+
+            for servico_data in servicos_data:
+                materiais_data = servico_data.pop('materiais_utilizados', [])
+                db_servico = ServicoEquipamento(**servico_data)
+                for material_data in materiais_data:
+                    material = Material(**material_data)
+                    material.valor = Decimal(str(material.valor))
+                    db_servico.materiais_utilizados.append(material)
+                db_visita.servicos_realizados.append(db_servico)
+
+            self._dados.inserir(db_visita)
+            for db_servico in db_visita.servicos_realizados:
+                db_servico.id_visita = db_visita.id_visita
+                self._dados.inserir(db_servico)
+                for material in db_servico.materiais_utilizados:
+                    material.id_servico = db_servico.id_servico
+                    self._dados.inserir(material)
+
+            self.get_chamado_by_id(chamado_id).visitas.append(db_visita)
+            self._incrementar_versao_chamado(chamado_id)
+            return db_visita
+
+    def get_visita_by_id(self, visita_id: int) -> Optional[Visita]:
+        return self._tabela(Visita).get(visita_id)
+
+    def get_visita_versao(self, visita_id: int):
+        visita = self.get_visita_by_id(visita_id)
+        if visita is None:
+            return None
+        chamado = self.get_chamado_by_id(visita.id_os)
+        return VersaoVisita(visita.versao, visita.id_os, chamado.id_tecnico_atribuido, chamado.is_cancelled)
+
+    def _alterar_visita(self, db_visita: Visita, update_data: dict, incrementar_chamado: bool = True) -> None:
+        self._atualizar_campos(db_visita, self._normalizar_visita(update_data))
+        db_visita.versao += 1
+        if incrementar_chamado:
+            self._incrementar_versao_chamado(db_visita.id_os)
+
+    def update_visita(self, visita_id: int, update_data: dict) -> Optional[Visita]:
+        with self._dados.lock:
+            db_visita = self.get_visita_by_id(visita_id)
+            if db_visita is None:
+                return None
+            update_data.pop('servicos_realizados', None)
+            self._alterar_visita(db_visita, update_data)
+            return db_visita
+
+    def append_visita_file_url(self, visita_id: int, campo: str, url: str) -> bool:
+        with self._dados.lock:
+            db_visita = self.get_visita_by_id(visita_id)
+            if db_visita is None:
+                return False
+            # Nova lista em vez de append: quem está serializando a visita não vê a lista mudar no meio
+            self._alterar_visita(db_visita, {campo: list(getattr(db_visita, campo) or []) + [url]})
+            return True
+
+    def update_visita_e_chamado(
+            self,
+            visita_id: int,
+            chamado_id: int,
+            visita_in: VisitaUpdate,
+            versao_esperada: Optional[int] = None
+    ) -> Optional[Visita]:
+        with self._dados.lock:
+            db_visita = self.get_visita_by_id(visita_id)
+            if not db_visita or db_visita.id_os != chamado_id:
+                return None
+
+            if versao_esperada is not None and db_visita.versao != versao_esperada:
+                raise HTTPException(status_code=409,
+                                    detail="A visita foi alterada por outro usuário. Recarregue e tente novamente.")
+
+            update_data = visita_in.model_dump(exclude_unset=True)
+            if not update_data:
+                return db_visita
+            update_data.pop('servicos_realizados', None)
+            update_data = self._normalizar_visita(update_data)
+
+            # As regras são validadas numa cópia dos valores, antes de alterar a visita
+            proposta = {attr.key: getattr(db_visita, attr.key) for attr in inspect(Visita).column_attrs}
+            proposta.update({campo: valor for campo, valor in update_data.items() if campo in proposta})
+            dados_update_chamado = dados_chamado_pela_visita(SimpleNamespace(**proposta))
+
+            self._alterar_visita(db_visita, update_data, incrementar_chamado=False)
+            self._alterar_chamado(self.get_chamado_by_id(chamado_id), dados_update_chamado)
+            return db_visita
+
+    def get_agora_banco(self) -> datetime:
+        return _agora()
+
+    def get_chamados_alterados(self, desde: Optional[datetime], id_tecnico: Optional[int] = None) -> list[OrdemServico]:
+        with self._dados.lock:
+            return [chamado for chamado in self._listar(OrdemServico, self._ids_chamados(id_tecnico))
+                    if desde is None or chamado.updated_at >= desde]
+
+    def get_visitas_alteradas(self, desde: Optional[datetime], id_tecnico: Optional[int] = None) -> list[Visita]:
+        with self._dados.lock:
+            visitas = []
+            for chamado in self._listar(OrdemServico, self._ids_chamados(id_tecnico)):
+                chamado_alterado = desde is None or chamado.updated_at >= desde
+                visitas.extend(visita for visita in chamado.visitas
+                               if chamado_alterado or visita.updated_at >= desde)
+            return visitas
+
+    def get_clientes_alterados(
+            self,
+            desde: Optional[datetime],
+            id_tecnico: Optional[int] = None,
+            ids_incluir: Optional[set[int]] = None
+    ) -> list[Cliente]:
+        with self._dados.lock:
+            ids = None
+            if id_tecnico is not None:
+                ids = {chamado.id_cliente for chamado in self._listar(OrdemServico, self._ids_chamados(id_tecnico))}
+            return [cliente for cliente in self._listar(Cliente, ids)
+                    if desde is None or cliente.updated_at >= desde or cliente.id_cliente in (ids_incluir or ())]
+
+    def get_remocoes_sync(self, desde: Optional[datetime], id_tecnico: int, entidade: str) -> list[int]:
+        with self._dados.lock:
+            return list(dict.fromkeys(
+                remocao.id_registro for remocao in self._dados.remocoes
+                if remocao.id_tecnico == id_tecnico and remocao.entidade == entidade
+                and (desde is None or remocao.removido_em >= desde)
+            ))
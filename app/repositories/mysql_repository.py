@@ -1,209 +1,491 @@
+import copy
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
-from datetime import date
+from sqlalchemy import func, select, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.exc import StaleDataError
+from contextlib import contextmanager
+from typing import List, Optional, Dict, Any, Callable
+from datetime import datetime
+from app.core.cache import obter_cache_entidades
+from app.core.consultas import rastrear_metodos
+from app.core.repeticao import repetir_transacao
 from app.models.tecnico import Tecnico
 from app.models.cliente import Cliente
 from app.models.chamado import OrdemServico
 from app.models.visita import Visita
 from app.models.servico_equipamento import ServicoEquipamento
 from app.models.material import Material
+from app.models.rastreamento import RemocaoSync, agora_utc
 from app.schemas.base_schemas import StatusChamado
 from app.schemas.tecnico import TecnicoCreate, TecnicoUpdate
 from app.schemas.cliente import ClienteCreate, ClienteUpdate
 from app.schemas.chamado import ChamadoCreate, ChamadoUpdate
 from app.schemas.visita import VisitaCreate, VisitaUpdate
-from app.repositories.in_memory_repository import deep_update
+from app.repositories.base_repository import ResultadoUpsert
+from app.repositories.tecnico_repository import TecnicoRepository
+from app.repositories.cliente_repository import ClienteRepository
+from app.repositories.chamado_repository import ChamadoRepository, OPCOES_ARVORE_CHAMADO
+from app.repositories.visita_repository import VisitaRepository, OPCOES_ARVORE_VISITA
+from app.services.visita_service import dados_chamado_pela_visita
 
+# O cache vale por worker e só é invalidado nos outros com CACHE_INVALIDACAO_DISTRIBUIDA: credenciais ficam de fora para
+# que uma troca de senha valha na hora em todos os workers
+COLUNAS_FORA_DO_CACHE = {"password_hash"}
 
+
+@rastrear_metodos
 class SQLRepository:
+    """
+    Fachada usada pelos endpoints: controla a transação (commit, lotes, SAVEPOINTs), o cache e as regras que envolvem
+    mais de uma tabela. O acesso a cada tabela fica nos repositórios de entidade (BaseRepository).
+    """
+
     def __init__(self, db: Session):
         self.db = db
+        self.tecnicos = TecnicoRepository(db)
+        self.clientes = ClienteRepository(db)
+        self.chamados = ChamadoRepository(db)
+        self.visitas = VisitaRepository(db)
+        self._em_lote = False
+        self._caches_a_invalidar = set()
+
+    @property
+    def em_lote(self) -> bool:
+        return self._em_lote
+
+    @contextmanager
+    def lote(self):
+        """
+        Agrupa várias operações do repositório em uma única transação.
+        Dentro do bloco, os métodos apenas fazem flush; o commit acontece uma vez no final (ou rollback, em caso de erro).
+        """
+        self._em_lote = True
+        try:
+            yield self
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        finally:
+            self._em_lote = False
+            self._invalidar_caches_pendentes()
+
+    @contextmanager
+    def ponto_de_salvamento(self):
+        """SAVEPOINT dentro de um lote: se a operação falhar, só ela é desfeita e o restante do lote continua."""
+        with self.db.begin_nested():
+            yield self
+
+    def _commit(self) -> None:
+        if self._em_lote:
+            self.db.flush()
+        else:
+            self.db.commit()
+
+    def _rollback(self) -> None:
+        # Dentro de um lote quem desfaz é o SAVEPOINT da operação; um rollback aqui descartaria o lote inteiro
+        if not self._em_lote:
+            self.db.rollback()
+
+    def _buscar_com_cache(self, chave: tuple, modelo, carregar: Callable[[], Any]):
+        """
+        Leitura através do cache de clientes/técnicos. O cache guarda apenas os valores das colunas (nunca objetos presos
+        a uma sessão); num acerto, as instâncias são recriadas e anexadas a esta sessão com merge(load=False), sem SELECT.
+        O primeiro elemento da chave é o nome da tabela, invalidado inteiro a cada escrita na entidade.
+        Colunas em COLUNAS_FORA_DO_CACHE não são guardadas; nas instâncias do cache, elas são lidas do banco se acessadas.
+        """
+        cache = obter_cache_entidades()
+        valores = cache.buscar(chave)
+        if valores is not None:
+            if isinstance(valores, list):
+                return [self._instancia_do_cache(modelo, item) for item in valores]
+            return self._instancia_do_cache(modelo, valores)
+
+        geracao = cache.geracao(chave[0])
+        resultado = carregar()
+        if isinstance(resultado, list):
+            cache.guardar(chave, [self._valores_para_cache(obj) for obj in resultado], geracao)
+        elif resultado is not None:
+            cache.guardar(chave, self._valores_para_cache(resultado), geracao)
+        return resultado
+
+    @staticmethod
+    def _valores_para_cache(obj) -> dict:
+        return {attr.key: copy.deepcopy(getattr(obj, attr.key)) for attr in inspect(obj).mapper.column_attrs
+                if attr.key not in COLUNAS_FORA_DO_CACHE}
+
+    def _instancia_do_cache(self, modelo, valores: dict):
+        obj = modelo(**copy.deepcopy(valores))
+        make_transient_to_detached(obj)
+        return self.db.merge(obj, load=False)
+
+    def _invalidar_cache(self, tabela: str) -> None:
+        """Invalida o cache da entidade depois do commit (em um lote, só depois do commit do lote)."""
+        self._caches_a_invalidar.add(tabela)
+        if not self._em_lote:
+            self._invalidar_caches_pendentes()
+
+    def _invalidar_caches_pendentes(self) -> None:
+        pendentes, self._caches_a_invalidar = self._caches_a_invalidar, set()
+        for tabela in pendentes:
+            obter_cache_entidades().invalidar_e_avisar(tabela)
 
     def get_tecnico_by_id(self, tecnico_id: int) -> Optional[Tecnico]:
-        return self.db.query(Tecnico).filter(Tecnico.id_tecnico == tecnico_id).first()
+        return self._buscar_com_cache((Tecnico.__tablename__, "id", tecnico_id), Tecnico,
+                                      lambda: self.tecnicos.get(tecnico_id))
 
     def get_tecnico_by_email(self, email: str) -> Optional[Tecnico]:
-        return self.db.query(Tecnico).filter(Tecnico.email == email).first()
+        """Sem cache: usado no login, que precisa do hash da senha e do is_active atuais (o cache vale por worker)."""
+        return self.tecnicos.get_by_email(email)
 
-    def get_tecnicos(self, is_active: Optional[bool] = None) -> list[type[Tecnico]]:
-        query = self.db.query(Tecnico)
-        if is_active is not None:
-            query = query.filter(Tecnico.is_active == is_active)
-        return query.all()
+    def get_senha_hash_tecnico(self, tecnico_id: int) -> Optional[str]:
+        """Hash atual da senha, lido direto do banco (nunca do cache)."""
+        return self.db.query(Tecnico.password_hash).filter(Tecnico.id_tecnico == tecnico_id).scalar()
 
+    def get_tecnicos(
+            self,
+            is_active: Optional[bool] = None,
+            apos: Optional[int] = None,
+            limite: Optional[int] = None
+    ) -> list[type[Tecnico]]:
+        return self._buscar_com_cache(
+            (Tecnico.__tablename__, "lista", is_active, apos, limite), Tecnico,
+            lambda: self.tecnicos.list(apos=apos, limite=limite, is_active=is_active)
+        )
+
+    @repetir_transacao
     def create_tecnico(self, tecnico_data: dict) -> Tecnico:
         db_tecnico = Tecnico(**tecnico_data)
         self.db.add(db_tecnico)
-        self.db.commit()
+        self._commit()
+        self._invalidar_cache(Tecnico.__tablename__)
         self.db.refresh(db_tecnico)
         return db_tecnico
 
+    @repetir_transacao
     def update_tecnico(self, tecnico_id: int, tecnico_in: TecnicoUpdate) -> Optional[Tecnico]:
-        db_tecnico = self.get_tecnico_by_id(tecnico_id)
-        if not db_tecnico:
+        if not self.tecnicos.update_parcial(tecnico_id, tecnico_in.model_dump(exclude_unset=True)):
             return None
+        self._commit()
+        self._invalidar_cache(Tecnico.__tablename__)
+        return self.tecnicos.get(tecnico_id, atualizar=True)
 
-        update_data = tecnico_in.model_dump(exclude_unset=True)
-
-        db_tecnico_dict = {}
-        for c in db_tecnico.__table__.columns:
-            db_tecnico_dict[c.name] = getattr(db_tecnico, c.name)
-        merged_data = deep_update(db_tecnico_dict, update_data)
-
-        for key, value in merged_data.items():
-            if hasattr(db_tecnico, key):
-                setattr(db_tecnico, key, value)
-        self.db.add(db_tecnico)
-        self.db.commit()
-        self.db.refresh(db_tecnico)
-        return db_tecnico
+    @repetir_transacao
+    def update_tecnico_senha(self, tecnico_id: int, password_hash: str) -> bool:
+        if not self.tecnicos.update_parcial(tecnico_id, {"password_hash": password_hash}):
+            return False
+        self._commit()
+        self._invalidar_cache(Tecnico.__tablename__)
+        return True
 
+    @repetir_transacao
     def delete_tecnico(self, tecnico_id: int) -> bool:
-        db_tecnico = self.get_tecnico_by_id(tecnico_id)
-        if not db_tecnico:
+        if not self.tecnicos.soft_delete(tecnico_id):
             return False
-
-        db_tecnico.is_active = False
-        self.db.commit()
+        self._commit()
+        self._invalidar_cache(Tecnico.__tablename__)
         return True
 
-    def get_cliente_by_id(self, cliente_id: int) -> Optional[Cliente]:
-        return self.db.query(Cliente).filter(Cliente.id_cliente == cliente_id).first()
+    @repetir_transacao
+    def upsert_tecnicos(self, registros: List[dict]) -> ResultadoUpsert:
+        """
+        Insere ou atualiza (pelo email) vários técnicos com INSERTs de várias linhas, em uma única transação.
+        Registros cujo CNPJ já pertence a outro técnico são rejeitados em vez de atualizar esse outro técnico.
+        """
+        try:
+            por_email = {email.lower(): id_tecnico for email, id_tecnico in
+                         self.tecnicos.buscar_por_coluna("email", [r["email"] for r in registros]).items()}
+            por_cnpj = self.tecnicos.buscar_por_coluna("cnpj", [r["cnpj"] for r in registros])
+
+            rejeitados = {}
+            for indice, registro in enumerate(registros):
+                dono_do_cnpj = por_cnpj.get(registro["cnpj"])
+                if dono_do_cnpj is not None and dono_do_cnpj != por_email.get(registro["email"].lower()):
+                    rejeitados[indice] = f"cnpj: {registro['cnpj']} já pertence a outro técnico"
+
+            validos = [registro for indice, registro in enumerate(registros) if indice not in rejeitados]
+            self.tecnicos.upsert_many(validos, "email")
+            self._commit()
+        except Exception:
+            self._rollback()
+            raise
+
+        self._invalidar_cache(Tecnico.__tablename__)
+        atualizados = sum(1 for registro in validos if registro["email"].lower() in por_email)
+        return ResultadoUpsert(len(validos) - atualizados, atualizados, rejeitados)
 
-    def get_clientes(self, is_active: Optional[bool] = None) -> list[type[Cliente]]:
-        query = self.db.query(Cliente)
-        if is_active is not None:
-            query = query.filter(Cliente.is_active == is_active)
-        return query.all()
+    def get_cliente_by_id(self, cliente_id: int) -> Optional[Cliente]:
+        return self._buscar_com_cache((Cliente.__tablename__, "id", cliente_id), Cliente,
+                                      lambda: self.clientes.get(cliente_id))
 
+    def get_clientes(
+            self,
+            is_active: Optional[bool] = None,
+            apos: Optional[int] = None,
+            limite: Optional[int] = None
+    ) -> list[type[Cliente]]:
+        return self._buscar_com_cache(
+            (Cliente.__tablename__, "lista", is_active, apos, limite), Cliente,
+            lambda: self.clientes.list(apos=apos, limite=limite, is_active=is_active)
+        )
+
+    @repetir_transacao
     def create_cliente(self, cliente_data: dict) -> Cliente:
         db_cliente = Cliente(**cliente_data)
         self.db.add(db_cliente)
-        self.db.commit()
+        self._commit()
+        self._invalidar_cache(Cliente.__tablename__)
         self.db.refresh(db_cliente)
         return db_cliente
 
+    @repetir_transacao
     def update_cliente(self, cliente_id: int, cliente_in: ClienteUpdate) -> Optional[Cliente]:
-        db_cliente = self.get_cliente_by_id(cliente_id)
-        if not db_cliente:
+        if not self.clientes.update_parcial(cliente_id, cliente_in.model_dump(exclude_unset=True)):
             return None
-        update_data = cliente_in.model_dump(exclude_unset=True)
-        db_cliente_dict = {}
-        for cliente in db_cliente.__table__.columns:
-            db_cliente_dict[cliente.name] = getattr(db_cliente, cliente.name)
-        merged_data = deep_update(db_cliente_dict, update_data)
-        for key, value in merged_data.items():
-            if hasattr(db_cliente, key):
-                setattr(db_cliente, key, value)
-        self.db.add(db_cliente)
-        self.db.commit()
-        self.db.refresh(db_cliente)
-        return db_cliente
+        self._commit()
+        self._invalidar_cache(Cliente.__tablename__)
+        return self.clientes.get(cliente_id, atualizar=True)
 
+    @repetir_transacao
     def delete_cliente(self, cliente_id: int) -> bool:
-        db_cliente = self.get_cliente_by_id(cliente_id)
-        if not db_cliente:
+        if not self.clientes.soft_delete(cliente_id):
             return False
-        db_cliente.is_active = False
-        self.db.commit()
+        self._commit()
+        self._invalidar_cache(Cliente.__tablename__)
         return True
 
-    def get_chamado_by_id(self, chamado_id: int) -> Optional[OrdemServico]:
-        from sqlalchemy.orm import joinedload
-
-        return self.db.query(OrdemServico).options(
-            joinedload(OrdemServico.visitas)
-            .joinedload(Visita.servicos_realizados)
-            .joinedload(ServicoEquipamento.materiais_utilizados),
-            joinedload(OrdemServico.cliente),
-            joinedload(OrdemServico.tecnico)
-        ).filter(OrdemServico.id_os == chamado_id).first()
+    @repetir_transacao
+    def upsert_clientes(self, registros: List[dict]) -> ResultadoUpsert:
+        """Insere ou atualiza (pelo codigo) vários clientes com INSERTs de várias linhas, em uma única transação."""
+        try:
+            existentes = self.clientes.buscar_por_coluna("codigo", [r["codigo"] for r in registros])
+            self.clientes.upsert_many(registros, "codigo")
+            self._commit()
+        except Exception:
+            self._rollback()
+            raise
 
-    def get_chamados(self) -> list[type[OrdemServico]]:
-        from sqlalchemy.orm import joinedload
+        self._invalidar_cache(Cliente.__tablename__)
+        return ResultadoUpsert(len(registros) - len(existentes), len(existentes), {})
 
-        return self.db.query(OrdemServico).options(
-            joinedload(OrdemServico.visitas)
-            .joinedload(Visita.servicos_realizados)
-            .joinedload(ServicoEquipamento.materiais_utilizados),
-            joinedload(OrdemServico.cliente),
-            joinedload(OrdemServico.tecnico)
-        ).all()
+    def get_chamado_by_id(self, chamado_id: int) -> Optional[OrdemServico]:
+        return self.chamados.get(chamado_id, opcoes=OPCOES_ARVORE_CHAMADO)
 
+    def get_chamados(
+            self,
+            is_cancelled: Optional[bool] = None,
+            id_tecnico: Optional[int] = None,
+            apos: Optional[int] = None,
+            limite: Optional[int] = None,
+            status: Optional[StatusChamado] = None
+    ) -> list[type[OrdemServico]]:
+        return self.chamados.list(apos=apos, limite=limite, opcoes=OPCOES_ARVORE_CHAMADO,
+                                  is_cancelled=is_cancelled, id_tecnico_atribuido=id_tecnico, status=status)
+
+    def get_chamado_versao(self, chamado_id: int):
+        """
+        Busca apenas a versão, o técnico atribuído e o cancelamento do chamado, sem carregar visitas nem relacionamentos.
+        Usado para responder requisições condicionais (If-None-Match) com uma consulta pela chave primária.
+        """
+        return self.db.query(OrdemServico.versao, OrdemServico.id_tecnico_atribuido, OrdemServico.is_cancelled).filter(
+            OrdemServico.id_os == chamado_id
+        ).first()
+
+    def get_versao_colecao_chamados(
+            self,
+            is_cancelled: Optional[bool] = None,
+            id_tecnico: Optional[int] = None,
+            status: Optional[StatusChamado] = None
+    ) -> tuple:
+        """
+        Retorna agregados que mudam sempre que algum chamado da listagem é criado, alterado ou sai do filtro.
+        Como toda alteração na árvore do chamado incrementa sua versão, os agregados bastam para o ETag da listagem.
+        """
+        query = self.db.query(
+            func.count(OrdemServico.id_os),
+            func.sum(OrdemServico.id_os),
+            func.sum(OrdemServico.versao),
+            func.sum(OrdemServico.id_os * OrdemServico.versao),
+        )
+        return tuple(self.chamados.filtrar(query, is_cancelled, id_tecnico, status).one())
+
+    @repetir_transacao
     def create_chamado(self, chamado_data: dict) -> OrdemServico:
         db_chamado = OrdemServico(**chamado_data)
         self.db.add(db_chamado)
-        self.db.commit()
+        self._commit()
         self.db.refresh(db_chamado)
         return db_chamado
 
-    def update_chamado(self, chamado_id: int, update_data: dict) -> Optional[OrdemServico]:
-        rows_updated = self.db.query(OrdemServico).filter(OrdemServico.id_os == chamado_id).update(update_data)
-        if rows_updated == 0:
+    def get_ids_clientes_ativos(self, ids: List[int]) -> set:
+        return self.clientes.ids_existentes(ids, Cliente.is_active == True)
+
+    def get_ids_tecnicos_ativos(self, ids: List[int]) -> set:
+        return self.tecnicos.ids_existentes(ids, Tecnico.is_active == True)
+
+    @repetir_transacao
+    def create_chamados(self, lista_chamados: List[dict]) -> List[int]:
+        """Insere vários chamados com INSERTs de várias linhas, em uma única transação. Retorna os ids na mesma ordem."""
+        try:
+            ids = self.chamados.insert_many(lista_chamados)
+            self._commit()
+        except Exception:
+            self._rollback()
+            raise
+        return ids
+
+    @repetir_transacao
+    def update_chamado(
+            self,
+            chamado_id: int,
+            update_data: dict,
+            versao_esperada: Optional[int] = None
+    ) -> Optional[OrdemServico]:
+        """
+        Atualiza o chamado incrementando sua versão e retorna o chamado completo.
+        Se versao_esperada for informada, a atualização só acontece se o chamado ainda estiver nessa versão (409 caso contrário).
+        """
+        if not self.update_chamado_campos(chamado_id, update_data, versao_esperada):
             return None
-        self.db.commit()
         return self.get_chamado_by_id(chamado_id)
 
+    @repetir_transacao
+    def update_chamado_campos(self, chamado_id: int, update_data: dict, versao_esperada: Optional[int] = None) -> bool:
+        """Mesmo que update_chamado, mas sem recarregar a árvore do chamado. Retorna False se o chamado não existe."""
+        if 'id_tecnico_atribuido' in update_data:
+            self._registrar_saida_do_tecnico(chamado_id, update_data['id_tecnico_atribuido'])
+
+        condicoes = [OrdemServico.versao == versao_esperada] if versao_esperada is not None else []
+        if self.chamados.update_parcial(chamado_id, update_data, *condicoes) == 0:
+            if versao_esperada is not None and self.chamados.exists(chamado_id):
+                self._rollback()
+                raise HTTPException(status_code=409,
+                                    detail="O chamado foi alterado por outro usuário. Recarregue e tente novamente.")
+            return False
+        self._commit()
+        return True
+
+    def get_chamado_resumo(self, chamado_id: int):
+        """Campos do chamado usados nas validações de permissão e status, sem carregar visitas nem relacionamentos."""
+        return self.db.query(
+            OrdemServico.id_os, OrdemServico.status, OrdemServico.is_cancelled,
+            OrdemServico.id_tecnico_atribuido, OrdemServico.versao
+        ).filter(OrdemServico.id_os == chamado_id).first()
+
+    def _registrar_saida_do_tecnico(self, chamado_id: int, novo_tecnico_id: Optional[int]) -> None:
+        """Registra a remoção do chamado no escopo de sincronização do técnico anterior quando ele é reatribuído."""
+        tecnico_anterior_id = self.db.query(OrdemServico.id_tecnico_atribuido).filter(
+            OrdemServico.id_os == chamado_id
+        ).scalar()
+        if tecnico_anterior_id is not None and tecnico_anterior_id != novo_tecnico_id:
+            self.db.add(RemocaoSync(entidade=OrdemServico.__tablename__, id_registro=chamado_id,
+                                    id_tecnico=tecnico_anterior_id))
+
+    def _incrementar_versao_chamado(self, chamado_id: int) -> None:
+        """
+        Incrementa a versão do chamado sem fazer commit.
+        Chamado sempre que algo abaixo dele (visitas, serviços, arquivos) muda, para que a versão represente a árvore toda.
+        """
+        self.db.query(OrdemServico).filter(OrdemServico.id_os == chamado_id).update(
+            {OrdemServico.versao: OrdemServico.versao + 1}, synchronize_session=False
+        )
+
+    def _incrementar_versao_chamado_da_visita(self, visita_id: int) -> None:
+        id_os_da_visita = select(Visita.id_os).where(Visita.id_visita == visita_id).scalar_subquery()
+        self.db.query(OrdemServico).filter(OrdemServico.id_os == id_os_da_visita).update(
+            {OrdemServico.versao: OrdemServico.versao + 1}, synchronize_session=False
+        )
+
+    @repetir_transacao
     def delete_chamado(self, chamado_id: int) -> bool:
-        db_chamado = self.get_chamado_by_id(chamado_id)
-        if not db_chamado:
+        if not self.chamados.soft_delete(chamado_id):
             return False
-        db_chamado.is_cancelled = True
-        self.db.commit()
+        self._commit()
         return True
 
+    @repetir_transacao
     def create_visita(self, chamado_id: int, visita_data: dict) -> Visita:
-        servicos_data = visita_data.pop('servicos_realizados', [])
+        # Os dicts recebidos não são alterados, para que a transação possa ser repetida (repetir_transacao)
+        dados_visita = {campo: valor for campo, valor in visita_data.items() if campo != 'servicos_realizados'}
+        db_visita = Visita(**dados_visita, id_os=chamado_id)
 
-        db_visita = Visita(**visita_data, id_os=chamado_id)
+        for servico_data in visita_data.get('servicos_realizados') or []:
+            dados_servico = {campo: valor for campo, valor in servico_data.items() if campo != 'materiais_utilizados'}
+            db_servico = ServicoEquipamento(**dados_servico)
 
-        for servico_data in servicos_data:
-            materiais_data = servico_data.pop('materiais_utilizados', [])
-            db_servico = ServicoEquipamento(**servico_data)
-
-            for material_data in materiais_data:
+            for material_data in servico_data.get('materiais_utilizados') or []:
                 db_servico.materiais_utilizados.append(Material(**material_data))
 
             db_visita.servicos_realizados.append(db_servico)
 
         self.db.add(db_visita)
-        self.db.commit()
+        self._incrementar_versao_chamado(chamado_id)
+        self._commit()
         self.db.refresh(db_visita)
         return db_visita
 
     def get_visita_by_id(self, visita_id: int) -> Optional[Visita]:
-        from sqlalchemy.orm import joinedload
-        return self.db.query(Visita).options(
-            joinedload(Visita.servicos_realizados)
-            .joinedload(ServicoEquipamento.materiais_utilizados)
-        ).filter(Visita.id_visita == visita_id).first()
+        return self.visitas.get(visita_id, opcoes=OPCOES_ARVORE_VISITA)
 
-    def update_visita(self, visita_id: int, update_data: dict) -> Optional[Visita]:
+    def get_visita_versao(self, visita_id: int):
+        """Busca a versão da visita junto com o chamado e o técnico responsável, sem carregar os serviços."""
+        return self.db.query(
+            Visita.versao, Visita.id_os, OrdemServico.id_tecnico_atribuido, OrdemServico.is_cancelled
+        ).join(OrdemServico, OrdemServico.id_os == Visita.id_os).filter(Visita.id_visita == visita_id).first()
 
-        update_data.pop('servicos_realizados', None)
+    @repetir_transacao
+    def update_visita(self, visita_id: int, update_data: dict) -> Optional[Visita]:
+        update_data = {campo: valor for campo, valor in update_data.items() if campo != 'servicos_realizados'}
+        if not self.visitas.update_parcial(visita_id, update_data):
+            return None
+        self._incrementar_versao_chamado_da_visita(visita_id)
+        self._commit()
+        return self.visitas.get(visita_id, opcoes=OPCOES_ARVORE_VISITA, atualizar=True)
 
-        rows_updated = self.db.query(Visita).filter(Visita.id_visita == visita_id).update(update_data)
+    @repetir_transacao
+    def append_visita_file_url(self, visita_id: int, campo: str, url: str) -> bool:
+        """
+        Acrescenta uma URL em uma das listas JSON de comprovantes da visita diretamente no banco.
+        A lista não é lida e regravada pela aplicação, então uploads simultâneos para a mesma visita não se sobrescrevem.
+        """
+        coluna = getattr(Visita, campo)
+        lista_atual = func.coalesce(coluna, func.json_array())
+        if self.db.get_bind().dialect.name == "sqlite":
+            nova_lista = func.json_insert(lista_atual, "$[#]", url)
+        else:
+            nova_lista = func.json_array_append(lista_atual, "$", url)
+
+        rows_updated = self.db.query(Visita).filter(Visita.id_visita == visita_id).update(
+            {coluna: nova_lista, Visita.versao: Visita.versao + 1}, synchronize_session=False
+        )
         if rows_updated == 0:
-            return None
-        self.db.commit()
-        return self.get_visita_by_id(visita_id)
+            return False
+        self._incrementar_versao_chamado_da_visita(visita_id)
+        self._commit()
+        return True
 
+    @repetir_transacao
     def update_visita_e_chamado(
             self,
             visita_id: int,
             chamado_id: int,
-            visita_in: VisitaUpdate
+            visita_in: VisitaUpdate,
+            versao_esperada: Optional[int] = None
     ) -> Optional[Visita]:
         """
         Atualiza uma visita e, se necessário, o status do chamado pai, validando as regras de negócio para finalização.
         Tudo em uma única transação.
+        Se versao_esperada for informada e a visita já estiver em outra versão, retorna 409 sem alterar nada.
         """
         try:
             visita_db = self.get_visita_by_id(visita_id)
             if not visita_db or visita_db.id_os != chamado_id:
                 return None
 
+            if versao_esperada is not None and visita_db.versao != versao_esperada:
+                raise HTTPException(status_code=409,
+                                    detail="A visita foi alterada por outro usuário. Recarregue e tente novamente.")
+
             update_data = visita_in.dict(exclude_unset=True)
             if not update_data:
                 return visita_db
@@ -214,46 +496,85 @@ class SQLRepository:
                         setattr(visita_db, key, value)
                     else:
                         setattr(visita_db, key, value)
-            dados_update_chamado = {}
-            if visita_db.servico_finalizado is True:
-                if not visita_db.assinatura_cliente_url:
-                    raise HTTPException(status_code=400,
-                                        detail="Assinatura do cliente é obrigatória para finalizar a visita.")
-                if visita_db.km_total > 0:
-                    if not visita_db.odometro_inicio_url or not visita_db.odometro_fim_url:
-                        raise HTTPException(status_code=400,
-                                            detail="Fotos do odômetro (início e fim) são obrigatórias se km_total > 0.")
-                if visita_db.valor_pedagio > 0:
-                    if not visita_db.comprovante_pedagio_urls:
-                        raise HTTPException(status_code=400,
-                                            detail="Comprovante(s) de pedágio são obrigatórios se valor_pedagio > 0.")
-                if visita_db.valor_frete_devolucao > 0:
-                    if not visita_db.comprovante_frete_urls:
-                        raise HTTPException(status_code=400,
-                                            detail="Comprovante(s) de frete são obrigatórios se valor_frete_devolucao > 0.")
-
-                dados_update_chamado = {"status": StatusChamado.FINALIZADO.value, "data_conclusao": date.today()}
-
-            elif visita_db.servico_finalizado is False:
-                pendencia = visita_db.pendencia
-                dados_update_chamado = {
-                    "status": StatusChamado.PENDENTE.value if pendencia else StatusChamado.EM_ATENDIMENTO.value,
-                    "data_conclusao": None
-                }
+            dados_update_chamado = dados_chamado_pela_visita(visita_db)
 
             self.db.add(visita_db)
 
-            if dados_update_chamado:
-                self.db.query(OrdemServico).filter(OrdemServico.id_os == chamado_id).update(dados_update_chamado)
+            self.db.query(OrdemServico).filter(OrdemServico.id_os == chamado_id).update(
+                {**dados_update_chamado, OrdemServico.versao: OrdemServico.versao + 1}, synchronize_session=False
+            )
 
-            self.db.commit()
+            self._commit()
 
+        except StaleDataError:
+            self._rollback()
+            raise HTTPException(status_code=409,
+                                detail="A visita foi alterada por outro usuário. Recarregue e tente novamente.")
         except HTTPException as e:
-            self.db.rollback()
+            self._rollback()
             raise e
         except Exception as e:
-            self.db.rollback()
+            self._rollback()
             raise e
 
         self.db.refresh(visita_db)
         return visita_db
+
+    def get_agora_banco(self) -> datetime:
+        """Data e hora atual (UTC) segundo o banco, usada como referência dos cursores de sincronização."""
+        return self.db.query(agora_utc()).scalar()
+
+    def get_chamados_alterados(self, desde: Optional[datetime], id_tecnico: Optional[int] = None) -> list[type[OrdemServico]]:
+        """Chamados (sem as visitas) alterados desde o cursor, dentro do escopo do técnico quando informado."""
+        query = self.chamados.filtrar(self.db.query(OrdemServico), None, id_tecnico)
+        if desde is not None:
+            query = query.filter(OrdemServico.updated_at >= desde)
+        return query.all()
+
+    def get_visitas_alteradas(self, desde: Optional[datetime], id_tecnico: Optional[int] = None) -> list[type[Visita]]:
+        """
+        Visitas alteradas desde o cursor, mais as visitas dos chamados alterados no período.
+        Assim, um chamado que acabou de entrar no escopo do técnico chega junto com o seu histórico de visitas.
+        """
+        from sqlalchemy.orm import contains_eager
+
+        query = self.db.query(Visita).join(Visita.ordem_servico).options(
+            contains_eager(Visita.ordem_servico), *OPCOES_ARVORE_VISITA
+        )
+        query = self.chamados.filtrar(query, None, id_tecnico)
+        if desde is not None:
+            query = query.filter((Visita.updated_at >= desde) | (OrdemServico.updated_at >= desde))
+        return query.all()
+
+    def get_clientes_alterados(
+            self,
+            desde: Optional[datetime],
+            id_tecnico: Optional[int] = None,
+            ids_incluir: Optional[set[int]] = None
+    ) -> list[type[Cliente]]:
+        """
+        Clientes dos chamados do técnico alterados desde o cursor.
+        ids_incluir traz clientes que devem ir mesmo sem alteração (ex: clientes de chamados recém-atribuídos).
+        """
+        query = self.db.query(Cliente)
+        if id_tecnico is not None:
+            ids_clientes_do_tecnico = select(OrdemServico.id_cliente).where(
+                OrdemServico.id_tecnico_atribuido == id_tecnico
+            )
+            query = query.filter(Cliente.id_cliente.in_(ids_clientes_do_tecnico))
+        if desde is not None:
+            condicao = Cliente.updated_at >= desde
+            if ids_incluir:
+                condicao = condicao | Cliente.id_cliente.in_(ids_incluir)
+            query = query.filter(condicao)
+        return query.all()
+
+    def get_remocoes_sync(self, desde: Optional[datetime], id_tecnico: int, entidade: str) -> list[int]:
+        """Ids de registros que saíram do escopo do técnico desde o cursor."""
+        query = self.db.query(RemocaoSync.id_registro).filter(
+            RemocaoSync.id_tecnico == id_tecnico,
+            RemocaoSync.entidade == entidade
+        )
+        if desde is not None:
+            query = query.filter(RemocaoSync.removido_em >= desde)
+        return [id_registro for (id_registro,) in query.distinct().all()]
@@ -0,0 +1,12 @@
+from typing import Optional
+from app.models.tecnico import Tecnico
+from app.repositories.base_repository import BaseRepository
+
+
+class TecnicoRepository(BaseRepository[Tecnico]):
+    modelo = Tecnico
+    coluna_soft_delete = "is_active"
+    valor_soft_delete = False
+
+    def get_by_email(self, email: str) -> Optional[Tecnico]:
+        return self.db.query(Tecnico).filter(Tecnico.email == email).first()
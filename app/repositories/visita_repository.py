@@ -0,0 +1,13 @@
+from sqlalchemy.orm import joinedload
+from app.models.servico_equipamento import ServicoEquipamento
+from app.models.visita import Visita
+from app.repositories.base_repository import BaseRepository
+
+OPCOES_ARVORE_VISITA = (
+    joinedload(Visita.servicos_realizados).joinedload(ServicoEquipamento.materiais_utilizados),
+)
+
+
+class VisitaRepository(BaseRepository[Visita]):
+    modelo = Visita
+    versionado = True
@@ -21,6 +21,15 @@ class ChamadoCreate(ChamadoBase):
     pass
 
 
+class ChamadoLoteCreate(BaseModel):
+    chamados: List[ChamadoCreate] = Field(..., min_length=1, max_length=5000,
+                                          description="Chamados a criar; todos são criados ou nenhum é.")
+
+
+class ChamadoLoteResponse(BaseModel):
+    ids: List[int] = Field(..., description="IDs dos chamados criados, na mesma ordem do envio.")
+
+
 class Chamado(ChamadoBase):
     id_os: int
     data_abertura: date
@@ -28,6 +37,7 @@ class Chamado(ChamadoBase):
     data_agendamento: Optional[date] = None
     visitas: List[Visita] = Field(default_factory=list)
     is_cancelled: bool = False
+    versao: int = Field(1, description="Versão atual do registro, também enviada no cabeçalho ETag.")
 
     class Config:
         from_attributes = True
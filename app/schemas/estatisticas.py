@@ -0,0 +1,35 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List
+
+
+class ContagemSingleFlight(BaseModel):
+    execucoes: int
+    compartilhadas: int
+
+
+class EstatisticasSingleFlight(BaseModel):
+    nome: str
+    execucoes: int = Field(description="Chamadas que executaram a consulta ou o cálculo de fato.")
+    compartilhadas: int = Field(description="Chamadas atendidas com o resultado de outra em andamento (economizadas).")
+    taxa_economia: float
+    em_andamento: int
+    por_chave: Dict[str, ContagemSingleFlight] = Field(default_factory=dict,
+                                                       description="Apenas as chaves usadas mais recentemente.")
+
+
+class EstatisticasCache(BaseModel):
+    itens: int
+    max_itens: int
+    ttl_segundos: float
+    acertos: int
+    falhas: int
+    taxa_acerto: float
+    expirados: int
+    descartados: int
+    invalidacoes: int
+
+
+class EstatisticasWorker(BaseModel):
+    pid: int
+    singleflight: List[EstatisticasSingleFlight] = Field(default_factory=list)
+    cache_entidades: EstatisticasCache
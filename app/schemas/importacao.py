@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class ErroImportacao(BaseModel):
+    linha: int = Field(..., description="Linha do arquivo (CSV/NDJSON) ou posição do registro na lista (JSON).")
+    erros: List[str]
+
+
+class RelatorioImportacao(BaseModel):
+    total: int = Field(0, description="Registros lidos do arquivo.")
+    inseridos: int = 0
+    atualizados: int = Field(0, description="Registros que já existiam (mesmo código/email) e foram atualizados.")
+    falhas: int = 0
+    erros: List[ErroImportacao] = Field(default_factory=list)
@@ -0,0 +1,25 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class ConfiguracaoPerfiladorSchema(BaseModel):
+    a_cada: int = Field(0, ge=0, description="Perfila uma a cada N requisições; 0 desliga a amostragem.")
+    rotas: List[str] = Field(default_factory=list,
+                             description="Perfila as requisições cujo caminho começa com um destes prefixos.")
+
+    class Config:
+        from_attributes = True
+
+
+class ArquivoPerfil(BaseModel):
+    nome: str
+    bytes: int
+    criado_em: datetime
+
+
+class EstadoPerfilador(BaseModel):
+    configuracao: ConfiguracaoPerfiladorSchema
+    diretorio: str
+    max_arquivos: int
+    arquivos: List[ArquivoPerfil] = Field(default_factory=list, description="Perfis deste worker, do mais recente.")
@@ -0,0 +1,105 @@
+from pydantic import BaseModel, Field, model_validator
+from datetime import date, datetime
+from typing import Annotated, List, Literal, Optional, Union
+from .base_schemas import StatusChamado
+from .cliente import Cliente
+from .tecnico import Tecnico
+from .visita import Visita, VisitaCreate, VisitaUpdate
+
+
+class ChamadoSync(BaseModel):
+    """Chamado sem as visitas aninhadas; as visitas alteradas vêm separadas na resposta do /sync."""
+    id_os: int
+    id_cliente: int
+    id_tecnico_atribuido: Optional[int] = None
+    status: StatusChamado
+    is_cancelled: bool
+    data_abertura: date
+    data_agendamento: Optional[date] = None
+    data_conclusao: Optional[date] = None
+    descricao_cliente: Optional[str] = None
+    pedido: Optional[str] = None
+    data_faturamento: Optional[date] = None
+    em_garantia: bool = True
+    versao: int
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class VisitaSync(Visita):
+    id_os: int
+    updated_at: datetime
+
+
+class RemovidosSync(BaseModel):
+    """Ids que o aplicativo deve apagar localmente (cancelados, inativados ou que saíram do escopo do técnico)."""
+    chamados: List[int] = Field(default_factory=list)
+    clientes: List[int] = Field(default_factory=list)
+
+
+class SyncResponse(BaseModel):
+    cursor: str = Field(..., description="Valor a ser enviado em 'since' na próxima sincronização.")
+    chamados: List[ChamadoSync] = Field(default_factory=list)
+    visitas: List[VisitaSync] = Field(default_factory=list)
+    clientes: List[Cliente] = Field(default_factory=list)
+    tecnico: Optional[Tecnico] = Field(None, description="Dados do próprio técnico, se foram alterados.")
+    removidos: RemovidosSync = Field(default_factory=RemovidosSync)
+
+
+class OperacaoCriarVisita(BaseModel):
+    """Equivalente a POST /chamados/{chamado_id}/visitas."""
+    tipo: Literal["criar_visita"]
+    chamado_id: int
+    visita: VisitaCreate
+    referencia: Optional[str] = Field(None, description="Identificador local da visita, para ser usado pelas operações seguintes do lote.")
+
+
+class OperacaoAtualizarVisita(BaseModel):
+    """Equivalente a PATCH /chamados/{chamado_id}/visitas/{visita_id}."""
+    tipo: Literal["atualizar_visita"]
+    chamado_id: int
+    visita_id: Optional[int] = None
+    visita_referencia: Optional[str] = Field(None, description="'referencia' de uma visita criada antes no mesmo lote.")
+    visita: VisitaUpdate
+    versao_esperada: Optional[int] = Field(None, description="Mesmo papel do cabeçalho If-Match.")
+
+    @model_validator(mode='after')
+    def check_visita_informada(self) -> 'OperacaoAtualizarVisita':
+        if (self.visita_id is None) == (self.visita_referencia is None):
+            raise ValueError("Informe 'visita_id' ou 'visita_referencia' (apenas um deles).")
+        return self
+
+
+class OperacaoAtualizarStatus(BaseModel):
+    """Mudança de status do chamado feita pelo técnico (ex: registrar pendência)."""
+    tipo: Literal["atualizar_status"]
+    chamado_id: int
+    status: StatusChamado
+    versao_esperada: Optional[int] = Field(None, description="Mesmo papel do cabeçalho If-Match.")
+
+
+OperacaoSync = Annotated[
+    Union[OperacaoCriarVisita, OperacaoAtualizarVisita, OperacaoAtualizarStatus],
+    Field(discriminator="tipo")
+]
+
+
+class LoteSyncRequest(BaseModel):
+    operacoes: List[OperacaoSync] = Field(..., min_length=1, max_length=500,
+                                          description="Operações feitas offline, na ordem em que aconteceram.")
+
+
+class ResultadoOperacao(BaseModel):
+    indice: int
+    tipo: str
+    sucesso: bool
+    status_code: int
+    detalhe: Optional[str] = None
+    id_visita: Optional[int] = None
+    versao: Optional[int] = None
+
+
+class LoteSyncResponse(BaseModel):
+    resultados: List[ResultadoOperacao]
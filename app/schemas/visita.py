@@ -58,6 +58,7 @@ class Visita(VisitaBase):
     comprovante_frete_urls: List[str] = Field(default_factory=list,
                                               description="Lista de URLs dos comprovantes de frete para devolução de peças.")
     assinatura_cliente_url: Optional[str] = Field(None, description="URL da imagem da assinatura digital do cliente.")
+    versao: int = Field(1, description="Versão atual do registro, também enviada no cabeçalho ETag.")
 
     class Config:
         from_attributes = True
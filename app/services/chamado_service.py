@@ -0,0 +1,255 @@
+from datetime import date
+from typing import Dict, Any, List, Optional
+from fastapi import HTTPException
+from sqlalchemy.exc import SQLAlchemyError
+from app.core.metricas import registrar_transicao_status
+from app.core.repeticao import codigo_erro_transitorio, executar_com_repeticao
+from app.core.singleflight import SingleFlight
+from app.repositories.mysql_repository import SQLRepository
+from app.schemas.base_schemas import StatusChamado
+from app.schemas.chamado import Chamado as ChamadoSchema, ChamadoCreate
+from app.schemas.custo import CustoTotalResponse
+from app.schemas.sync import (OperacaoSync, OperacaoCriarVisita, OperacaoAtualizarVisita, OperacaoAtualizarStatus,
+                              ResultadoOperacao)
+from app.schemas.visita import VisitaCreate, VisitaUpdate
+from app.services.custo_service import CustoService
+from app.services.evento_service import publicar_evento_chamado
+from app.services.visita_service import dados_chamado_pela_visita
+
+_leituras_chamado = SingleFlight("chamado_completo")
+_calculos_custos = SingleFlight("custos_chamado")
+
+
+def obter_chamado_serializado(repo: SQLRepository, chamado_id: int, versao: int) -> Optional[ChamadoSchema]:
+    """
+    Carrega a árvore completa do chamado já convertida para o schema de resposta.
+    Leituras simultâneas da mesma versão do chamado compartilham uma única consulta; como a versão faz parte da chave,
+    quem acabou de alterar o chamado nunca recebe o resultado de uma leitura que começou antes da alteração.
+    """
+    def carregar():
+        chamado_db = repo.get_chamado_by_id(chamado_id)
+        return ChamadoSchema.model_validate(chamado_db) if chamado_db else None
+
+    return _leituras_chamado.executar((chamado_id, versao), carregar)
+
+
+def calcular_custos_chamado(repo: SQLRepository, chamado_id: int, versao: int) -> Optional[CustoTotalResponse]:
+    """Custos do chamado, com cálculos simultâneos da mesma versão compartilhados como em obter_chamado_serializado."""
+    def calcular():
+        chamado = obter_chamado_serializado(repo, chamado_id, versao)
+        if chamado is None:
+            return None
+        return CustoService().calcular_custo_chamado(chamado.model_dump())
+
+    return _calculos_custos.executar((chamado_id, versao), calcular)
+
+
+def dados_novo_chamado(chamado_in: ChamadoCreate) -> Dict[str, Any]:
+    """Campos do chamado a inserir: abre hoje, já AGENDADO quando há técnico atribuído e ABERTO caso contrário."""
+    chamado_data = chamado_in.model_dump()
+    chamado_data['data_abertura'] = date.today()
+    chamado_data['is_cancelled'] = False
+    if chamado_data.get('id_tecnico_atribuido') is not None:
+        chamado_data['status'] = StatusChamado.AGENDADO
+    else:
+        chamado_data['status'] = StatusChamado.ABERTO
+    return chamado_data
+
+
+def dados_mudanca_status(novo_status: StatusChamado, user_role: str) -> Dict[str, Any]:
+    """
+    Campos a gravar quando o status do chamado muda.
+    Apenas administradores finalizam um chamado diretamente; técnicos finalizam através da atualização da visita.
+    """
+    if novo_status == StatusChamado.FINALIZADO:
+        if user_role != "admin":
+            raise HTTPException(status_code=403,
+                                detail="Técnicos devem finalizar o chamado através da atualização da visita.")
+        return {"status": novo_status, "data_conclusao": date.today()}
+    return {"status": novo_status, "data_conclusao": None}
+
+
+class ChamadoService:
+    """
+    Regras de negócio das operações do técnico sobre chamados e visitas.
+    Usado tanto pelos endpoints individuais quanto pela sincronização em lote, para que as validações sejam as mesmas.
+    """
+
+    def __init__(self, repo: SQLRepository):
+        self.repo = repo
+        self._eventos_pendentes: Dict[int, str] = {}
+        self._transicoes_pendentes: List[tuple] = []
+
+    def _notificar(self, chamado_id: int, tipo: str) -> None:
+        """Publica a alteração do chamado; dentro de um lote, a publicação espera o commit do lote."""
+        if self.repo.em_lote:
+            self._eventos_pendentes[chamado_id] = tipo
+            return
+        chamado = self.repo.get_chamado_resumo(chamado_id)
+        if chamado:
+            publicar_evento_chamado(tipo, chamado)
+
+    def _publicar_pendentes(self) -> None:
+        pendentes, self._eventos_pendentes = self._eventos_pendentes, {}
+        for chamado_id, tipo in pendentes.items():
+            self._notificar(chamado_id, tipo)
+        transicoes, self._transicoes_pendentes = self._transicoes_pendentes, []
+        for de, para in transicoes:
+            registrar_transicao_status(de, para)
+
+    def _registrar_transicao(self, de, para) -> None:
+        """Conta a mudança de status na métrica; dentro de um lote, só depois do commit (como os eventos)."""
+        if self.repo.em_lote:
+            self._transicoes_pendentes.append((de, para))
+        else:
+            registrar_transicao_status(de, para)
+
+    def _buscar_chamado_ativo(self, chamado_id: int):
+        chamado = self.repo.get_chamado_resumo(chamado_id)
+        if not chamado or chamado.is_cancelled:
+            raise HTTPException(status_code=404, detail="Chamado não encontrado ou cancelado")
+        return chamado
+
+    def adicionar_visita(self, chamado_id: int, visita_in: VisitaCreate, current_user: dict):
+        """Cria a visita e move o chamado para 'Pendente' (se houver pendência) ou de 'Agendado' para 'Em Atendimento'."""
+        chamado = self._buscar_chamado_ativo(chamado_id)
+
+        if chamado.id_tecnico_atribuido != current_user.get("user_id"):
+            if current_user.get("role") != "admin":
+                raise HTTPException(status_code=403,
+                                    detail="Você não tem permissão para adicionar uma visita neste chamado.")
+
+        if visita_in.servico_finalizado:
+            raise HTTPException(status_code=400,
+                                detail="Não é possível criar uma visita já finalizada. Crie a visita, faça os uploads e depois finalize-a.")
+
+        visita_db = self.repo.create_visita(chamado_id, visita_in.model_dump())
+
+        dados_update_chamado = {}
+        if visita_in.pendencia:
+            dados_update_chamado['status'] = StatusChamado.PENDENTE
+        elif chamado.status == StatusChamado.AGENDADO:
+            dados_update_chamado['status'] = StatusChamado.EM_ATENDIMENTO
+
+        if dados_update_chamado:
+            self.repo.update_chamado_campos(chamado_id, dados_update_chamado)
+            self._registrar_transicao(chamado.status, dados_update_chamado['status'])
+
+        self._notificar(chamado_id, "visita_criada")
+        return visita_db
+
+    def atualizar_visita(
+            self,
+            chamado_id: int,
+            visita_id: int,
+            visita_in: VisitaUpdate,
+            current_user: dict,
+            versao_esperada: Optional[int] = None
+    ):
+        """Atualiza a visita validando as regras de finalização (feitas pelo repositório na mesma transação)."""
+        chamado = self._buscar_chamado_ativo(chamado_id)
+
+        if current_user.get("role") == "tecnico" and chamado.id_tecnico_atribuido != current_user.get("user_id"):
+            raise HTTPException(status_code=403, detail="Você não tem permissão para editar visitas deste chamado.")
+
+        updated_visita = self.repo.update_visita_e_chamado(visita_id, chamado_id, visita_in,
+                                                           versao_esperada=versao_esperada)
+        if updated_visita is None:
+            raise HTTPException(status_code=404, detail="Erro ao atualizar visita.")
+
+        if visita_in.model_fields_set:
+            self._registrar_transicao(chamado.status, dados_chamado_pela_visita(updated_visita).get("status"))
+        self._notificar(chamado_id, "visita_atualizada")
+        return updated_visita
+
+    def alterar_status(
+            self,
+            chamado_id: int,
+            novo_status: StatusChamado,
+            current_user: dict,
+            versao_esperada: Optional[int] = None
+    ) -> None:
+        """Mudança de status feita pelo técnico responsável (ou por um administrador)."""
+        chamado = self._buscar_chamado_ativo(chamado_id)
+
+        user_role = current_user.get("role")
+        if user_role == "tecnico" and chamado.id_tecnico_atribuido != current_user.get("user_id"):
+            raise HTTPException(status_code=403, detail="Acesso negado a este chamado.")
+
+        update_data = dados_mudanca_status(novo_status, user_role)
+        if not self.repo.update_chamado_campos(chamado_id, update_data, versao_esperada=versao_esperada):
+            raise HTTPException(status_code=404, detail="Chamado não encontrado.")
+
+        self._registrar_transicao(chamado.status, novo_status)
+        self._notificar(chamado_id, "status_alterado")
+
+    def aplicar_lote(self, operacoes: List[OperacaoSync], current_user: dict) -> List[ResultadoOperacao]:
+        """
+        Aplica as operações na ordem recebida, todas em uma única transação.
+        Cada operação roda em um SAVEPOINT: se ela falhar, só ela é desfeita e o resultado registra o erro (422 para os
+        erros do banco, como uma constraint violada).
+        Visitas criadas no próprio lote podem ser referenciadas pelas operações seguintes através de 'referencia'.
+        Os eventos das alterações só são publicados depois do commit do lote. Se o banco desfizer o lote por deadlock
+        ou espera por lock, ele é aplicado de novo do início.
+        """
+        resultados = executar_com_repeticao("ChamadoService.aplicar_lote",
+                                            lambda: self._aplicar_lote(operacoes, current_user))
+        self._publicar_pendentes()
+        return resultados
+
+    def _aplicar_lote(self, operacoes: List[OperacaoSync], current_user: dict) -> List[ResultadoOperacao]:
+        resultados = []
+        visitas_criadas: Dict[str, int] = {}
+        self._eventos_pendentes, self._transicoes_pendentes = {}, []
+
+        with self.repo.lote():
+            for indice, operacao in enumerate(operacoes):
+                eventos_antes = dict(self._eventos_pendentes)
+                transicoes_antes = len(self._transicoes_pendentes)
+                try:
+                    with self.repo.ponto_de_salvamento():
+                        resultado = self._aplicar_operacao(indice, operacao, current_user, visitas_criadas)
+                except HTTPException as e:
+                    resultado = ResultadoOperacao(indice=indice, tipo=operacao.tipo, sucesso=False,
+                                                  status_code=e.status_code, detalhe=str(e.detail))
+                except SQLAlchemyError as e:
+                    # Deadlock e espera por lock desfazem a transação inteira: o lote todo é repetido. Com a conexão
+                    # perdida, nem o restante do lote nem o commit têm como seguir
+                    if codigo_erro_transitorio(e) or getattr(e, "connection_invalidated", False):
+                        raise
+                    # O SAVEPOINT já desfez a operação; o erro do banco (ex: constraint) vale só para ela
+                    resultado = ResultadoOperacao(indice=indice, tipo=operacao.tipo, sucesso=False, status_code=422,
+                                                  detalhe=f"Operação recusada pelo banco de dados ({type(e).__name__}).")
+                if not resultado.sucesso:
+                    self._eventos_pendentes = eventos_antes
+                    del self._transicoes_pendentes[transicoes_antes:]
+                resultados.append(resultado)
+        return resultados
+
+    def _aplicar_operacao(self, indice: int, operacao: OperacaoSync, current_user: dict,
+                          visitas_criadas: Dict[str, int]) -> ResultadoOperacao:
+        if isinstance(operacao, OperacaoCriarVisita):
+            visita_db = self.adicionar_visita(operacao.chamado_id, operacao.visita, current_user)
+            if operacao.referencia:
+                visitas_criadas[operacao.referencia] = visita_db.id_visita
+            return ResultadoOperacao(indice=indice, tipo=operacao.tipo, sucesso=True, status_code=201,
+                                     id_visita=visita_db.id_visita, versao=visita_db.versao)
+
+        if isinstance(operacao, OperacaoAtualizarVisita):
+            visita_id = operacao.visita_id
+            if visita_id is None:
+                visita_id = visitas_criadas.get(operacao.visita_referencia)
+                if visita_id is None:
+                    raise HTTPException(status_code=404,
+                                        detail=f"Nenhuma visita criada no lote com a referência '{operacao.visita_referencia}'.")
+            visita_db = self.atualizar_visita(operacao.chamado_id, visita_id, operacao.visita, current_user,
+                                              versao_esperada=operacao.versao_esperada)
+            return ResultadoOperacao(indice=indice, tipo=operacao.tipo, sucesso=True, status_code=200,
+                                     id_visita=visita_db.id_visita, versao=visita_db.versao)
+
+        if isinstance(operacao, OperacaoAtualizarStatus):
+            self.alterar_status(operacao.chamado_id, operacao.status, current_user,
+                                versao_esperada=operacao.versao_esperada)
+            return ResultadoOperacao(indice=indice, tipo=operacao.tipo, sucesso=True, status_code=200)
+
+        raise HTTPException(status_code=400, detail=f"Operação desconhecida: '{operacao.tipo}'.")
@@ -0,0 +1,39 @@
+import logging
+from typing import Optional
+from app.core.eventos import obter_backend_eventos
+
+logger = logging.getLogger(__name__)
+
+CANAL_CHAMADOS = "chamados"
+
+
+def publicar_evento_chamado(tipo: str, chamado, id_tecnico_anterior: Optional[int] = None) -> None:
+    """
+    Publica a alteração de um chamado para os painéis conectados.
+    Deve ser chamado depois do commit. 'chamado' pode ser o modelo ou o resumo retornado por get_chamado_resumo.
+    Uma falha na publicação não desfaz a operação, apenas é registrada no log.
+    """
+    status = getattr(chamado.status, "value", chamado.status)
+    evento = {
+        "tipo": tipo,
+        "id_os": chamado.id_os,
+        "status": status,
+        "is_cancelled": bool(chamado.is_cancelled),
+        "id_tecnico_atribuido": chamado.id_tecnico_atribuido,
+        "versao": chamado.versao,
+    }
+    if id_tecnico_anterior is not None and id_tecnico_anterior != chamado.id_tecnico_atribuido:
+        evento["id_tecnico_anterior"] = id_tecnico_anterior
+
+    try:
+        obter_backend_eventos().publicar(CANAL_CHAMADOS, evento)
+    except Exception:
+        logger.exception("Falha ao publicar o evento '%s' do chamado %s", tipo, chamado.id_os)
+
+
+def evento_visivel_para(evento: dict, usuario: dict) -> bool:
+    """Administradores recebem todos os eventos; técnicos, apenas os dos chamados que são (ou eram) deles."""
+    if usuario.get("role") == "admin":
+        return True
+    user_id = usuario.get("user_id")
+    return evento.get("id_tecnico_atribuido") == user_id or evento.get("id_tecnico_anterior") == user_id
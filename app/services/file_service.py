@@ -2,6 +2,7 @@ import shutil
 import uuid
 from pathlib import Path
 from fastapi import UploadFile
+from app.core.metricas import UPLOAD_BYTES, UPLOAD_DURACAO, cronometrar
 
 UPLOAD_DIRECTORY = Path("static/uploads")
 UPLOAD_DIRECTORY.mkdir(parents=True, exist_ok=True)
@@ -25,8 +26,9 @@ def save_upload_file(file: UploadFile, prefix: str) -> str:
 
         file_path = UPLOAD_DIRECTORY / filename
 
-        with file_path.open("wb") as buffer:
+        with cronometrar(UPLOAD_DURACAO), file_path.open("wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
+            UPLOAD_BYTES.observe(buffer.tell())
 
     finally:
         file.file.close()
@@ -0,0 +1,229 @@
+import csv
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+from fastapi import HTTPException
+from pydantic import ValidationError
+from app.core.config import IMPORTACAO_TAMANHO_LOTE, IMPORTACAO_THREADS_HASH
+from app.core.security import hash_password
+from app.schemas.cliente import ClienteCreate
+from app.schemas.importacao import ErroImportacao, RelatorioImportacao
+from app.schemas.tecnico import TecnicoCreate
+
+logger = logging.getLogger(__name__)
+
+# (linha, dados, erro de leitura): dados é None quando a linha não pôde ser lida
+RegistroLido = Tuple[int, Optional[dict], Optional[str]]
+
+_TAMANHO_BLOCO = 64 * 1024
+
+
+def detectar_formato(nome_arquivo: Optional[str], content_type: Optional[str]) -> str:
+    """Formato do arquivo pela extensão (ou pelo content-type): 'csv', 'json' ou 'ndjson'."""
+    nome = (nome_arquivo or "").lower()
+    tipo = (content_type or "").lower()
+    if nome.endswith((".ndjson", ".jsonl")) or "ndjson" in tipo:
+        return "ndjson"
+    if nome.endswith(".json") or tipo == "application/json":
+        return "json"
+    if nome.endswith(".csv") or "csv" in tipo:
+        return "csv"
+    raise HTTPException(status_code=400, detail="Formato não suportado. Envie um arquivo .csv, .json ou .ndjson.")
+
+
+def ler_registros(arquivo: BinaryIO, formato: str) -> Iterator[RegistroLido]:
+    """Lê o arquivo aos poucos, registro por registro, sem carregá-lo inteiro na memória."""
+    texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+    if formato == "csv":
+        return _ler_csv(texto)
+    if formato == "ndjson":
+        return _ler_ndjson(texto)
+    return _ler_lista_json(texto)
+
+
+def _ler_csv(texto) -> Iterator[RegistroLido]:
+    """Colunas vazias viram None e colunas com ponto (ex: dados_bancarios.banco) viram objetos aninhados."""
+    leitor = csv.DictReader(texto)
+    for linha in leitor:
+        dados: Dict[str, Any] = {}
+        for coluna, valor in linha.items():
+            if coluna is None:
+                continue
+            valor = valor.strip() if isinstance(valor, str) else valor
+            destino = dados
+            *caminho, campo = coluna.strip().split(".")
+            for parte in caminho:
+                destino = destino.setdefault(parte, {})
+            destino[campo] = valor if valor != "" else None
+        yield leitor.line_num, dados, None
+
+
+def _ler_ndjson(texto) -> Iterator[RegistroLido]:
+    for numero, linha in enumerate(texto, start=1):
+        if not linha.strip():
+            continue
+        try:
+            yield numero, json.loads(linha), None
+        except json.JSONDecodeError as e:
+            yield numero, None, f"JSON inválido: {e.msg}"
+
+
+def _ler_lista_json(texto) -> Iterator[RegistroLido]:
+    """Percorre uma lista JSON ([{...}, {...}]) decodificando um registro de cada vez."""
+    decodificador = json.JSONDecoder()
+    buffer = texto.read(_TAMANHO_BLOCO).lstrip()
+    if not buffer.startswith("["):
+        raise HTTPException(status_code=400, detail="O JSON deve ser uma lista de registros.")
+    buffer = buffer[1:]
+    fim_do_arquivo = False
+    posicao = 0
+
+    while True:
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        try:
+            if not buffer or (not fim_do_arquivo and len(buffer) < _TAMANHO_BLOCO):
+                raise ValueError
+            registro, fim = decodificador.raw_decode(buffer)
+        except ValueError:
+            if fim_do_arquivo:
+                raise HTTPException(status_code=400,
+                                    detail=f"JSON inválido ou incompleto após o registro {posicao}.")
+            bloco = texto.read(_TAMANHO_BLOCO)
+            fim_do_arquivo = not bloco
+            buffer += bloco
+            continue
+        posicao += 1
+        yield posicao, registro, None
+        buffer = buffer[fim:]
+
+
+def _mensagens_validacao(erro: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(parte) for parte in item['loc']) or 'registro'}: {item['msg']}" for item in erro.errors()]
+
+
+class _Importacao:
+    """
+    Acumula os registros válidos em lotes de IMPORTACAO_TAMANHO_LOTE e grava cada lote com 'gravar' (um upsert e um
+    commit por lote). Se um lote falhar no banco, todos os registros dele entram no relatório e a importação continua.
+    """
+
+    def __init__(self, gravar: Callable[[List[dict]], Any], tamanho_lote: int,
+                 preparar: Optional[Callable[[List[dict]], None]] = None):
+        self.gravar = gravar
+        self.preparar = preparar
+        self.tamanho_lote = tamanho_lote
+        self.relatorio = RelatorioImportacao()
+        self.lote: List[Tuple[int, dict]] = []
+
+    def erro(self, linha: int, mensagens: List[str]) -> None:
+        self.relatorio.erros.append(ErroImportacao(linha=linha, erros=mensagens))
+
+    def adicionar(self, linha: int, dados: dict) -> None:
+        self.lote.append((linha, dados))
+        if len(self.lote) >= self.tamanho_lote:
+            self.descarregar()
+
+    def descarregar(self) -> None:
+        lote, self.lote = self.lote, []
+        if not lote:
+            return
+        registros = [dados for _, dados in lote]
+        try:
+            if self.preparar:
+                self.preparar(registros)
+            resultado = self.gravar(registros)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception("Falha ao gravar um lote da importação")
+            for linha, _ in lote:
+                self.erro(linha, [f"Erro ao gravar o lote: {type(e).__name__}"])
+            return
+
+        self.relatorio.inseridos += resultado.inseridos
+        self.relatorio.atualizados += resultado.atualizados
+        for indice, motivo in resultado.rejeitados.items():
+            self.erro(lote[indice][0], [motivo])
+
+    def concluir(self) -> RelatorioImportacao:
+        self.relatorio.erros.sort(key=lambda erro: erro.linha)
+        self.relatorio.falhas = len(self.relatorio.erros)
+        return self.relatorio
+
+
+def importar_clientes(repo, registros: Iterator[RegistroLido],
+                      tamanho_lote: int = IMPORTACAO_TAMANHO_LOTE) -> RelatorioImportacao:
+    """
+    Valida cada registro com ClienteCreate e insere ou atualiza os clientes pelo 'codigo' (obrigatório na importação).
+    Códigos repetidos no próprio arquivo são rejeitados, mantendo o primeiro.
+    """
+    importacao = _Importacao(repo.upsert_clientes, tamanho_lote)
+    linhas_por_codigo: Dict[int, int] = {}
+
+    for linha, dados, erro_leitura in registros:
+        importacao.relatorio.total += 1
+        if erro_leitura:
+            importacao.erro(linha, [erro_leitura])
+            continue
+        try:
+            cliente = ClienteCreate.model_validate(dados)
+        except ValidationError as e:
+            importacao.erro(linha, _mensagens_validacao(e))
+            continue
+        if cliente.codigo is None:
+            importacao.erro(linha, ["codigo: obrigatório na importação"])
+            continue
+        if cliente.codigo in linhas_por_codigo:
+            importacao.erro(linha, [f"codigo: repetido no arquivo (linha {linhas_por_codigo[cliente.codigo]})"])
+            continue
+        linhas_por_codigo[cliente.codigo] = linha
+        importacao.adicionar(linha, cliente.model_dump())
+
+    importacao.descarregar()
+    return importacao.concluir()
+
+
+def importar_tecnicos(repo, registros: Iterator[RegistroLido],
+                      tamanho_lote: int = IMPORTACAO_TAMANHO_LOTE) -> RelatorioImportacao:
+    """
+    Valida cada registro com TecnicoCreate e insere ou atualiza os técnicos pelo email.
+    Os hashes das senhas (bcrypt, propositalmente lento) de cada lote são gerados em paralelo antes da gravação;
+    o bcrypt libera o GIL, então as threads usam vários núcleos.
+    """
+    linhas_por_email: Dict[str, int] = {}
+    linhas_por_cnpj: Dict[str, int] = {}
+
+    with ThreadPoolExecutor(max_workers=IMPORTACAO_THREADS_HASH, thread_name_prefix="importacao-hash") as executor:
+        def gerar_hashes(lote: List[dict]) -> None:
+            for dados, password_hash in zip(lote, executor.map(hash_password, [dados.pop("password") for dados in lote])):
+                dados["password_hash"] = password_hash
+
+        importacao = _Importacao(repo.upsert_tecnicos, tamanho_lote, preparar=gerar_hashes)
+
+        for linha, dados, erro_leitura in registros:
+            importacao.relatorio.total += 1
+            if erro_leitura:
+                importacao.erro(linha, [erro_leitura])
+                continue
+            try:
+                tecnico = TecnicoCreate.model_validate(dados)
+            except ValidationError as e:
+                importacao.erro(linha, _mensagens_validacao(e))
+                continue
+            email = tecnico.email.lower()
+            if email in linhas_por_email:
+                importacao.erro(linha, [f"email: repetido no arquivo (linha {linhas_por_email[email]})"])
+                continue
+            if tecnico.cnpj in linhas_por_cnpj:
+                importacao.erro(linha, [f"cnpj: repetido no arquivo (linha {linhas_por_cnpj[tecnico.cnpj]})"])
+                continue
+            linhas_por_email[email] = linha
+            linhas_por_cnpj[tecnico.cnpj] = linha
+            importacao.adicionar(linha, tecnico.model_dump())
+
+        importacao.descarregar()
+    return importacao.concluir()
@@ -0,0 +1,40 @@
+from datetime import date
+from typing import Any, Dict
+from fastapi import HTTPException
+from app.schemas.base_schemas import StatusChamado
+
+
+def validar_finalizacao_visita(visita) -> None:
+    """Comprovantes exigidos para finalizar a visita. 'visita' pode ser o modelo ou qualquer objeto com os mesmos campos."""
+    if not visita.assinatura_cliente_url:
+        raise HTTPException(status_code=400,
+                            detail="Assinatura do cliente é obrigatória para finalizar a visita.")
+    if visita.km_total > 0:
+        if not visita.odometro_inicio_url or not visita.odometro_fim_url:
+            raise HTTPException(status_code=400,
+                                detail="Fotos do odômetro (início e fim) são obrigatórias se km_total > 0.")
+    if visita.valor_pedagio > 0:
+        if not visita.comprovante_pedagio_urls:
+            raise HTTPException(status_code=400,
+                                detail="Comprovante(s) de pedágio são obrigatórios se valor_pedagio > 0.")
+    if visita.valor_frete_devolucao > 0:
+        if not visita.comprovante_frete_urls:
+            raise HTTPException(status_code=400,
+                                detail="Comprovante(s) de frete são obrigatórios se valor_frete_devolucao > 0.")
+
+
+def dados_chamado_pela_visita(visita) -> Dict[str, Any]:
+    """
+    Campos do chamado pai que mudam com a visita já atualizada: finalizada (depois de validar os comprovantes),
+    com pendência ou em atendimento.
+    """
+    if visita.servico_finalizado is True:
+        validar_finalizacao_visita(visita)
+        return {"status": StatusChamado.FINALIZADO.value, "data_conclusao": date.today()}
+
+    if visita.servico_finalizado is False:
+        return {
+            "status": StatusChamado.PENDENTE.value if visita.pendencia else StatusChamado.EM_ATENDIMENTO.value,
+            "data_conclusao": None
+        }
+    return {}
@@ -0,0 +1,114 @@
+"""
+Servidor de produção: uvicorn com vários workers, sem reload.
+
+Cada worker ajusta o threadpool ao pool de conexões do banco e se aquece no lifespan antes de aceitar conexões (ver
+app.core.ciclo_vida). No SIGTERM/SIGINT, o worker para de aceitar conexões, fecha os streams SSE e espera até
+SERVIDOR_TEMPO_ENCERRAMENTO segundos pelas requisições em andamento (ex: uploads) antes de sair.
+
+Uso, na raiz do projeto:
+    python -m app.servidor [--workers 4] [--host 0.0.0.0] [--porta 8000]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from typing import List
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+from app.core.ciclo_vida import iniciar_encerramento
+from app.core.config import (CACHE_ENTIDADES_TTL_SEGUNDOS, CACHE_INVALIDACAO_DISTRIBUIDA, EVENTOS_BACKEND,
+                             IDEMPOTENCIA_BACKEND, METRICAS_ATIVAS, REPOSITORIO_BACKEND, SERVIDOR_HOST, SERVIDOR_PORTA,
+                             SERVIDOR_TEMPO_ENCERRAMENTO, SERVIDOR_WORKERS)
+
+
+class ServidorComEncerramento(uvicorn.Server):
+    """uvicorn.Server que avisa a aplicação assim que o sinal de parada chega, antes de esperar as conexões abertas."""
+
+    def handle_exit(self, sig, frame) -> None:
+        iniciar_encerramento()
+        super().handle_exit(sig, frame)
+
+
+def _numero_de_workers(pedido: int) -> int:
+    workers = pedido or os.cpu_count() or 1
+    if REPOSITORIO_BACKEND == "memoria" and workers > 1:
+        print("REPOSITORIO_BACKEND='memoria' guarda os dados no processo: usando um único worker.", file=sys.stderr)
+        return 1
+    if IDEMPOTENCIA_BACKEND == "memoria" and workers > 1:
+        # Cada worker teria as próprias chaves: repetições que caíssem em outro worker gravariam em dobro
+        print("IDEMPOTENCIA_BACKEND='memoria' guarda as Idempotency-Key no processo: usando um único worker "
+              "(use 'redis' para vários).", file=sys.stderr)
+        return 1
+    if workers > 1:
+        for aviso in _avisos_estado_por_worker():
+            print(f"Aviso: {aviso}", file=sys.stderr)
+    return workers
+
+
+def _avisos_estado_por_worker() -> List[str]:
+    """
+    Estado que fica na memória de cada worker e faz as respostas dependerem do worker que atendeu. O SingleFlight, o
+    disjuntor do banco, os contadores de /api/estatisticas e a configuração alterada por PUT /api/perfilador também são
+    por worker, mas afetam apenas o desempenho ou o diagnóstico.
+    """
+    avisos = []
+    if EVENTOS_BACKEND == "memoria":
+        avisos.append("com EVENTOS_BACKEND='memoria', cada worker só vê os eventos dos próprios chamados; "
+                      "use 'redis' com vários workers.")
+    if CACHE_ENTIDADES_TTL_SEGUNDOS > 0 and not (CACHE_INVALIDACAO_DISTRIBUIDA and EVENTOS_BACKEND == "redis"):
+        avisos.append(f"o cache de clientes e técnicos de cada worker não vê as escritas feitas nos outros e pode "
+                      f"devolver dados antigos por até {CACHE_ENTIDADES_TTL_SEGUNDOS:g}s; use "
+                      f"CACHE_INVALIDACAO_DISTRIBUIDA=true com EVENTOS_BACKEND='redis' ou um TTL curto "
+                      f"(CACHE_ENTIDADES_TTL_SEGUNDOS=0 desliga).")
+    return avisos
+
+
+def _preparar_metricas_multiprocesso() -> str:
+    """
+    Com vários workers, o /metrics precisa do PROMETHEUS_MULTIPROC_DIR, definido antes de os workers importarem a
+    aplicação. Sem ele, cria um diretório temporário (apagado na saída); com ele, limpa os arquivos da execução anterior.
+    Retorna o diretório temporário criado, ou '' se nenhum foi criado.
+    """
+    diretorio = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+        for nome in os.listdir(diretorio):
+            if nome.endswith(".db"):
+                os.remove(os.path.join(diretorio, nome))
+        return ""
+    diretorio = tempfile.mkdtemp(prefix="metricas-")
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = diretorio
+    return diretorio
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Servidor de produção da API (uvicorn com vários workers).")
+    parser.add_argument("--host", default=SERVIDOR_HOST, help=f"Endereço (padrão: {SERVIDOR_HOST}).")
+    parser.add_argument("--porta", type=int, default=SERVIDOR_PORTA, help=f"Porta (padrão: {SERVIDOR_PORTA}).")
+    parser.add_argument("--workers", type=int, default=SERVIDOR_WORKERS, help="Processos (padrão: um por CPU).")
+    parser.add_argument("--tempo-encerramento", type=int, default=SERVIDOR_TEMPO_ENCERRAMENTO,
+                        help=f"Segundos para as requisições em andamento terminarem na parada "
+                             f"(padrão: {SERVIDOR_TEMPO_ENCERRAMENTO}).")
+    args = parser.parse_args()
+
+    workers = _numero_de_workers(args.workers)
+    diretorio_temporario = _preparar_metricas_multiprocesso() if METRICAS_ATIVAS and workers > 1 else ""
+
+    config = uvicorn.Config("app.main:app", host=args.host, port=args.porta, workers=workers,
+                            timeout_graceful_shutdown=args.tempo_encerramento)
+    servidor = ServidorComEncerramento(config=config)
+    try:
+        if workers > 1:
+            socket = config.bind_socket()
+            Multiprocess(config, target=servidor.run, sockets=[socket]).run()
+        else:
+            servidor.run()
+    finally:
+        if diretorio_temporario:
+            shutil.rmtree(diretorio_temporario, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
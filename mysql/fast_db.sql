@@ -14,7 +14,9 @@ CREATE TABLE IF NOT EXISTS tecnico (
     password_hash VARCHAR(100) NOT NULL,
     role ENUM('admin', 'tecnico') NOT NULL DEFAULT 'tecnico',
     is_active BOOLEAN NOT NULL DEFAULT TRUE,
-    dados_bancarios JSON /* Armazena: {banco, agencia, conta, pix} */
+    dados_bancarios JSON, /* Armazena: {banco, agencia, conta, pix} */
+    updated_at DATETIME(6) NOT NULL DEFAULT (UTC_TIMESTAMP(6)), /* Última alteração (UTC), usada pelo /sync */
+    INDEX ix_tecnico_updated_at (updated_at)
 );
 
 /* --- Tabela de Clientes --- */
@@ -30,7 +32,10 @@ CREATE TABLE IF NOT EXISTS cliente (
     bairro VARCHAR(100) NOT NULL,
     cidade VARCHAR(100) NOT NULL,
     uf VARCHAR(2) NOT NULL,
-    is_active BOOLEAN NOT NULL DEFAULT TRUE
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    updated_at DATETIME(6) NOT NULL DEFAULT (UTC_TIMESTAMP(6)), /* Última alteração (UTC), usada pelo /sync */
+    INDEX ix_cliente_updated_at (updated_at),
+    INDEX ix_cliente_uf_cidade (uf, cidade) /* Clientes por região */
 );
 
 /* --- Tabela de Chamados (Ordem de Serviço) --- */
@@ -50,7 +55,14 @@ CREATE TABLE IF NOT EXISTS ordem_servico (
     pedido VARCHAR(100),
     data_faturamento DATE,
     em_garantia BOOLEAN NOT NULL DEFAULT TRUE,
+    versao INT NOT NULL DEFAULT 1, /* Controle de concorrência otimista (ETag / If-Match) */
+    updated_at DATETIME(6) NOT NULL DEFAULT (UTC_TIMESTAMP(6)), /* Última alteração (UTC), usada pelo /sync */
     
+    INDEX ix_ordem_servico_updated_at (updated_at),
+    INDEX ix_ordem_servico_tecnico_updated_at (id_tecnico_atribuido, updated_at),
+    INDEX ix_ordem_servico_tecnico_cancelado_status (id_tecnico_atribuido, is_cancelled, status), /* Chamados do técnico */
+    INDEX ix_ordem_servico_status_cancelado (status, is_cancelled), /* Listagem por status */
+    INDEX ix_ordem_servico_cancelado_agendamento (is_cancelled, data_agendamento), /* Ativos/cancelados e agenda */
     FOREIGN KEY (id_cliente) REFERENCES cliente(id_cliente),
     FOREIGN KEY (id_tecnico_atribuido) REFERENCES tecnico(id_tecnico)
 );
@@ -84,6 +96,11 @@ CREATE TABLE IF NOT EXISTS visita (
     comprovante_pedagio_urls JSON NOT NULL DEFAULT (JSON_ARRAY()), /* Armazena uma LISTA de URLs: ["/url1.jpg", "/url2.jpg"] */
     comprovante_frete_urls JSON NOT NULL DEFAULT (JSON_ARRAY()),   /* Armazena uma LISTA de URLs */
     
+    versao INT NOT NULL DEFAULT 1, /* Controle de concorrência otimista (ETag / If-Match) */
+    updated_at DATETIME(6) NOT NULL DEFAULT (UTC_TIMESTAMP(6)), /* Última alteração (UTC), usada pelo /sync */
+    
+    INDEX ix_visita_updated_at (updated_at),
+    INDEX ix_visita_data_visita (data_visita),
     FOREIGN KEY (id_os) REFERENCES ordem_servico(id_os) ON DELETE CASCADE /* Se apagar a OS, apaga as visitas */
 );
 
@@ -119,4 +136,16 @@ CREATE TABLE IF NOT EXISTS material (
     valor DECIMAL(10, 2) NOT NULL,
     
     FOREIGN KEY (id_servico) REFERENCES servico_equipamento(id_servico) ON DELETE CASCADE
-);
\ No newline at end of file
+);
+
+/* --- Registro de itens que saíram do escopo de sincronização de um técnico (ex: chamado reatribuído) --- */
+CREATE TABLE IF NOT EXISTS remocao_sync (
+    id_remocao INT PRIMARY KEY AUTO_INCREMENT,
+    entidade VARCHAR(50) NOT NULL,
+    id_registro INT NOT NULL,
+    id_tecnico INT NOT NULL,
+    removido_em DATETIME(6) NOT NULL DEFAULT (UTC_TIMESTAMP(6)),
+
+    INDEX ix_remocao_sync_id_tecnico (id_tecnico),
+    INDEX ix_remocao_sync_removido_em (removido_em)
+);
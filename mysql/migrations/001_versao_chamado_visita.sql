@@ -0,0 +1,8 @@
+/* Migração 001 - Coluna de versão para controle de concorrência otimista em chamados e visitas */
+USE fast;
+
+ALTER TABLE ordem_servico
+    ADD COLUMN versao INT NOT NULL DEFAULT 1;
+
+ALTER TABLE visita
+    ADD COLUMN versao INT NOT NULL DEFAULT 1;
@@ -0,0 +1,30 @@
+/* Migração 002 - Rastreamento de alterações para a sincronização incremental (/api/sync) */
+USE fast;
+
+ALTER TABLE tecnico
+    ADD COLUMN updated_at DATETIME(6) NOT NULL DEFAULT (UTC_TIMESTAMP(6)),
+    ADD INDEX ix_tecnico_updated_at (updated_at);
+
+ALTER TABLE cliente
+    ADD COLUMN updated_at DATETIME(6) NOT NULL DEFAULT (UTC_TIMESTAMP(6)),
+    ADD INDEX ix_cliente_updated_at (updated_at);
+
+ALTER TABLE ordem_servico
+    ADD COLUMN updated_at DATETIME(6) NOT NULL DEFAULT (UTC_TIMESTAMP(6)),
+    ADD INDEX ix_ordem_servico_updated_at (updated_at),
+    ADD INDEX ix_ordem_servico_tecnico_updated_at (id_tecnico_atribuido, updated_at);
+
+ALTER TABLE visita
+    ADD COLUMN updated_at DATETIME(6) NOT NULL DEFAULT (UTC_TIMESTAMP(6)),
+    ADD INDEX ix_visita_updated_at (updated_at);
+
+CREATE TABLE IF NOT EXISTS remocao_sync (
+    id_remocao INT PRIMARY KEY AUTO_INCREMENT,
+    entidade VARCHAR(50) NOT NULL,
+    id_registro INT NOT NULL,
+    id_tecnico INT NOT NULL,
+    removido_em DATETIME(6) NOT NULL DEFAULT (UTC_TIMESTAMP(6)),
+
+    INDEX ix_remocao_sync_id_tecnico (id_tecnico),
+    INDEX ix_remocao_sync_removido_em (removido_em)
+);
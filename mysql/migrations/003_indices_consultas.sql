@@ -0,0 +1,13 @@
+/* Migração 003 - Índices para os padrões de acesso das consultas do repositório (conferidos por scripts/verificar_planos.py) */
+USE fast;
+
+ALTER TABLE ordem_servico
+    ADD INDEX ix_ordem_servico_tecnico_cancelado_status (id_tecnico_atribuido, is_cancelled, status),
+    ADD INDEX ix_ordem_servico_status_cancelado (status, is_cancelled),
+    ADD INDEX ix_ordem_servico_cancelado_agendamento (is_cancelled, data_agendamento);
+
+ALTER TABLE visita
+    ADD INDEX ix_visita_data_visita (data_visita);
+
+ALTER TABLE cliente
+    ADD INDEX ix_cliente_uf_cidade (uf, cidade);
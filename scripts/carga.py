@@ -0,0 +1,429 @@
+"""
+Teste de carga de ponta a ponta a partir dos fluxos da coleção do Postman (postman/fast_ariam_backend.postman_collection.json).
+
+Usuários virtuais repetem, até o fim da duração, cenários sorteados por peso. Cada cenário encadeia as requisições da
+coleção (mesmos métodos, rotas e corpos), trocando apenas os ids pelos criados durante o teste:
+    atendimento  o admin abre um chamado para o técnico, que inicia o atendimento, registra a visita, envia os comprovantes,
+                 finaliza o serviço e consulta os custos
+    consulta     o técnico lista os seus chamados, abre um deles e consulta os custos
+    painel       o admin lista chamados ativos, clientes e técnicos e abre um cliente
+Antes da carga, o script cria pela API um cliente, os técnicos dos usuários virtuais e alguns chamados para cada um.
+
+O relatório traz, por endpoint, p50/p95/p99 da latência, vazão e taxa de erro. Com --base, o script compara o resultado
+com uma execução guardada (--salvar-base) e termina com código 1 se algum endpoint regredir além da tolerância.
+
+Uso, na raiz do projeto:
+    python -m scripts.carga --em-processo --usuarios 20 --duracao 30
+    python -m scripts.carga --url http://127.0.0.1:8000 --admin admin1@exemplo.com:fast123 --usuarios 50
+    python -m scripts.carga --em-processo --salvar-base carga_base.json
+    python -m scripts.carga --em-processo --base carga_base.json --tolerancia 0.25
+--em-processo chama o app ASGI direto, sem rede; com REPOSITORIO_BACKEND='memoria' e sem --admin, o administrador é
+criado no repositório em memória. As fotos enviadas ficam em static/uploads.
+Requer o httpx, que não faz parte do requirements.txt (pip install httpx).
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import statistics
+import sys
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+COLECAO_POSTMAN = Path(__file__).resolve().parent.parent / "postman" / "fast_ariam_backend.postman_collection.json"
+
+# Um PNG de 1x1 pixel, enviado nos uploads
+IMAGEM_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d49444154789c6360000002000001e221bc330000000049454e44ae426082"
+)
+
+SENHA_TECNICOS = "carga123"
+ADMIN_MEMORIA = ("carga-admin@exemplo.com", "carga123")
+
+# Regressões menores que isso (em ms) são ruído de medição, mesmo acima da tolerância relativa
+DIFERENCA_MINIMA_MS = 2.0
+AMOSTRAS_MINIMAS = 20
+
+
+class ColecaoPostman:
+    """Requisições da coleção indexadas pelo nome, com a rota sem o {{base_url}}:{{port}}."""
+
+    def __init__(self, caminho: Path = COLECAO_POSTMAN):
+        with open(caminho, encoding="utf-8") as arquivo:
+            colecao = json.load(arquivo)
+        self.requisicoes: Dict[str, dict] = {}
+        self._indexar(colecao["item"])
+        # Os comprovantes da visita (odômetro, assinatura, pedágio e frete), na ordem da coleção
+        self.uploads = [nome for nome in self.requisicoes if nome.startswith("Upload de Foto")]
+
+    def _indexar(self, itens: list) -> None:
+        for item in itens:
+            if "item" in item:
+                self._indexar(item["item"])
+            else:
+                self.requisicoes[item["name"]] = item["request"]
+
+    def rota(self, nome: str) -> Tuple[str, str]:
+        requisicao = self.requisicoes[nome]
+        rota = re.sub(r"^\{\{base_url\}\}:\{\{port\}\}", "", requisicao["url"]["raw"]) or "/"
+        caminho, _, consulta = rota.partition("?")
+        # Os endpoints de coleção são declarados com barra no final; sem ela, a API responde com um redirecionamento
+        if re.fullmatch(r"/api/[a-z_]+", caminho):
+            caminho += "/"
+        return requisicao["method"], caminho + (f"?{consulta}" if consulta else "")
+
+    def corpo(self, nome: str) -> dict:
+        """Corpo JSON (modo raw) ou os campos de texto do formulário (urlencoded/formdata)."""
+        corpo = self.requisicoes[nome].get("body") or {}
+        modo = corpo.get("mode")
+        if modo == "raw":
+            return json.loads(corpo["raw"])
+        if modo in ("urlencoded", "formdata"):
+            return {campo["key"]: campo.get("value") for campo in corpo[modo] if campo.get("type", "text") == "text"}
+        return {}
+
+
+def preencher_ids(caminho: str, ids: Sequence[int]) -> str:
+    """Troca, em ordem, os segmentos numéricos da rota da coleção pelos ids informados."""
+    restantes = iter(ids)
+    return re.sub(r"(?<=/)\d+(?=/|$|\?)", lambda m: str(next(restantes, m.group(0))), caminho)
+
+
+def modelo_rota(metodo: str, caminho: str) -> str:
+    """Chave do endpoint no relatório, ex: 'GET /api/chamados/{id}/custos'."""
+    return f"{metodo} {re.sub(r'(?<=/)[0-9]+(?=/|$|[?])', '{id}', caminho)}"
+
+
+class Medicoes:
+    def __init__(self):
+        self.latencias: Dict[str, List[float]] = defaultdict(list)
+        self.erros: Dict[str, int] = defaultdict(int)
+
+    def registrar(self, chave: str, segundos: float, erro: bool) -> None:
+        self.latencias[chave].append(segundos * 1000)
+        if erro:
+            self.erros[chave] += 1
+
+    @staticmethod
+    def _resumo(latencias: List[float], erros: int, duracao: float) -> dict:
+        if len(latencias) >= 2:
+            percentis = statistics.quantiles(latencias, n=100, method="inclusive")
+            p50, p95, p99 = percentis[49], percentis[94], percentis[98]
+        else:
+            p50 = p95 = p99 = latencias[0]
+        return {
+            "requisicoes": len(latencias),
+            "vazao_rps": round(len(latencias) / duracao, 2),
+            "p50_ms": round(p50, 2),
+            "p95_ms": round(p95, 2),
+            "p99_ms": round(p99, 2),
+            "taxa_erro": round(erros / len(latencias), 4),
+        }
+
+    def resumo(self, duracao: float) -> dict:
+        todas = [latencia for latencias in self.latencias.values() for latencia in latencias]
+        return {
+            "total": self._resumo(todas, sum(self.erros.values()), duracao) if todas else {},
+            "endpoints": {chave: self._resumo(latencias, self.erros[chave], duracao)
+                          for chave, latencias in sorted(self.latencias.items())},
+        }
+
+
+class Ambiente:
+    """Dados criados antes da carga e compartilhados pelos usuários virtuais."""
+
+    def __init__(self, colecao: ColecaoPostman, token_admin: str, id_cliente: int, tecnicos: List[Tuple[int, str]]):
+        self.colecao = colecao
+        self.token_admin = token_admin
+        self.id_cliente = id_cliente
+        self.tecnicos = tecnicos
+
+
+class UsuarioVirtual:
+    def __init__(self, numero: int, cliente: httpx.AsyncClient, ambiente: Ambiente, medicoes: Medicoes, semente: int):
+        self.cliente = cliente
+        self.ambiente = ambiente
+        self.colecao = ambiente.colecao
+        self.medicoes = medicoes
+        self.rng = random.Random(semente * 100003 + numero)
+        self.id_tecnico, self.email = ambiente.tecnicos[numero % len(ambiente.tecnicos)]
+        self.token: Optional[str] = None
+
+    async def chamar(self, nome: str, ids: Sequence[int] = (), corpo: Optional[dict] = None, token: Optional[str] = None,
+                     arquivo: bool = False, esperado: Sequence[int] = (200,)) -> Any:
+        """Executa a requisição da coleção e mede a latência. Retorna o JSON da resposta, ou None se falhou."""
+        metodo, caminho = self.colecao.rota(nome)
+        caminho = preencher_ids(caminho, ids)
+        kwargs: Dict[str, Any] = {"headers": {"Authorization": f"Bearer {token or self.token}"}}
+        if arquivo:
+            kwargs["data"] = self.colecao.corpo(nome)
+            kwargs["files"] = {"file": ("carga.png", IMAGEM_PNG, "image/png")}
+        elif metodo in ("POST", "PATCH", "PUT"):
+            kwargs["json"] = self.colecao.corpo(nome) if corpo is None else corpo
+
+        inicio = time.perf_counter()
+        try:
+            resposta = await self.cliente.request(metodo, caminho, **kwargs)
+        except httpx.HTTPError:
+            self.medicoes.registrar(modelo_rota(metodo, caminho), time.perf_counter() - inicio, erro=True)
+            return None
+        falhou = resposta.status_code not in esperado
+        self.medicoes.registrar(modelo_rota(metodo, caminho), time.perf_counter() - inicio, erro=falhou)
+        if falhou or not resposta.content:
+            return None
+        return resposta.json()
+
+    async def entrar(self) -> bool:
+        dados = {**self.colecao.corpo("Login (técnico)"), "username": self.email, "password": SENHA_TECNICOS}
+        metodo, caminho = self.colecao.rota("Login (técnico)")
+        inicio = time.perf_counter()
+        resposta = await self.cliente.request(metodo, caminho, data=dados)
+        self.medicoes.registrar(modelo_rota(metodo, caminho), time.perf_counter() - inicio,
+                                erro=resposta.status_code != 200)
+        if resposta.status_code == 200:
+            self.token = resposta.json()["access_token"]
+        return self.token is not None
+
+
+async def cenario_atendimento(vu: UsuarioVirtual) -> None:
+    corpo = {**vu.colecao.corpo("Novo Chamado"), "id_cliente": vu.ambiente.id_cliente,
+             "id_tecnico_atribuido": vu.id_tecnico}
+    chamado = await vu.chamar("Novo Chamado", corpo=corpo, token=vu.ambiente.token_admin, esperado=(201,))
+    if chamado is None:
+        return
+    id_os = chamado["id_os"]
+    await vu.chamar("Iniciar Atendimento", ids=(id_os,))
+    visita = await vu.chamar("Adicionar Visita", ids=(id_os,), esperado=(201,))
+    if visita is None:
+        return
+    id_visita = visita["id_visita"]
+    for nome in vu.colecao.uploads:
+        await vu.chamar(nome, ids=(id_os, id_visita), arquivo=True)
+    await vu.chamar("Finalizar Chamado", ids=(id_os, id_visita))
+    await vu.chamar("Calcular Custos do Chamado", ids=(id_os,))
+
+
+async def cenario_consulta(vu: UsuarioVirtual) -> None:
+    chamados = await vu.chamar("Buscar Todos Chamados")
+    if not chamados:
+        return
+    id_os = vu.rng.choice(chamados)["id_os"]
+    await vu.chamar("Buscar Chamado por ID", ids=(id_os,))
+    await vu.chamar("Calcular Custos do Chamado", ids=(id_os,))
+
+
+async def cenario_painel(vu: UsuarioVirtual) -> None:
+    admin = vu.ambiente.token_admin
+    await vu.chamar("Buscar Todos Chamados Com Filtro", token=admin)
+    await vu.chamar("Buscar Todos Clientes", token=admin)
+    await vu.chamar("Buscar Todos Técnicos", token=admin)
+    await vu.chamar("Buscar Cliente por ID", ids=(vu.ambiente.id_cliente,), token=admin)
+
+
+CENARIOS: Dict[str, Callable[[UsuarioVirtual], Awaitable[None]]] = {
+    "atendimento": cenario_atendimento,
+    "consulta": cenario_consulta,
+    "painel": cenario_painel,
+}
+
+
+def ler_pesos(texto: str) -> Dict[str, float]:
+    pesos = {}
+    for parte in texto.split(","):
+        nome, _, peso = parte.partition("=")
+        if nome.strip() not in CENARIOS:
+            raise argparse.ArgumentTypeError(f"Cenário desconhecido: '{nome.strip()}'. Use {', '.join(CENARIOS)}.")
+        pesos[nome.strip()] = float(peso)
+    return pesos
+
+
+async def _exigir(resposta: httpx.Response, esperado: int = 200) -> Any:
+    if resposta.status_code != esperado:
+        raise SystemExit(f"Falha ao preparar o teste: {resposta.request.method} {resposta.request.url.path} "
+                         f"respondeu {resposta.status_code}: {resposta.text[:300]}")
+    return resposta.json()
+
+
+async def preparar(cliente: httpx.AsyncClient, colecao: ColecaoPostman, admin: Tuple[str, str],
+                   quantidade_tecnicos: int, chamados_por_tecnico: int) -> Ambiente:
+    """Cria pela API (com o admin) o cliente, os técnicos e os chamados iniciais do teste."""
+    _, rota_login = colecao.rota("Login (técnico)")
+    login = await _exigir(await cliente.post(rota_login, data={"username": admin[0], "password": admin[1]}))
+    cabecalhos = {"Authorization": f"Bearer {login['access_token']}"}
+    sufixo = int(time.time() * 1000) % 10 ** 9
+
+    _, rota_clientes = colecao.rota("Novo Cliente")
+    corpo_cliente = {**colecao.corpo("Novo Cliente"), "codigo": 1_000_000_000 + sufixo}
+    id_cliente = (await _exigir(await cliente.post(rota_clientes, json=corpo_cliente, headers=cabecalhos), 201))["id_cliente"]
+
+    _, rota_tecnicos = colecao.rota("Novo Técnico")
+    _, rota_lote = colecao.rota("Novo Chamado")
+    tecnicos = []
+    for i in range(quantidade_tecnicos):
+        email = f"carga{sufixo}-{i}@exemplo.com"
+        corpo_tecnico = {**colecao.corpo("Novo Técnico"), "email": email, "password": SENHA_TECNICOS, "role": "tecnico",
+                         "cnpj": f"{sufixo:09d}{i:05d}", "cpf": f"{sufixo:09d}{i:02d}"}
+        tecnico = await _exigir(await cliente.post(rota_tecnicos, json=corpo_tecnico, headers=cabecalhos), 201)
+        tecnicos.append((tecnico["id_tecnico"], email))
+        if chamados_por_tecnico:
+            corpo_chamado = {**colecao.corpo("Novo Chamado"), "id_cliente": id_cliente,
+                             "id_tecnico_atribuido": tecnico["id_tecnico"]}
+            await _exigir(await cliente.post(rota_lote + "lote", json={"chamados": [corpo_chamado] * chamados_por_tecnico},
+                                             headers=cabecalhos), 201)
+    return Ambiente(colecao, login["access_token"], id_cliente, tecnicos)
+
+
+async def executar_carga(cliente: httpx.AsyncClient, ambiente: Ambiente, args) -> Tuple[Medicoes, float]:
+    medicoes = Medicoes()
+    nomes = list(args.pesos)
+    pesos = [args.pesos[nome] for nome in nomes]
+
+    async def usuario(numero: int) -> None:
+        await asyncio.sleep(args.rampa * numero / args.usuarios)
+        vu = UsuarioVirtual(numero, cliente, ambiente, medicoes, args.semente)
+        if not await vu.entrar():
+            return
+        while time.monotonic() < fim:
+            await CENARIOS[vu.rng.choices(nomes, weights=pesos)[0]](vu)
+            if args.pausa:
+                await asyncio.sleep(vu.rng.expovariate(1000 / args.pausa))
+
+    fim = time.monotonic() + args.rampa + args.duracao
+    inicio = time.perf_counter()
+    await asyncio.gather(*(usuario(numero) for numero in range(args.usuarios)))
+    return medicoes, time.perf_counter() - inicio
+
+
+@asynccontextmanager
+async def abrir_cliente(args):
+    """Cliente HTTP para o uvicorn informado ou, com --em-processo, para o app ASGI (com o seu lifespan)."""
+    limites = httpx.Limits(max_connections=args.usuarios, max_keepalive_connections=args.usuarios)
+    if not args.em_processo:
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limites) as cliente:
+            yield cliente, None
+        return
+
+    from app.core.config import REPOSITORIO_BACKEND
+    from app.main import app
+
+    admin_memoria = None
+    if REPOSITORIO_BACKEND == "memoria" and not args.admin:
+        from app.core.security import hash_password
+        from app.repositories.in_memory_repository import InMemoryRepository
+
+        repo = InMemoryRepository()
+        if repo.get_tecnico_by_email(ADMIN_MEMORIA[0]) is None:
+            repo.create_tecnico({"nome": "Admin da carga", "cnpj": "carga-admin", "cpf": "carga-admin",
+                                 "email": ADMIN_MEMORIA[0], "telefone": "0", "role": "admin",
+                                 "password_hash": hash_password(ADMIN_MEMORIA[1]),
+                                 "dados_bancarios": {"banco": "-", "agencia": "-", "conta": "-"}})
+        admin_memoria = ADMIN_MEMORIA
+
+    async with app.router.lifespan_context(app):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://carga", timeout=args.timeout) as cliente:
+            yield cliente, admin_memoria
+
+
+def imprimir_relatorio(resultado: dict) -> None:
+    colunas = ("requisicoes", "vazao_rps", "p50_ms", "p95_ms", "p99_ms", "taxa_erro")
+    largura = max([len(chave) for chave in resultado["endpoints"]] + [5])
+    print(f"\n{'endpoint':<{largura}}  " + "  ".join(f"{coluna:>11}" for coluna in colunas))
+    linhas = list(resultado["endpoints"].items()) + [("TOTAL", resultado["total"])]
+    for chave, valores in linhas:
+        print(f"{chave:<{largura}}  " + "  ".join(f"{valores[coluna]:>11}" for coluna in colunas))
+
+
+def comparar_com_base(resultado: dict, base: dict, tolerancia: float) -> List[str]:
+    """Regressões em relação à base: p95 maior, mais erros ou menos vazão total que a tolerância permite."""
+    regressoes = []
+    for chave, anterior in base["endpoints"].items():
+        atual = resultado["endpoints"].get(chave)
+        if atual is None or min(atual["requisicoes"], anterior["requisicoes"]) < AMOSTRAS_MINIMAS:
+            continue
+        limite = anterior["p95_ms"] * (1 + tolerancia)
+        if atual["p95_ms"] > limite and atual["p95_ms"] - anterior["p95_ms"] > DIFERENCA_MINIMA_MS:
+            regressoes.append(f"{chave}: p95 {anterior['p95_ms']} -> {atual['p95_ms']} ms")
+        if atual["taxa_erro"] > anterior["taxa_erro"] + 0.01:
+            regressoes.append(f"{chave}: taxa de erro {anterior['taxa_erro']:.2%} -> {atual['taxa_erro']:.2%}")
+    vazao_base = base["total"]["vazao_rps"]
+    if resultado["total"]["vazao_rps"] < vazao_base * (1 - tolerancia):
+        regressoes.append(f"vazão total: {vazao_base} -> {resultado['total']['vazao_rps']} req/s")
+    return regressoes
+
+
+async def principal(args) -> int:
+    colecao = ColecaoPostman()
+    async with abrir_cliente(args) as (cliente, admin_memoria):
+        admin = tuple(args.admin.split(":", 1)) if args.admin else admin_memoria
+        if admin is None:
+            print("Informe o administrador com --admin EMAIL:SENHA.", file=sys.stderr)
+            return 2
+        ambiente = await preparar(cliente, colecao, admin, args.tecnicos, args.chamados_por_tecnico)
+        print(f"Carga: {args.usuarios} usuários por {args.duracao}s (rampa de {args.rampa}s), cenários {args.pesos}",
+              flush=True)
+        medicoes, duracao = await executar_carga(cliente, ambiente, args)
+
+    resultado = {
+        "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "alvo": "em-processo" if args.em_processo else args.url,
+        "usuarios": args.usuarios,
+        "duracao_s": round(duracao, 2),
+        "pesos": args.pesos,
+        **medicoes.resumo(duracao),
+    }
+    if not resultado["total"]:
+        print("Nenhuma requisição foi feita.", file=sys.stderr)
+        return 1
+    imprimir_relatorio(resultado)
+
+    for caminho in filter(None, (args.saida, args.salvar_base)):
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+    if not args.base:
+        return 0
+
+    with open(args.base, encoding="utf-8") as arquivo:
+        regressoes = comparar_com_base(resultado, json.load(arquivo), args.tolerancia)
+    if regressoes:
+        print(f"\nRegressões em relação a {args.base} (tolerância de {args.tolerancia:.0%}):")
+        for regressao in regressoes:
+            print(f"  - {regressao}")
+        return 1
+    print(f"\nSem regressões em relação a {args.base}.")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Teste de carga com os fluxos da coleção do Postman.")
+    alvo = parser.add_mutually_exclusive_group()
+    alvo.add_argument("--url", default="http://127.0.0.1:8000", help="API em execução (padrão: http://127.0.0.1:8000).")
+    alvo.add_argument("--em-processo", action="store_true", help="Chama o app ASGI no próprio processo, sem rede.")
+    parser.add_argument("--admin", help="Credenciais de um administrador, EMAIL:SENHA.")
+    parser.add_argument("--usuarios", type=int, default=10, help="Usuários virtuais simultâneos (padrão: 10).")
+    parser.add_argument("--duracao", type=float, default=30, help="Segundos de carga depois da rampa (padrão: 30).")
+    parser.add_argument("--rampa", type=float, default=0, help="Segundos para todos os usuários começarem.")
+    parser.add_argument("--pausa", type=float, default=0, help="Pausa média entre cenários, em ms (padrão: 0).")
+    parser.add_argument("--pesos", type=ler_pesos, default=ler_pesos("atendimento=2,consulta=6,painel=2"),
+                        help="Peso de cada cenário (padrão: atendimento=2,consulta=6,painel=2).")
+    parser.add_argument("--tecnicos", type=int, default=5, help="Técnicos criados para os usuários (padrão: 5).")
+    parser.add_argument("--chamados-por-tecnico", type=int, default=20, help="Chamados iniciais de cada técnico.")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--saida", help="Grava o resultado em JSON.")
+    parser.add_argument("--salvar-base", help="Grava o resultado em JSON para servir de base nas próximas execuções.")
+    parser.add_argument("--base", help="Compara com o resultado guardado e falha se houver regressão.")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Piora relativa aceita em relação à base (0.2 = 20%%).")
+    return asyncio.run(principal(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
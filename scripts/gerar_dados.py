@@ -0,0 +1,424 @@
+"""
+Gera dados sintéticos para testes de escala: técnicos, clientes, chamados, visitas, serviços e materiais.
+
+Os dados são coerentes entre si (chaves estrangeiras válidas, datas em ordem, status compatível com técnico e visitas)
+e seguem distribuições parecidas com as de produção: poucos clientes concentram muitos chamados, a maioria dos chamados
+está finalizada e os defeitos seguem as categorias e subcategorias de app/schemas/base_schemas.py.
+A mesma semente e a mesma --data-final geram sempre os mesmos dados. As chaves primárias são atribuídas pelo script a
+partir do maior id de cada tabela, então é possível rodar sobre um banco que já tem dados.
+
+Uso, na raiz do projeto:
+    python -m scripts.gerar_dados --url sqlite:///fast_escala.db --clientes 5000 --tecnicos 300 --chamados 1000000
+    python -m scripts.gerar_dados --chamados 20000      (usa o DATABASE_URL do .env)
+Com SQLite as tabelas são criadas a partir dos modelos; no MySQL, crie o banco antes com mysql/fast_db.sql.
+"""
+import argparse
+import os
+import random
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+CIDADES = {
+    ("Vitória", "ES"): 9, ("Vila Velha", "ES"): 8, ("Serra", "ES"): 8, ("Cariacica", "ES"): 6, ("Guarapari", "ES"): 2,
+    ("Linhares", "ES"): 2, ("Cachoeiro de Itapemirim", "ES"): 3, ("Colatina", "ES"): 2, ("São Paulo", "SP"): 10,
+    ("Campinas", "SP"): 3, ("Rio de Janeiro", "RJ"): 7, ("Belo Horizonte", "MG"): 6, ("Salvador", "BA"): 3,
+    ("Curitiba", "PR"): 2,
+}
+BAIRROS = ["Centro", "Jardim Camburi", "Praia do Canto", "Itapuã", "Laranjeiras", "Jardim da Penha", "Glória",
+           "Santa Lúcia", "Campo Grande", "Parque Industrial", "Boa Vista", "São Diogo"]
+RAMOS = ["Supermercado", "Mercearia", "Padaria", "Açougue", "Hortifruti", "Atacadista", "Drogaria", "Conveniência",
+         "Sorveteria", "Restaurante"]
+NOMES = ["Ana", "Bruno", "Carlos", "Daniela", "Eduardo", "Fernanda", "Gabriel", "Helena", "Igor", "Juliana", "Leonardo",
+         "Mariana", "Nelson", "Patrícia", "Rafael", "Sandra", "Thiago", "Vanessa", "Wagner"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Pereira", "Costa", "Rodrigues", "Almeida", "Nascimento", "Lima",
+              "Araújo", "Ferreira", "Carvalho", "Gomes", "Ribeiro"]
+BANCOS = ["Banco do Brasil", "Caixa", "Itaú", "Bradesco", "Santander", "Banestes", "Nubank", "Sicoob"]
+
+MATERIAIS_POR_DEFEITO = {
+    "Refrigeração": [("Gás R-134a (kg)", 48.00), ("Gás R-404A (kg)", 62.00), ("Filtro Secador", 85.00),
+                     ("Solda Foscoper (vareta)", 12.50), ("Capilar (m)", 9.90), ("Micromotor Ventilador", 160.00),
+                     ("Controlador Eletrônico", 320.00), ("Compressor 1/3 HP", 890.00)],
+    "Iluminação": [("Lâmpada LED Tubular", 32.00), ("Fonte LED 12V", 75.00), ("Reator Eletrônico", 55.00)],
+    "Estrutura": [("Perfil de Vedação (m)", 38.00), ("Puxador", 45.00), ("Parachoque Frontal", 120.00),
+                  ("Vidro Curvo", 480.00), ("Canto 90°", 22.00)],
+    "Outros": [("Fita Isolante", 8.00), ("Terminal Elétrico (pacote)", 15.00), ("Abraçadeira (pacote)", 11.00)],
+}
+
+
+class Distribuicao:
+    """Sorteio ponderado com os pesos acumulados calculados uma única vez."""
+
+    def __init__(self, pesos: Dict[Any, float]):
+        self.valores = list(pesos)
+        self.acumulados = []
+        total = 0.0
+        for peso in pesos.values():
+            total += peso
+            self.acumulados.append(total)
+
+    def sortear(self, rng: random.Random) -> Any:
+        return rng.choices(self.valores, cum_weights=self.acumulados)[0]
+
+    def sortear_varios(self, rng: random.Random, quantidade: int) -> list:
+        """Até 'quantidade' valores distintos, na ordem do enum."""
+        escolhidos = {self.sortear(rng) for _ in range(quantidade)}
+        return [valor for valor in self.valores if valor in escolhidos]
+
+
+def _formatar_documento(numero: int, digitos: int, mascara: str) -> str:
+    texto = f"{numero:0{digitos}d}"
+    return mascara.format(*texto)
+
+
+class GeradorDados:
+    """Produz as linhas de cada tabela (dicts com todas as colunas), atribuindo as chaves primárias em sequência."""
+
+    def __init__(self, semente: int, data_final: date, anos: float, proximos_ids: Dict[str, int], proximo_codigo: int):
+        from app.schemas import base_schemas as bs
+
+        self.bs = bs
+        self.rng = random.Random(semente)
+        self.data_final = data_final
+        self.data_inicial = data_final - timedelta(days=int(anos * 365))
+        self.ids = dict(proximos_ids)
+        self.proximo_codigo = proximo_codigo
+        self.ids_tecnicos: List[int] = []
+        self.ids_clientes: List[int] = []
+        self.tecnicos: Optional[Distribuicao] = None
+        self.clientes: Optional[Distribuicao] = None
+
+        s = bs.StatusChamado
+        self.status = Distribuicao({s.FINALIZADO: 70, s.AGENDADO: 10, s.ABERTO: 8, s.PENDENTE: 8, s.EM_ATENDIMENTO: 4})
+        self.visitas_por_chamado = Distribuicao({1: 80, 2: 15, 3: 5})
+        self.servicos_por_visita = Distribuicao({1: 70, 2: 20, 3: 10})
+        self.materiais_por_servico = Distribuicao({0: 20, 1: 40, 2: 30, 3: 10})
+        self.cidades = Distribuicao(CIDADES)
+        self.defeitos = Distribuicao({
+            bs.TipoDefeitoPrincipal.REFRIGERACAO: 55, bs.TipoDefeitoPrincipal.ILUMINACAO: 20,
+            bs.TipoDefeitoPrincipal.ESTRUTURA: 15, bs.TipoDefeitoPrincipal.OUTROS: 10,
+        })
+        self.sub_refrigeracao = Distribuicao({
+            bs.SubDefeitoRefrigeracao.COMPRESSOR: 35, bs.SubDefeitoRefrigeracao.VAZAMENTO: 40,
+            bs.SubDefeitoRefrigeracao.OUTROS: 25,
+        })
+        c = bs.SubDefeitoCompressor
+        self.sub_compressor = Distribuicao({
+            c.QUEIMADO: 20, c.NAO_PARTE: 15, c.TRAVADO: 12, c.CORRENTE_ALTA: 10, c.SEM_COMPRESSAO: 10, c.EM_MASSA: 8,
+            c.EM_CURTO: 8, c.COM_BARULHO: 8, c.NAO_SUCCIONA: 5, c.DESARMADO: 4,
+        })
+        self.sub_vazamento = Distribuicao({bs.SubDefeitoVazamento.N_PONTO: 70, bs.SubDefeitoVazamento.NAO_LOCALIZADO: 30})
+        o = bs.SubDefeitoOutros
+        self.sub_outros = Distribuicao({
+            o.FILTRO_ENTUPIDO: 30, o.MICROMOTOR_QUEIMADO: 20, o.CAPILAR_OBSTRUIDO: 15, o.REGULAGEM_PARAMETROS: 15,
+            o.MICROMOTOR_TRAVADO: 10, o.CONTROLADOR_QUEIMADO: 10,
+        })
+        i = bs.SubDefeitoIluminacao
+        self.sub_iluminacao = Distribuicao({i.LAMPADA_QUEIMADA: 60, i.SEM_ALIMENTACAO: 25, i.EM_CURTO: 15})
+        self.sub_estrutura = Distribuicao({sub: 1 for sub in bs.SubDefeitoEstrutura})
+
+    def _proximo_id(self, tabela: str) -> int:
+        self.ids[tabela] += 1
+        return self.ids[tabela] - 1
+
+    def _nome_pessoa(self) -> str:
+        return f"{self.rng.choice(NOMES)} {self.rng.choice(SOBRENOMES)} {self.rng.choice(SOBRENOMES)}"
+
+    def _telefone(self) -> str:
+        return f"(27) 9{self.rng.randrange(1000, 9999)}-{self.rng.randrange(1000, 9999)}"
+
+    def _data_hora(self, dia: date) -> datetime:
+        return datetime(dia.year, dia.month, dia.day, self.rng.randrange(7, 19), self.rng.randrange(60),
+                        self.rng.randrange(60))
+
+    def tecnico(self, password_hash: str, admin: bool = False) -> dict:
+        id_tecnico = self._proximo_id("tecnico")
+        prefixo = "admin" if admin else "tecnico"
+        if not admin:
+            self.ids_tecnicos.append(id_tecnico)
+        return {
+            "id_tecnico": id_tecnico,
+            "nome": self._nome_pessoa(),
+            "cpf": _formatar_documento(id_tecnico, 11, "{}{}{}.{}{}{}.{}{}{}-{}{}"),
+            "cnpj": _formatar_documento(id_tecnico, 14, "{}{}.{}{}{}.{}{}{}/{}{}{}{}-{}{}"),
+            "inscricao_estadual": None,
+            "email": f"{prefixo}{id_tecnico}@exemplo.com",
+            "telefone": self._telefone(),
+            "password_hash": password_hash,
+            "role": self.bs.UserRole.ADMIN if admin else self.bs.UserRole.TECNICO,
+            "is_active": admin or self.rng.random() >= 0.05,
+            "dados_bancarios": {"banco": self.rng.choice(BANCOS), "agencia": f"{self.rng.randrange(1, 9999):04d}",
+                                "conta": f"{self.rng.randrange(10000, 999999)}-{self.rng.randrange(10)}",
+                                "pix": f"{prefixo}{id_tecnico}@exemplo.com"},
+            "updated_at": self._data_hora(self.data_inicial),
+        }
+
+    def cliente(self) -> dict:
+        id_cliente = self._proximo_id("cliente")
+        self.ids_clientes.append(id_cliente)
+        cidade, uf = self.cidades.sortear(self.rng)
+        codigo = self.proximo_codigo
+        self.proximo_codigo += 1
+        return {
+            "id_cliente": id_cliente,
+            "razao_social": f"{self.rng.choice(RAMOS)} {self.rng.choice(SOBRENOMES)} {codigo} Ltda",
+            "codigo": codigo,
+            "contato_principal_nome": self._nome_pessoa(),
+            "contato_principal_telefone": self._telefone(),
+            "telefone": self._telefone(),
+            "endereco": f"Rua {self.rng.choice(SOBRENOMES)} {self.rng.choice(NOMES)}",
+            "numero": str(self.rng.randrange(1, 3000)),
+            "bairro": self.rng.choice(BAIRROS),
+            "cidade": cidade,
+            "uf": uf,
+            "is_active": self.rng.random() >= 0.03,
+            "updated_at": self._data_hora(self.data_inicial),
+        }
+
+    def preparar_sorteios(self) -> None:
+        """Poucos clientes concentram muitos chamados (Pareto); a carga dos técnicos varia menos (gama)."""
+        self.clientes = Distribuicao({id_cliente: min(self.rng.paretovariate(1.2), 50.0)
+                                      for id_cliente in self.ids_clientes})
+        self.tecnicos = Distribuicao({id_tecnico: self.rng.gammavariate(4.0, 1.0) for id_tecnico in self.ids_tecnicos})
+
+    def chamado(self) -> Tuple[dict, List[dict], List[dict], List[dict]]:
+        """Um chamado com as suas visitas, serviços e materiais."""
+        rng, s = self.rng, self.bs.StatusChamado
+        id_os = self._proximo_id("ordem_servico")
+        abertura = self.data_inicial + timedelta(days=rng.randrange((self.data_final - self.data_inicial).days + 1))
+        status = self.status.sortear(rng)
+        id_tecnico = None if status == s.ABERTO else self.tecnicos.sortear(rng)
+        agendamento = min(abertura + timedelta(days=rng.randrange(11)), self.data_final) if id_tecnico else None
+
+        visitas, servicos, materiais = [], [], []
+        if status in (s.EM_ATENDIMENTO, s.PENDENTE, s.FINALIZADO):
+            data_visita = agendamento
+            quantidade = self.visitas_por_chamado.sortear(rng)
+            for numero in range(quantidade):
+                ultima = numero == quantidade - 1
+                visitas.append(self._visita(id_os, data_visita, status, ultima, servicos, materiais))
+                data_visita = min(data_visita + timedelta(days=rng.randrange(1, 8)), self.data_final)
+
+        conclusao = visitas[-1]["data_visita"] if status == s.FINALIZADO else None
+        faturamento = None
+        if conclusao and rng.random() < 0.8:
+            faturamento = min(conclusao + timedelta(days=rng.randrange(1, 31)), self.data_final)
+        ultima_alteracao = faturamento or conclusao or (visitas[-1]["data_visita"] if visitas else None) \
+            or agendamento or abertura
+
+        chamado = {
+            "id_os": id_os,
+            "id_cliente": self.clientes.sortear(rng),
+            "id_tecnico_atribuido": id_tecnico,
+            "status": status,
+            "is_cancelled": status != s.FINALIZADO and rng.random() < 0.04,
+            "data_abertura": abertura,
+            "data_agendamento": agendamento,
+            "data_conclusao": conclusao,
+            "descricao_cliente": f"{self.defeitos.sortear(rng).value}: equipamento com defeito, cliente pede visita.",
+            "pedido": f"PED-{rng.randrange(100000, 999999)}" if rng.random() < 0.6 else None,
+            "data_faturamento": faturamento,
+            "em_garantia": rng.random() < 0.35,
+            "versao": 1 + sum(visita["versao"] for visita in visitas),
+            "updated_at": self._data_hora(ultima_alteracao),
+        }
+        return chamado, visitas, servicos, materiais
+
+    def _visita(self, id_os: int, data_visita: date, status, ultima: bool,
+                servicos: List[dict], materiais: List[dict]) -> dict:
+        rng, s = self.rng, self.bs.StatusChamado
+        id_visita = self._proximo_id("visita")
+        minutos = rng.randrange(7 * 60, 14 * 60)
+        horarios = []
+        for intervalo in (0, rng.randrange(15, 91), rng.randrange(5, 21), rng.randrange(30, 241)):
+            minutos = min(minutos + intervalo, 23 * 60 + 59)
+            horarios.append(f"{minutos // 60:02d}:{minutos % 60:02d}")
+        finalizou = ultima and status == s.FINALIZADO
+        pendencia = None
+        if ultima and status == s.PENDENTE:
+            pendencia = f"Aguardando peça: {rng.choice(MATERIAIS_POR_DEFEITO['Refrigeração'])[0]}"
+
+        for _ in range(self.servicos_por_visita.sortear(rng)):
+            servicos.append(self._servico(id_visita, materiais))
+
+        tem_ajudante = rng.random() < 0.3
+        return {
+            "id_visita": id_visita,
+            "id_os": id_os,
+            "data_visita": data_visita,
+            "hora_inicio_deslocamento": horarios[0],
+            "hora_chegada_cliente": horarios[1],
+            "hora_inicio_atendimento": horarios[2],
+            "hora_fim_atendimento": horarios[3],
+            "km_total": rng.randrange(4, 180),
+            "valor_pedagio": rng.choice((4.90, 7.80, 11.20)) if rng.random() < 0.3 else 0.00,
+            "valor_frete_devolucao": round(rng.uniform(20, 150), 2) if rng.random() < 0.05 else 0.00,
+            "descricao_servico_executado": "Diagnóstico e reparo do equipamento." if finalizou else "Diagnóstico.",
+            "nome_ajudante": self._nome_pessoa() if tem_ajudante else None,
+            "telefone_ajudante": self._telefone() if tem_ajudante else None,
+            "servico_finalizado": finalizou,
+            "pendencia": pendencia,
+            "odometro_inicio_url": None,
+            "odometro_fim_url": None,
+            "assinatura_cliente_url": None,
+            "comprovante_pedagio_urls": [],
+            "comprovante_frete_urls": [],
+            "versao": 2 if finalizou else 1,
+            "updated_at": self._data_hora(data_visita),
+        }
+
+    def _servico(self, id_visita: int, materiais: List[dict]) -> dict:
+        rng, bs = self.rng, self.bs
+        id_servico = self._proximo_id("servico_equipamento")
+        defeitos = self.defeitos.sortear_varios(rng, 2 if rng.random() < 0.1 else 1)
+        servico = {
+            "id_servico": id_servico,
+            "id_visita": id_visita,
+            "numero_serie_atendido": f"FA{rng.randrange(2015, 2026)}{rng.randrange(100000, 999999)}",
+            "defeitos_principais": [d.value for d in defeitos],
+            "defeito_outros_descricao": None,
+            "sub_defeitos_refrigeracao": [],
+            "sub_defeitos_compressor": [],
+            "sub_defeitos_vazamento": [],
+            "vazamento_ponto_descricao": None,
+            "sub_defeitos_outros": [],
+            "sub_defeitos_iluminacao": [],
+            "sub_defeitos_estrutura": [],
+        }
+        if bs.TipoDefeitoPrincipal.REFRIGERACAO in defeitos:
+            subs = self.sub_refrigeracao.sortear_varios(rng, 1 + (rng.random() < 0.15))
+            servico["sub_defeitos_refrigeracao"] = [sub.value for sub in subs]
+            if bs.SubDefeitoRefrigeracao.COMPRESSOR in subs:
+                servico["sub_defeitos_compressor"] = [v.value for v in self.sub_compressor.sortear_varios(rng, 2)]
+            if bs.SubDefeitoRefrigeracao.VAZAMENTO in subs:
+                vazamento = self.sub_vazamento.sortear(rng)
+                servico["sub_defeitos_vazamento"] = [vazamento.value]
+                if vazamento == bs.SubDefeitoVazamento.N_PONTO:
+                    servico["vazamento_ponto_descricao"] = f"{rng.randrange(1, 4)} ponto(s) na serpentina"
+            if bs.SubDefeitoRefrigeracao.OUTROS in subs:
+                servico["sub_defeitos_outros"] = [self.sub_outros.sortear(rng).value]
+        if bs.TipoDefeitoPrincipal.ILUMINACAO in defeitos:
+            servico["sub_defeitos_iluminacao"] = [self.sub_iluminacao.sortear(rng).value]
+        if bs.TipoDefeitoPrincipal.ESTRUTURA in defeitos:
+            servico["sub_defeitos_estrutura"] = [v.value for v in self.sub_estrutura.sortear_varios(rng, 2)]
+        if bs.TipoDefeitoPrincipal.OUTROS in defeitos:
+            servico["defeito_outros_descricao"] = "Ajuste de porta e limpeza do condensador."
+
+        catalogo = [item for defeito in defeitos for item in MATERIAIS_POR_DEFEITO[defeito.value]]
+        for nome, valor in rng.sample(catalogo, min(self.materiais_por_servico.sortear(rng), len(catalogo))):
+            materiais.append({
+                "id_material": self._proximo_id("material"),
+                "id_servico": id_servico,
+                "nome": nome,
+                "quantidade": rng.randrange(1, 4),
+                "valor": valor,
+            })
+        return servico
+
+
+def inserir(conexao, tabela, linhas: Sequence[dict]) -> None:
+    """
+    Um único INSERT compilado para todas as linhas (executemany). O PyMySQL reescreve o executemany em INSERTs de várias
+    linhas (VALUES (...), (...), ...) do tamanho do max_allowed_packet; o SQLite reaproveita o comando preparado.
+    Montar o VALUES de várias linhas no SQLAlchemy custaria mais que a própria gravação.
+    """
+    if linhas:
+        conexao.execute(tabela.insert(), linhas)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos em um MySQL ou em um SQLite para testes de escala.")
+    parser.add_argument("--url", default=os.getenv("DATABASE_URL"),
+                        help="URL do banco (padrão: DATABASE_URL). Ex: sqlite:///fast_escala.db")
+    parser.add_argument("--clientes", type=int, default=5000)
+    parser.add_argument("--tecnicos", type=int, default=300)
+    parser.add_argument("--chamados", type=int, default=100000)
+    parser.add_argument("--anos", type=float, default=3, help="Período coberto pelas datas de abertura (padrão: 3 anos).")
+    parser.add_argument("--data-final", type=date.fromisoformat, default=date.today(),
+                        help="Data mais recente dos chamados (AAAA-MM-DD). Fixe-a para gerar os mesmos dados outro dia.")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--lote", type=int, default=5000, help="Chamados por transação (padrão: 5000).")
+    parser.add_argument("--senha", default="fast123", help="Senha de todos os técnicos e do administrador gerados.")
+    args = parser.parse_args()
+    if not args.url:
+        parser.error("Informe --url ou defina DATABASE_URL.")
+
+    # Os modelos importam app.db.database, que exige um DATABASE_URL
+    os.environ.setdefault("DATABASE_URL", args.url)
+    os.environ.setdefault("SECRET_KEY", "gerar_dados")
+    from sqlalchemy import create_engine, event, func, select
+    from app.core.security import hash_password
+    from app.db.database import Base
+    from app.models.chamado import OrdemServico
+    from app.models.cliente import Cliente
+    from app.models.material import Material
+    from app.models.rastreamento import RemocaoSync  # noqa: F401 (a tabela do /sync entra no create_all)
+    from app.models.servico_equipamento import ServicoEquipamento
+    from app.models.tecnico import Tecnico
+    from app.models.visita import Visita
+
+    engine = create_engine(args.url)
+    modelos = (Tecnico, Cliente, OrdemServico, Visita, ServicoEquipamento, Material)
+    if engine.dialect.name == "sqlite":
+        # Todas as tabelas, inclusive as que o gerador não preenche (ex: remocao_sync, lida pelo /sync)
+        Base.metadata.create_all(engine)
+
+        @event.listens_for(engine, "connect")
+        def _pragmas(conexao_dbapi, _registro):
+            conexao_dbapi.execute("PRAGMA journal_mode=WAL")
+            conexao_dbapi.execute("PRAGMA synchronous=OFF")
+
+    with engine.connect() as conexao:
+        proximos_ids = {modelo.__tablename__: (conexao.scalar(select(func.max(modelo.__table__.primary_key.columns[0])))
+                                               or 0) + 1 for modelo in modelos}
+        proximo_codigo = (conexao.scalar(select(func.max(Cliente.codigo))) or 0) + 1
+
+    gerador = GeradorDados(args.semente, args.data_final, args.anos, proximos_ids, proximo_codigo)
+    password_hash = hash_password(args.senha)
+    inicio = perf_counter()
+
+    @contextmanager
+    def transacao():
+        with engine.begin() as conexao:
+            if engine.dialect.name in ("mysql", "mariadb"):
+                # Os dados são gerados já consistentes; conferir as chaves linha a linha só deixaria a carga mais lenta
+                conexao.exec_driver_sql("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+            yield conexao
+
+    with transacao() as conexao:
+        admin = gerador.tecnico(password_hash, admin=True)
+        inserir(conexao, Tecnico.__table__, [admin] + [gerador.tecnico(password_hash) for _ in range(args.tecnicos)])
+        for primeiro in range(0, args.clientes, args.lote):
+            quantidade = min(args.lote, args.clientes - primeiro)
+            inserir(conexao, Cliente.__table__, [gerador.cliente() for _ in range(quantidade)])
+    if not gerador.ids_tecnicos or not gerador.ids_clientes:
+        print("Gere ao menos um técnico e um cliente para criar chamados.", file=sys.stderr)
+        return 1
+    gerador.preparar_sorteios()
+
+    totais = dict.fromkeys(("chamados", "visitas", "servicos", "materiais"), 0)
+    for primeiro in range(0, args.chamados, args.lote):
+        linhas = ([], [], [], [])
+        for _ in range(min(args.lote, args.chamados - primeiro)):
+            chamado, visitas, servicos, materiais = gerador.chamado()
+            linhas[0].append(chamado)
+            linhas[1].extend(visitas)
+            linhas[2].extend(servicos)
+            linhas[3].extend(materiais)
+        with transacao() as conexao:
+            for tabela, lista in zip((OrdemServico, Visita, ServicoEquipamento, Material), linhas):
+                inserir(conexao, tabela.__table__, lista)
+        for chave, lista in zip(totais, linhas):
+            totais[chave] += len(lista)
+        print(f"{totais['chamados']}/{args.chamados} chamados ({perf_counter() - inicio:.0f}s)", flush=True)
+
+    print(f"\n{args.tecnicos} técnicos, {args.clientes} clientes, " + ", ".join(f"{v} {k}" for k, v in totais.items())
+          + f" em {perf_counter() - inicio:.0f}s.")
+    print(f"Administrador: {admin['email']} / técnicos: tecnico<id>@exemplo.com, todos com a senha '{args.senha}'.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
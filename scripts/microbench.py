@@ -0,0 +1,344 @@
+"""
+Microbenchmarks dos trechos em Python puro que rodam em toda requisição: cálculo de custos, conversão de horários,
+validação e serialização dos schemas de chamado e visita, tokens JWT e o deep_update do repositório em memória.
+
+Cada benchmark é calibrado para que uma amostra dure pelo menos --tempo-amostra segundos, aquecido e medido
+--amostras vezes (com o coletor de lixo desligado durante a medição, como no timeit). O resultado vai para um JSON com
+todas as amostras, e --comparar confronta a execução atual com um JSON anterior: a diferença só é apontada quando o
+teste de Mann-Whitney a considera significativa e a mediana muda mais que --limiar.
+
+Uso, na raiz do projeto:
+    python -m scripts.microbench --saida bench_base.json
+    python -m scripts.microbench --comparar bench_base.json --saida bench_novo.json [--filtro custo]
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import date, datetime, timedelta, timezone
+from time import perf_counter_ns
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# app.core.config exige SECRET_KEY e os modelos importados pelo repositório em memória exigem um DATABASE_URL
+os.environ.setdefault("SECRET_KEY", "microbench")
+os.environ.setdefault("REPOSITORIO_BACKEND", "memoria")
+
+from app.core.security import create_access_token, decode_access_token  # noqa: E402
+from app.repositories.in_memory_repository import deep_update  # noqa: E402
+from app.schemas.chamado import Chamado  # noqa: E402
+from app.schemas.visita import Visita  # noqa: E402
+from app.services.custo_service import CustoService, _parse_duration_in_hours  # noqa: E402
+
+TAMANHOS_CHAMADO = (1, 10, 50)  # visitas por chamado
+SERVICOS_POR_VISITA = 3
+MATERIAIS_POR_SERVICO = 4
+
+
+class Benchmark(NamedTuple):
+    nome: str
+    funcao: Callable[[], Any]
+
+
+def servico_exemplo(indice: int) -> dict:
+    return {
+        "numero_serie_atendido": f"SN-{indice:06d}",
+        "defeitos_principais": ["Refrigeração", "Outros"],
+        "defeito_outros_descricao": "Borracha da porta ressecada",
+        "sub_defeitos_refrigeracao": ["Compressor", "Vazamento"],
+        "sub_defeitos_compressor": ["Em Curto", "Corrente Alta"],
+        "sub_defeitos_vazamento": ["Nº Ponto"],
+        "vazamento_ponto_descricao": "Solda do evaporador",
+        "sub_defeitos_outros": ["Filtro Entupido"],
+        "sub_defeitos_iluminacao": [],
+        "sub_defeitos_estrutura": [],
+        "materiais_utilizados": [
+            {"nome": f"Material {m}", "quantidade": m + 1, "valor": 12.5 * (m + 1)}
+            for m in range(MATERIAIS_POR_SERVICO)
+        ],
+    }
+
+
+def visita_exemplo(indice: int) -> dict:
+    return {
+        "id_visita": indice + 1,
+        "data_visita": date(2025, 1, 1) + timedelta(days=indice),
+        "hora_inicio_deslocamento": "07:40",
+        "hora_chegada_cliente": "08:55",
+        "hora_inicio_atendimento": "09:05",
+        "hora_fim_atendimento": "11:50",
+        "km_total": 48,
+        "valor_pedagio": 9.8,
+        "valor_frete_devolucao": 16.35,
+        "descricao_servico_executado": "Troca do filtro secador e reoperação de vácuo.",
+        "servico_finalizado": True,
+        "pendencia": None,
+        "nome_ajudante": "Carlos Silva",
+        "telefone_ajudante": "27998887766",
+        "servicos_realizados": [servico_exemplo(indice * SERVICOS_POR_VISITA + s) for s in range(SERVICOS_POR_VISITA)],
+        "odometro_inicio_url": "/static/uploads/odometro_inicio.jpg",
+        "odometro_fim_url": "/static/uploads/odometro_fim.jpg",
+        "comprovante_pedagio_urls": ["/static/uploads/pedagio_1.jpg", "/static/uploads/pedagio_2.jpg"],
+        "comprovante_frete_urls": [],
+        "assinatura_cliente_url": "/static/uploads/assinatura.png",
+    }
+
+
+def chamado_exemplo(visitas: int) -> dict:
+    return {
+        "id_os": 1,
+        "id_cliente": 1,
+        "descricao_cliente": "Balcão refrigerado não gela",
+        "id_tecnico_atribuido": 1,
+        "data_abertura": date(2025, 1, 1),
+        "data_agendamento": date(2025, 1, 2),
+        "status": "Finalizado",
+        "visitas": [visita_exemplo(v) for v in range(visitas)],
+        "is_cancelled": False,
+        "versao": 3,
+    }
+
+
+def como_atributos(valor: Any) -> Any:
+    """Converte dicts em objetos com atributos, imitando as instâncias ORM que chegam aos schemas na API."""
+    if isinstance(valor, dict):
+        return SimpleNamespace(**{chave: como_atributos(v) for chave, v in valor.items()})
+    if isinstance(valor, list):
+        return [como_atributos(v) for v in valor]
+    return valor
+
+
+def montar_benchmarks() -> List[Benchmark]:
+    custo_service = CustoService()
+    benchmarks = [
+        Benchmark("parse_duration_in_hours", lambda: _parse_duration_in_hours("07:40", "11:50")),
+        Benchmark("parse_duration_in_hours (horário inválido)", lambda: _parse_duration_in_hours("7h40", "11:50")),
+    ]
+
+    for visitas in TAMANHOS_CHAMADO:
+        dados = chamado_exemplo(visitas)
+        orm = como_atributos(dados)
+        chamado = Chamado.model_validate(dados)
+        dump = chamado.model_dump()
+        benchmarks += [
+            Benchmark(f"calcular_custo_chamado [visitas={visitas}]",
+                      lambda dump=dump: custo_service.calcular_custo_chamado(dump)),
+            Benchmark(f"Chamado.model_validate dict [visitas={visitas}]",
+                      lambda dados=dados: Chamado.model_validate(dados)),
+            Benchmark(f"Chamado.model_validate atributos [visitas={visitas}]",
+                      lambda orm=orm: Chamado.model_validate(orm, from_attributes=True)),
+            Benchmark(f"Chamado.model_dump [visitas={visitas}]", lambda chamado=chamado: chamado.model_dump()),
+            Benchmark(f"Chamado.model_dump_json [visitas={visitas}]",
+                      lambda chamado=chamado: chamado.model_dump_json()),
+        ]
+
+    visita_dados = visita_exemplo(0)
+    visita = Visita.model_validate(visita_dados)
+    benchmarks += [
+        Benchmark("Visita.model_validate dict", lambda: Visita.model_validate(visita_dados)),
+        Benchmark("Visita.model_dump", lambda: visita.model_dump()),
+    ]
+
+    claims = {"sub": "tecnico@exemplo.com", "role": "tecnico", "id": 42}
+    token = create_access_token(claims, expires_delta=timedelta(days=3650))
+    benchmarks += [
+        Benchmark("create_access_token", lambda: create_access_token(claims)),
+        Benchmark("decode_access_token", lambda: decode_access_token(token)),
+    ]
+
+    # deep_update sobrescreve os mesmos valores a cada chamada, então o destino pode ser reaproveitado
+    destino_pequeno = {"nome": "Cliente", "dados_bancarios": {"banco": "001", "agencia": "1234", "conta": "5678-9"}}
+    alteracao_pequena = {"dados_bancarios": {"conta": "9999-0"}, "nome": "Cliente Novo"}
+    destino_grande = {f"grupo{g}": {f"campo{c}": {"valor": c, "extra": {"a": 1}} for c in range(10)} for g in range(10)}
+    alteracao_grande = {f"grupo{g}": {f"campo{c}": {"valor": -c} for c in range(0, 10, 2)} for g in range(10)}
+    benchmarks += [
+        Benchmark("deep_update [pequeno]", lambda: deep_update(destino_pequeno, alteracao_pequena)),
+        Benchmark("deep_update [10x10x2]", lambda: deep_update(destino_grande, alteracao_grande)),
+    ]
+    return benchmarks
+
+
+def medir(funcao: Callable[[], Any], iteracoes: int) -> float:
+    """Tempo médio por chamada, em nanossegundos, de 'iteracoes' chamadas seguidas."""
+    gc_ativo = gc.isenabled()
+    gc.disable()
+    try:
+        inicio = perf_counter_ns()
+        for _ in range(iteracoes):
+            funcao()
+        return (perf_counter_ns() - inicio) / iteracoes
+    finally:
+        if gc_ativo:
+            gc.enable()
+
+
+def calibrar(funcao: Callable[[], Any], tempo_amostra: float) -> int:
+    """Menor número de iterações (1, 2, 5, 10, 20, ...) cuja execução dura pelo menos tempo_amostra segundos."""
+    alvo_ns = tempo_amostra * 1e9
+    base = 1
+    while True:
+        for multiplo in (1, 2, 5):
+            iteracoes = base * multiplo
+            if medir(funcao, iteracoes) * iteracoes >= alvo_ns:
+                return iteracoes
+        base *= 10
+
+
+def executar(benchmark: Benchmark, amostras: int, tempo_amostra: float, aquecimento: int) -> dict:
+    iteracoes = calibrar(benchmark.funcao, tempo_amostra)
+    for _ in range(aquecimento):
+        medir(benchmark.funcao, iteracoes)
+    tempos = [medir(benchmark.funcao, iteracoes) for _ in range(amostras)]
+    quartis = statistics.quantiles(tempos, n=4)
+    return {
+        "iteracoes_por_amostra": iteracoes,
+        "amostras_ns": [round(t, 2) for t in tempos],
+        "mediana_ns": round(statistics.median(tempos), 2),
+        "media_ns": round(statistics.fmean(tempos), 2),
+        "desvio_ns": round(statistics.stdev(tempos), 2),
+        "iqr_ns": round(quartis[2] - quartis[0], 2),
+        "min_ns": round(min(tempos), 2),
+    }
+
+
+def mann_whitney(a: List[float], b: List[float]) -> float:
+    """
+    p-valor bilateral do teste U de Mann-Whitney pela aproximação normal, com correção de empates e de continuidade.
+    Não supõe distribuição normal dos tempos, que costumam ter cauda longa à direita.
+    """
+    n1, n2 = len(a), len(b)
+    n = n1 + n2
+    valores = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    soma_postos_a = 0.0
+    correcao_empates = 0.0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and valores[j + 1][0] == valores[i][0]:
+            j += 1
+        posto = (i + j) / 2 + 1
+        soma_postos_a += posto * sum(1 for k in range(i, j + 1) if valores[k][1] == 0)
+        empatados = j - i + 1
+        correcao_empates += empatados ** 3 - empatados
+        i = j + 1
+
+    u = soma_postos_a - n1 * (n1 + 1) / 2
+    media = n1 * n2 / 2
+    variancia = n1 * n2 / 12 * ((n + 1) - correcao_empates / (n * (n - 1)))
+    if variancia <= 0:
+        return 1.0
+    z = max(abs(u - media) - 0.5, 0) / math.sqrt(variancia)
+    return math.erfc(z / math.sqrt(2))
+
+
+def comparar(anterior: Dict[str, dict], atual: Dict[str, dict], alfa: float,
+             limiar: float) -> List[Tuple[str, Optional[float], Optional[float], str]]:
+    """(nome, variação da mediana, p-valor, veredito) de cada benchmark presente nas duas execuções."""
+    linhas = []
+    for nome, resultado in atual.items():
+        base = anterior.get(nome)
+        if base is None:
+            linhas.append((nome, None, None, "novo"))
+            continue
+        variacao = resultado["mediana_ns"] / base["mediana_ns"] - 1
+        p = mann_whitney(base["amostras_ns"], resultado["amostras_ns"])
+        if p >= alfa or abs(variacao) < limiar:
+            veredito = "igual"
+        else:
+            veredito = "mais lento" if variacao > 0 else "mais rápido"
+        linhas.append((nome, variacao, p, veredito))
+    return linhas
+
+
+def formatar_tempo(ns: float) -> str:
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f} ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f} µs"
+    return f"{ns:.0f} ns"
+
+
+def ambiente() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    import pydantic
+    return {
+        "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementacao": platform.python_implementation(),
+        "plataforma": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "pydantic": pydantic.VERSION,
+        "commit": commit,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmarks dos trechos de CPU que rodam em toda requisição.")
+    parser.add_argument("--amostras", type=int, default=20, help="Amostras por benchmark (padrão: 20).")
+    parser.add_argument("--tempo-amostra", type=float, default=0.02,
+                        help="Duração mínima de cada amostra em segundos (padrão: 0.02).")
+    parser.add_argument("--aquecimento", type=int, default=3, help="Amostras descartadas antes da medição (padrão: 3).")
+    parser.add_argument("--filtro", action="append", default=[],
+                        help="Roda só os benchmarks cujo nome contém o texto (pode repetir).")
+    parser.add_argument("--saida", help="Grava o resultado em JSON neste arquivo.")
+    parser.add_argument("--comparar", metavar="ARQUIVO", help="JSON de uma execução anterior para comparação.")
+    parser.add_argument("--alfa", type=float, default=0.01,
+                        help="Nível de significância do teste de Mann-Whitney (padrão: 0.01).")
+    parser.add_argument("--limiar", type=float, default=0.05,
+                        help="Variação mínima da mediana para apontar diferença (padrão: 0.05 = 5%%).")
+    args = parser.parse_args()
+    if args.amostras < 3:
+        parser.error("--amostras deve ser pelo menos 3.")
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            anterior = json.load(arquivo)["benchmarks"]
+
+    benchmarks = [b for b in montar_benchmarks()
+                  if not args.filtro or any(filtro.lower() in b.nome.lower() for filtro in args.filtro)]
+    if not benchmarks:
+        print("Nenhum benchmark corresponde ao filtro.", file=sys.stderr)
+        return 2
+
+    resultados: Dict[str, dict] = {}
+    largura = max(len(b.nome) for b in benchmarks)
+    for benchmark in benchmarks:
+        resultado = executar(benchmark, args.amostras, args.tempo_amostra, args.aquecimento)
+        resultados[benchmark.nome] = resultado
+        print(f"{benchmark.nome:<{largura}}  {formatar_tempo(resultado['mediana_ns']):>10}"
+              f"  ± {formatar_tempo(resultado['iqr_ns'] / 2):>9}  ({resultado['iteracoes_por_amostra']} it/amostra)",
+              flush=True)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump({"ambiente": ambiente(), "parametros": {"amostras": args.amostras,
+                                                              "tempo_amostra": args.tempo_amostra,
+                                                              "aquecimento": args.aquecimento},
+                       "benchmarks": resultados}, arquivo, ensure_ascii=False, indent=2)
+
+    if anterior is None:
+        return 0
+
+    print(f"\nComparação com {args.comparar} (Mann-Whitney, alfa={args.alfa}, limiar={args.limiar:.0%}):")
+    piores = 0
+    for nome, variacao, p, veredito in comparar(anterior, resultados, args.alfa, args.limiar):
+        if variacao is None:
+            print(f"{nome:<{largura}}  {'—':>8}  {'':>9}  {veredito}")
+            continue
+        piores += veredito == "mais lento"
+        print(f"{nome:<{largura}}  {variacao:>+8.1%}  p={p:<7.3g}  {veredito}")
+    return 1 if piores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
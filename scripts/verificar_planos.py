@@ -0,0 +1,178 @@
+"""
+Confere os planos de execução (EXPLAIN) das consultas do repositório em um MySQL ou MariaDB com dados.
+
+Cada caso chama um método de leitura do SQLRepository com ids e valores tirados do próprio banco, captura os SELECTs
+emitidos e roda EXPLAIN em cada um. O script falha (código de saída 1) quando alguma tabela é lida por varredura
+completa (type = ALL) estimada em pelo menos --min-linhas linhas, sinal de que falta um índice para aquele padrão de
+acesso. Tabelas pequenas ficam de fora porque nelas o otimizador prefere a varredura mesmo havendo índice.
+
+Uso, na raiz do projeto, com o DATABASE_URL do .env apontando para um banco populado:
+    python -m scripts.verificar_planos [--min-linhas 1000] [--detalhes]
+
+Os mesmos casos rodam como testes em tests/test_planos.py (pulados sem um MySQL/MariaDB no DATABASE_URL).
+"""
+import argparse
+import sys
+from datetime import timedelta
+from typing import Any, Callable, List, NamedTuple, Tuple
+from sqlalchemy import event, func, select
+from app.core.cache import obter_cache_entidades
+from app.db.database import SessionLocal, engine
+from app.models.chamado import OrdemServico
+from app.models.cliente import Cliente
+from app.models.tecnico import Tecnico
+from app.models.visita import Visita
+from app.repositories.mysql_repository import SQLRepository
+from app.schemas.base_schemas import StatusChamado
+
+
+MIN_LINHAS_PADRAO = 1000
+
+
+class Parametros(NamedTuple):
+    id_os: int
+    id_visita: int
+    id_tecnico: int
+    email_tecnico: str
+    ids_clientes: List[int]
+    codigos_clientes: List[int]
+    desde: Any
+
+
+class Caso(NamedTuple):
+    nome: str
+    executar: Callable[[SQLRepository, Parametros], Any]
+    # Consultas que percorrem a tabela inteira por natureza (ex: agregados sem filtro do ETag da listagem do admin)
+    permite_varredura: bool = False
+
+
+def carregar_parametros(db) -> Parametros:
+    """Valores reais do banco: o técnico com mais chamados, o chamado mais recente dele e alguns clientes."""
+    id_tecnico = db.execute(
+        select(OrdemServico.id_tecnico_atribuido)
+        .where(OrdemServico.id_tecnico_atribuido.isnot(None))
+        .group_by(OrdemServico.id_tecnico_atribuido)
+        .order_by(func.count().desc())
+        .limit(1)
+    ).scalar()
+    if id_tecnico is None:
+        raise SystemExit("O banco não tem chamados atribuídos a técnicos; popule-o antes de verificar os planos.")
+    id_os = db.scalar(select(func.max(OrdemServico.id_os)).where(OrdemServico.id_tecnico_atribuido == id_tecnico))
+    id_visita = db.scalar(select(func.max(Visita.id_visita))) or 0
+    clientes = db.execute(select(Cliente.id_cliente, Cliente.codigo).order_by(Cliente.id_cliente).limit(50)).all()
+    return Parametros(
+        id_os=id_os,
+        id_visita=id_visita,
+        id_tecnico=id_tecnico,
+        email_tecnico=db.scalar(select(Tecnico.email).where(Tecnico.id_tecnico == id_tecnico)),
+        ids_clientes=[id_cliente for id_cliente, _ in clientes],
+        codigos_clientes=[codigo for _, codigo in clientes],
+        desde=db.scalar(select(func.max(OrdemServico.updated_at))) - timedelta(days=1),
+    )
+
+
+_ABERTO = StatusChamado.ABERTO
+
+CASOS: List[Caso] = [
+    Caso("get_chamado_by_id", lambda r, p: r.get_chamado_by_id(p.id_os)),
+    Caso("get_chamado_versao", lambda r, p: r.get_chamado_versao(p.id_os)),
+    Caso("get_chamado_resumo", lambda r, p: r.get_chamado_resumo(p.id_os)),
+    Caso("get_chamados (primeira página)", lambda r, p: r.get_chamados(limite=50)),
+    Caso("get_chamados (página seguinte)", lambda r, p: r.get_chamados(apos=p.id_os // 2, limite=50)),
+    Caso("get_chamados (não cancelados)", lambda r, p: r.get_chamados(is_cancelled=False, limite=50)),
+    Caso("get_chamados (por status)", lambda r, p: r.get_chamados(status=_ABERTO, limite=50)),
+    Caso("get_chamados (do técnico)", lambda r, p: r.get_chamados(id_tecnico=p.id_tecnico)),
+    Caso("get_chamados (do técnico, por status)",
+         lambda r, p: r.get_chamados(is_cancelled=False, id_tecnico=p.id_tecnico, status=_ABERTO)),
+    Caso("get_versao_colecao_chamados (todos)", lambda r, p: r.get_versao_colecao_chamados(), permite_varredura=True),
+    Caso("get_versao_colecao_chamados (do técnico)",
+         lambda r, p: r.get_versao_colecao_chamados(is_cancelled=False, id_tecnico=p.id_tecnico)),
+    Caso("get_versao_colecao_chamados (por status)", lambda r, p: r.get_versao_colecao_chamados(status=_ABERTO)),
+    Caso("get_visita_by_id", lambda r, p: r.get_visita_by_id(p.id_visita)),
+    Caso("get_visita_versao", lambda r, p: r.get_visita_versao(p.id_visita)),
+    Caso("get_tecnico_by_id", lambda r, p: r.get_tecnico_by_id(p.id_tecnico)),
+    Caso("get_tecnico_by_email", lambda r, p: r.get_tecnico_by_email(p.email_tecnico)),
+    Caso("get_tecnicos (ativos)", lambda r, p: r.get_tecnicos(is_active=True, limite=50)),
+    Caso("get_cliente_by_id", lambda r, p: r.get_cliente_by_id(p.ids_clientes[0])),
+    Caso("get_clientes (ativos)", lambda r, p: r.get_clientes(is_active=True, limite=50)),
+    Caso("get_ids_clientes_ativos", lambda r, p: r.get_ids_clientes_ativos(p.ids_clientes)),
+    Caso("clientes por código (importação)",
+         lambda r, p: r.clientes.buscar_por_coluna("codigo", p.codigos_clientes)),
+    Caso("get_chamados_alterados", lambda r, p: r.get_chamados_alterados(p.desde, p.id_tecnico)),
+    Caso("get_visitas_alteradas", lambda r, p: r.get_visitas_alteradas(p.desde, p.id_tecnico)),
+    Caso("get_clientes_alterados", lambda r, p: r.get_clientes_alterados(p.desde, p.id_tecnico)),
+    Caso("get_remocoes_sync", lambda r, p: r.get_remocoes_sync(p.desde, p.id_tecnico, OrdemServico.__tablename__)),
+]
+
+
+def capturar_selects(repo: SQLRepository, caso: Caso, p: Parametros) -> List[Tuple[str, Any]]:
+    comandos = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            comandos.append((statement, parameters))
+
+    # Sem o cache de clientes e técnicos, toda chamada chega ao banco
+    obter_cache_entidades().limpar()
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        caso.executar(repo, p)
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
+    return comandos
+
+
+def varreduras(db, statement: str, parameters: Any, min_linhas: int) -> List[dict]:
+    """Linhas do EXPLAIN com varredura completa de uma tabela real (tabelas derivadas, como <subquery2>, ficam de fora)."""
+    plano = db.connection().exec_driver_sql("EXPLAIN " + statement, parameters).mappings().all()
+    return [dict(linha) for linha in plano
+            if linha["type"] == "ALL" and not str(linha["table"]).startswith("<")
+            and (linha["rows"] or 0) >= min_linhas]
+
+
+def verificar_caso(db, caso: Caso, p: Parametros, min_linhas: int = MIN_LINHAS_PADRAO) -> List[Tuple[str, dict]]:
+    """Varreduras completas (SQL, linha do EXPLAIN) dos SELECTs emitidos pelo caso."""
+    problemas = []
+    for statement, parameters in capturar_selects(SQLRepository(db), caso, p):
+        problemas.extend((statement, linha) for linha in varreduras(db, statement, parameters, min_linhas))
+    db.expunge_all()
+    return problemas
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Falha se alguma consulta do repositório fizer varredura completa.")
+    parser.add_argument("--min-linhas", type=int, default=MIN_LINHAS_PADRAO,
+                        help="Ignora varreduras em tabelas estimadas com menos linhas que isso (padrão: 1000).")
+    parser.add_argument("--detalhes", action="store_true", help="Mostra o SQL e o plano das consultas com problema.")
+    args = parser.parse_args()
+
+    if engine is None or engine.dialect.name not in ("mysql", "mariadb"):
+        print("O DATABASE_URL deve apontar para um MySQL ou MariaDB.", file=sys.stderr)
+        return 2
+
+    db = SessionLocal()
+    falhas = 0
+    try:
+        parametros = carregar_parametros(db)
+        for caso in CASOS:
+            problemas = verificar_caso(db, caso, parametros, args.min_linhas)
+            if not problemas or caso.permite_varredura:
+                situacao = "ok" if not problemas else "ok (varredura esperada)"
+                print(f"[{situacao}] {caso.nome}")
+                continue
+            falhas += 1
+            tabelas = ", ".join(sorted({f"{linha['table']} (~{linha['rows']} linhas)" for _, linha in problemas}))
+            print(f"[VARREDURA] {caso.nome}: {tabelas}")
+            if args.detalhes:
+                for statement, linha in problemas:
+                    print(f"    {' '.join(statement.split())}\n    -> {linha}")
+    finally:
+        db.rollback()
+        db.close()
+
+    print(f"\n{falhas} consulta(s) com varredura completa." if falhas else "\nNenhuma varredura completa encontrada.")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
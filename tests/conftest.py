@@ -0,0 +1,50 @@
+import os
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+
+# A aplicação lê a configuração na importação. Sem DATABASE_URL, os testes usam SQLite em arquivos temporários
+os.environ.setdefault("SECRET_KEY", "testes")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+
+def _importar_modelos() -> None:
+    """Registra todas as tabelas no Base.metadata (os relacionamentos precisam de todos os modelos carregados)."""
+    import app.models.chamado  # noqa: F401
+    import app.models.cliente  # noqa: F401
+    import app.models.material  # noqa: F401
+    import app.models.rastreamento  # noqa: F401
+    import app.models.servico_equipamento  # noqa: F401
+    import app.models.tecnico  # noqa: F401
+    import app.models.visita  # noqa: F401
+
+
+@pytest.fixture
+def engine_sqlite(tmp_path):
+    """SQLite em arquivo (o ':memory:' não é compartilhado entre as conexões das threads), com o schema criado."""
+    from app.db.database import Base
+
+    _importar_modelos()
+    engine = create_engine(f"sqlite:///{tmp_path / 'testes.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def engine_mysql():
+    """
+    Engine da aplicação, se o DATABASE_URL apontar para um MySQL ou MariaDB com o schema de mysql/fast_db.sql; sem
+    servidor, os testes que o usam são pulados.
+    """
+    if make_url(os.environ["DATABASE_URL"]).get_backend_name() not in ("mysql", "mariadb"):
+        pytest.skip("DATABASE_URL não aponta para um MySQL/MariaDB")
+    from app.db.database import engine
+
+    _importar_modelos()
+    try:
+        engine.connect().close()
+    except DBAPIError as e:
+        pytest.skip(f"MySQL/MariaDB indisponível: {e.orig}")
+    return engine
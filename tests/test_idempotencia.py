@@ -0,0 +1,86 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi import FastAPI, File, Form, UploadFile
+from fastapi.testclient import TestClient
+from app.core.idempotencia import ArmazenamentoIdempotenciaMemoria, IdempotenciaMiddleware, _Impressao
+from app.core.security import create_access_token
+
+
+@pytest.fixture
+def cliente():
+    app = FastAPI()
+    app.state.chamadas = 0
+
+    @app.post("/api/chamados/upload", status_code=201)
+    def upload(file: UploadFile = File(...), file_type: str = Form(...)):
+        app.state.chamadas += 1
+        return {"chamada": app.state.chamadas, "arquivo": file.file.read().decode(), "tipo": file_type}
+
+    @app.post("/api/chamados/", status_code=201)
+    def criar(dados: dict):
+        app.state.chamadas += 1
+        return {"chamada": app.state.chamadas, **dados}
+
+    app.add_middleware(IdempotenciaMiddleware, armazenamento=ArmazenamentoIdempotenciaMemoria())
+    with TestClient(app) as cliente:
+        yield cliente
+
+
+def _cabecalhos(chave: str, user_id: int = 1, **extras) -> dict:
+    # 'exp' diferente gera outro token para o mesmo usuário, como numa renovação
+    token = create_access_token({"user_id": user_id, "role": "tecnico", **extras})
+    return {"Authorization": f"Bearer {token}", "Idempotency-Key": chave}
+
+
+def _multipart(delimitador: str, conteudo: str) -> bytes:
+    return (f"--{delimitador}\r\nContent-Disposition: form-data; name=\"file_type\"\r\n\r\ncomprovante_pedagio_urls\r\n"
+            f"--{delimitador}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.jpg\"\r\n"
+            f"Content-Type: image/jpeg\r\n\r\n{conteudo}\r\n--{delimitador}--\r\n").encode()
+
+
+def _enviar_upload(cliente, cabecalhos: dict, delimitador: str, conteudo: str = "abc"):
+    return cliente.post("/api/chamados/upload", content=_multipart(delimitador, conteudo),
+                        headers={**cabecalhos, "Content-Type": f"multipart/form-data; boundary={delimitador}"})
+
+
+def test_upload_repetido_com_outro_delimitador(cliente):
+    primeira = _enviar_upload(cliente, _cabecalhos("k1"), "delimitadorA")
+    repetida = _enviar_upload(cliente, _cabecalhos("k1"), "outro-delimitador-B")
+    assert primeira.status_code == repetida.status_code == 201
+    assert repetida.json() == primeira.json()
+    assert repetida.headers["idempotent-replayed"] == "true"
+    assert _enviar_upload(cliente, _cabecalhos("k1"), "delimitadorC", conteudo="xyz").status_code == 422
+
+
+def test_chave_vale_por_usuario_e_nao_pelo_token(cliente):
+    primeira = cliente.post("/api/chamados/", json={"a": 1}, headers=_cabecalhos("k2"))
+    renovada = cliente.post("/api/chamados/", json={"a": 1}, headers=_cabecalhos("k2", renovado=True))
+    assert renovada.json() == primeira.json() and renovada.headers["idempotent-replayed"] == "true"
+    outro_usuario = cliente.post("/api/chamados/", json={"a": 1}, headers=_cabecalhos("k2", user_id=2))
+    assert outro_usuario.json()["chamada"] != primeira.json()["chamada"]
+
+
+def test_repeticoes_simultaneas_executam_uma_vez(cliente):
+    with ThreadPoolExecutor(8) as executor:
+        respostas = list(executor.map(
+            lambda _: cliente.post("/api/chamados/", json={"a": 1}, headers=_cabecalhos("k3")), range(8)))
+    assert {resposta.status_code for resposta in respostas} == {201}
+    assert len({resposta.json()["chamada"] for resposta in respostas}) == 1
+
+
+def test_sem_token_valido_passa_direto(cliente):
+    for _ in range(2):
+        resposta = cliente.post("/api/chamados/", json={"a": 1},
+                                headers={"Authorization": "Bearer invalido", "Idempotency-Key": "k4"})
+        assert "idempotent-replayed" not in resposta.headers
+    assert cliente.app.state.chamadas == 2
+
+
+@pytest.mark.parametrize("tamanho_parte", [1, 3, 7, 64])
+def test_impressao_aos_pedacos_ignora_o_delimitador(tamanho_parte):
+    corpo = _multipart("delimitador", "conteudo do arquivo")
+    impressao = _Impressao(b"delimitador")
+    for inicio in range(0, len(corpo), tamanho_parte):
+        impressao.atualizar(corpo[inicio:inicio + tamanho_parte])
+    assert impressao.hexdigest() == hashlib.sha256(corpo.replace(b"delimitador", b"")).hexdigest()
@@ -0,0 +1,25 @@
+import pytest
+from scripts.verificar_planos import CASOS, carregar_parametros, verificar_caso
+
+
+@pytest.fixture(scope="module")
+def parametros(engine_mysql):
+    from app.db.database import SessionLocal
+
+    with SessionLocal() as db:
+        try:
+            return carregar_parametros(db)
+        except SystemExit as e:
+            pytest.skip(str(e))
+
+
+@pytest.mark.parametrize("caso", CASOS, ids=[caso.nome for caso in CASOS])
+def test_consulta_sem_varredura_completa(caso, parametros):
+    from app.db.database import SessionLocal
+
+    with SessionLocal() as db:
+        problemas = verificar_caso(db, caso, parametros)
+        db.rollback()
+    if caso.permite_varredura:
+        return
+    assert not problemas, "\n".join(f"{' '.join(statement.split())}\n-> {linha}" for statement, linha in problemas)
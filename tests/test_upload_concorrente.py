@@ -0,0 +1,64 @@
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.models.chamado import OrdemServico
+from app.models.cliente import Cliente
+from app.models.visita import Visita
+from app.repositories.mysql_repository import SQLRepository
+
+UPLOADS_SIMULTANEOS = 16
+
+
+@pytest.fixture(params=["engine_sqlite", "engine_mysql"], ids=["sqlite", "mysql"])
+def engine(request):
+    """O SQLite usa json_insert e o MySQL/MariaDB, JSON_ARRAY_APPEND: os dois caminhos de append_visita_file_url."""
+    return request.getfixturevalue(request.param)
+
+
+@pytest.fixture
+def visita(engine):
+    """Cliente, chamado e visita sem comprovantes, apagados no fim (no MySQL, o banco é compartilhado)."""
+    Sessao = sessionmaker(bind=engine)
+    with Sessao() as db:
+        cliente = Cliente(razao_social="Teste upload concorrente", codigo=random.randint(10 ** 8, 2 ** 31 - 1), uf="ES")
+        chamado = OrdemServico(cliente=cliente, data_abertura=date.today())
+        visita = Visita(ordem_servico=chamado, data_visita=date.today())
+        db.add_all([cliente, chamado, visita])
+        db.commit()
+        ids = visita.id_visita, chamado.id_os, cliente.id_cliente
+    yield ids[0]
+    with Sessao() as db:
+        db.query(Visita).filter(Visita.id_visita == ids[0]).delete()
+        db.query(OrdemServico).filter(OrdemServico.id_os == ids[1]).delete()
+        db.query(Cliente).filter(Cliente.id_cliente == ids[2]).delete()
+        db.commit()
+
+
+def test_uploads_simultaneos_nao_perdem_urls(engine, visita):
+    Sessao = sessionmaker(bind=engine, autoflush=False)
+    largada = threading.Barrier(UPLOADS_SIMULTANEOS)
+
+    def enviar(indice: int) -> bool:
+        with Sessao() as db:
+            largada.wait()
+            return SQLRepository(db).append_visita_file_url(visita, "comprovante_pedagio_urls",
+                                                            f"/uploads/comprovante_{indice}.jpg")
+
+    with ThreadPoolExecutor(max_workers=UPLOADS_SIMULTANEOS) as executor:
+        resultados = list(executor.map(enviar, range(UPLOADS_SIMULTANEOS)))
+
+    assert all(resultados)
+    with Sessao() as db:
+        visita_db = db.get(Visita, visita)
+        assert sorted(visita_db.comprovante_pedagio_urls) == sorted(
+            f"/uploads/comprovante_{indice}.jpg" for indice in range(UPLOADS_SIMULTANEOS))
+        assert visita_db.versao == 1 + UPLOADS_SIMULTANEOS
+        assert db.get(OrdemServico, visita_db.id_os).versao == 1 + UPLOADS_SIMULTANEOS
+
+
+def test_visita_inexistente(engine_sqlite):
+    with sessionmaker(bind=engine_sqlite)() as db:
+        assert SQLRepository(db).append_visita_file_url(999, "comprovante_pedagio_urls", "/uploads/x.jpg") is False